@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+"""
+基准测试
+
+在合成包上分别测量GoogleDocstringParser、AstParser和完整的generate_from_module流水线，
+输出每秒文件数、每秒符号数和峰值内存，可保存为基线并与基线比较，性能下降超过阈值时以非零状态退出
+
+用法：
+    python -m benchmarks.run --preset medium --save baseline.json
+    python -m benchmarks.run --preset medium --compare baseline.json
+"""
+import argparse
+import ast
+import contextlib
+import gc
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Optional
+
+from benchmarks.synth import PRESETS, PackageSpec, SynthStats, generate_package
+from litedoc.docstring.parser import GoogleDocstringParser, clear_parse_cache
+from litedoc.output import generate_from_module
+from litedoc.syntax.astparser import AstParser
+
+RESULT_FORMAT = 1
+DEFAULT_THRESHOLD = 0.10
+"""默认的回退阈值，吞吐量下降或峰值内存上升超过此比例即视为回退"""
+
+
+def measure(func: Callable[[], Any], repeat: int) -> tuple[float, int]:
+    """
+    测量函数的耗时和峰值内存，耗时取repeat次中的最小值，峰值内存在额外的一次tracemalloc运行中测量，不影响计时
+    Args:
+        func: 被测函数
+        repeat: 计时次数
+    Returns:
+        (秒, 峰值内存字节数)
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return best, peak
+
+
+def collect_sources(package: str) -> list[str]:
+    sources = []
+    for root, dirs, files in os.walk(package):
+        dirs.sort()
+        for file in sorted(files):
+            if file.endswith(".py"):
+                with open(os.path.join(root, file), "r", encoding="utf-8") as f:
+                    sources.append(f.read())
+    return sources
+
+
+def run_benchmarks(spec: PackageSpec, repeat: int = 3, jobs: int = 1, workdir: Optional[str] = None) -> dict[str, Any]:
+    """
+    生成合成包并运行所有基准
+    Args:
+        spec: 合成包规模
+        repeat: 每个基准的计时次数
+        jobs: 完整流水线的进程数
+        workdir: 工作目录，默认使用临时目录并在结束后删除
+    Returns:
+        结果，可直接保存为JSON
+    """
+    own_workdir = workdir is None
+    workdir = workdir or tempfile.mkdtemp(prefix="litedoc-bench-")
+    try:
+        stats: SynthStats = generate_package(workdir, spec)
+        package = os.path.join(workdir, "synth")
+        sources = collect_sources(package)
+        docstrings = [
+                ast.get_docstring(node)
+                for source in sources for node in ast.walk(ast.parse(source))
+                if isinstance(node, (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)) and ast.get_docstring(node)
+        ]
+
+        def bench_docstring():
+            for docstring in docstrings:
+                GoogleDocstringParser(docstring).parse()
+
+        def bench_astparser():
+            for source in sources:
+                AstParser(source)
+
+        output_dir = os.path.join(workdir, "output")
+
+        def bench_pipeline():
+            clear_parse_cache()
+            with contextlib.redirect_stdout(io.StringIO()):
+                generate_from_module(package, output_dir, lang="en", jobs=jobs, incremental=False)
+
+        results = {}
+        for name, func, items in (
+                ("docstring", bench_docstring, len(docstrings)),
+                ("astparser", bench_astparser, stats.files),
+                ("pipeline", bench_pipeline, stats.files),
+        ):
+            seconds, peak = measure(func, repeat)
+            results[name] = {
+                    "seconds"      : seconds,
+                    "items"        : items,
+                    "files_per_s"  : stats.files / seconds,
+                    "symbols_per_s": stats.symbols / seconds,
+                    "peak_memory"  : peak,
+            }
+        return {
+                "format" : RESULT_FORMAT,
+                "spec"   : spec._asdict(),
+                "package": stats._asdict(),
+                "jobs"   : jobs,
+                "python" : platform.python_version(),
+                "results": results,
+        }
+    finally:
+        if own_workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def compare(current: dict[str, Any], baseline: dict[str, Any], threshold: float = DEFAULT_THRESHOLD) -> list[str]:
+    """
+    与基线比较
+    Args:
+        current: 本次结果
+        baseline: 基线结果
+        threshold: 回退阈值
+    Returns:
+        回退描述，为空表示没有回退
+    """
+    regressions = []
+    if current["spec"] != baseline["spec"]:
+        regressions.append("spec differs from baseline, results are not comparable")
+        return regressions
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        speed = result["files_per_s"] / base["files_per_s"] - 1
+        if speed < -threshold:
+            regressions.append(f"{name}: throughput {speed:+.1%} ({base['files_per_s']:.1f} -> {result['files_per_s']:.1f} files/s)")
+        memory = result["peak_memory"] / base["peak_memory"] - 1 if base["peak_memory"] else 0
+        if memory > threshold:
+            regressions.append(f"{name}: peak memory {memory:+.1%} ({base['peak_memory'] / 2 ** 20:.1f} -> {result['peak_memory'] / 2 ** 20:.1f} MB)")
+    return regressions
+
+
+def format_results(data: dict[str, Any], baseline: Optional[dict[str, Any]] = None) -> str:
+    """
+    Args:
+        data: 结果
+        baseline: 基线结果，提供时显示变化
+    Returns:
+        表格文本
+    """
+    package = data["package"]
+    lines = [
+            f"Package:     {package['files']} files    {package['symbols']} symbols    {package['docstrings']} docstrings    {package['bytes'] / 2 ** 20:.1f} MB",
+            f"{'benchmark':<12}{'seconds':>10}{'files/s':>12}{'symbols/s':>12}{'peak MB':>10}" + ("    vs baseline" if baseline else ""),
+    ]
+    for name, result in data["results"].items():
+        line = (f"{name:<12}{result['seconds']:>10.3f}{result['files_per_s']:>12.1f}"
+                f"{result['symbols_per_s']:>12.1f}{result['peak_memory'] / 2 ** 20:>10.1f}")
+        base = baseline["results"].get(name) if baseline else None
+        if base is not None:
+            line += f"    {result['files_per_s'] / base['files_per_s'] - 1:+.1%} speed"
+            if base["peak_memory"]:
+                line += f"  {result['peak_memory'] / base['peak_memory'] - 1:+.1%} memory"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark litedoc on a seeded synthetic package.")
+    parser.add_argument("--preset", default="medium", choices=sorted(PRESETS), help="Package size preset.")
+    for field, default in PackageSpec._field_defaults.items():
+        parser.add_argument(f"--{field.replace('_', '-')}", default=None, type=type(default), help=f"Override {field} of the preset.")
+    parser.add_argument("--repeat", default=3, type=int, help="Timed runs per benchmark, the fastest is reported.")
+    parser.add_argument("-j", "--jobs", default=1, type=int, help="Worker processes of the pipeline benchmark.")
+    parser.add_argument("--save", default=None, type=str, help="Save results as JSON, e.g. as a baseline.")
+    parser.add_argument("--compare", default=None, type=str, help="Compare against a saved baseline and exit with 1 on regression.")
+    parser.add_argument("--threshold", default=DEFAULT_THRESHOLD, type=float, help="Relative slowdown or memory growth counted as regression.")
+    args = parser.parse_args(argv)
+
+    overrides = {field: getattr(args, field) for field in PackageSpec._fields if getattr(args, field) is not None}
+    spec = PRESETS[args.preset]._replace(**overrides)
+
+    baseline = None
+    if args.compare is not None:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    data = run_benchmarks(spec, repeat=args.repeat, jobs=args.jobs)
+    print(format_results(data, baseline))
+    if args.save is not None:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=1)
+
+    if baseline is not None:
+        regressions = compare(data, baseline, args.threshold)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
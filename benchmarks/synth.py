@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+合成包生成器
+
+按给定规模和随机种子生成可重复的Python包，用于基准测试。同一规格和种子总是生成字节级相同的文件
+"""
+import os
+import random
+from typing import NamedTuple
+
+WORDS = (
+        "value", "point", "vector", "matrix", "line", "plane", "angle", "scale", "offset", "index",
+        "buffer", "stream", "token", "node", "tree", "graph", "edge", "weight", "cache", "entry",
+        "record", "field", "label", "config", "option", "result", "error", "state", "event", "handler",
+)
+TYPES = ("int", "float", "str", "bool", "bytes", "list[int]", "dict[str, float]", "Optional[str]", "tuple[int, ...]")
+
+
+class PackageSpec(NamedTuple):
+    """合成包的规模"""
+    modules: int = 40
+    """模块数，不含__init__.py"""
+    classes: int = 3
+    """每个模块的类数"""
+    methods: int = 8
+    """每个类的方法数"""
+    functions: int = 6
+    """每个模块的函数数"""
+    variables: int = 6
+    """每个模块带文档的变量数"""
+    args: int = 3
+    """每个函数或方法的参数数"""
+    docstring_lines: int = 4
+    """每个文档字符串的描述行数"""
+    constant_table: int = 0
+    """每个模块中常量表的条目数，0为不生成"""
+    depth: int = 2
+    """子包嵌套深度"""
+    nesting: int = 1
+    """函数体内嵌套函数的层数"""
+    seed: int = 0
+    """随机种子"""
+
+
+PRESETS: dict[str, PackageSpec] = {
+        "small" : PackageSpec(modules=20, classes=2, methods=5, functions=4, variables=4),
+        "medium": PackageSpec(),
+        "large" : PackageSpec(modules=200, classes=5, methods=12, functions=10, variables=10, docstring_lines=8, depth=3),
+        "tables": PackageSpec(modules=20, classes=1, methods=3, functions=2, variables=2, constant_table=5000),
+        "deep"  : PackageSpec(modules=60, depth=6, nesting=4),
+}
+"""预设规模"""
+
+
+class SynthStats(NamedTuple):
+    """生成结果的统计"""
+    files: int
+    symbols: int
+    """类、方法、函数和变量的总数"""
+    docstrings: int
+    bytes: int
+
+
+class _Writer:
+    def __init__(self, spec: PackageSpec, rng: random.Random):
+        self.spec = spec
+        self.rng = rng
+        self.symbols = 0
+        self.docstrings = 0
+
+    def name(self, parts: int = 2) -> str:
+        return "_".join(self.rng.choice(WORDS) for _ in range(parts))
+
+    def sentence(self) -> str:
+        words = [self.rng.choice(WORDS) for _ in range(self.rng.randint(5, 12))]
+        return " ".join(words).capitalize() + "."
+
+    def docstring(self, indent: str, args: list[tuple[str, str]], returns: bool) -> list[str]:
+        self.docstrings += 1
+        lines = [indent + '"""']
+        lines += [indent + self.sentence() for _ in range(self.spec.docstring_lines)]
+        if args:
+            lines.append(indent + "Args:")
+            lines += [f"{indent}    {name} ({type_}): {self.sentence()}" for name, type_ in args]
+        if returns:
+            lines += [indent + "Returns:", f"{indent}    {self.sentence()}"]
+        if self.rng.random() < 0.3:
+            lines += [indent + "Raises:", f"{indent}    ValueError: {self.sentence()}"]
+        lines.append(indent + '"""')
+        return lines
+
+    def function(self, indent: str, name: str, is_method: bool, depth: int) -> list[str]:
+        self.symbols += 1
+        args = [(f"{self.rng.choice(WORDS)}_{i}", self.rng.choice(TYPES)) for i in range(self.spec.args)]
+        params = ["self"] if is_method else []
+        for i, (arg_name, type_) in enumerate(args):
+            params.append(f"{arg_name}: {type_}" + (f" = {self.rng.randint(0, 99)}" if i >= len(args) - 1 else ""))
+        lines = []
+        if is_method and self.rng.random() < 0.2:
+            lines.append(indent + "@staticmethod")
+            params = params[1:]
+        lines.append(f"{indent}def {name}({', '.join(params)}) -> {self.rng.choice(TYPES)}:")
+        lines += self.docstring(indent + "    ", args, True)
+        body_indent = indent + "    "
+        for level in range(depth):
+            lines.append(f"{body_indent}def inner_{level}(x):")
+            lines += [f'{body_indent}    """{self.sentence()}"""']
+            body_indent += "    "
+        lines.append(f"{body_indent}total = {self.rng.randint(0, 1000)}")
+        for arg_name, _ in args:
+            lines.append(f"{body_indent}total = hash(({arg_name}, total))  # {self.rng.choice(WORDS)}")
+        lines.append(f"{body_indent}return total")
+        for level in reversed(range(depth)):
+            lines.append(f"{indent}{'    ' * (level + 1)}return inner_{level}(0)")
+        return lines
+
+    def module(self, index: int) -> str:
+        spec = self.spec
+        lines = ['"""', self.sentence(), '"""', "from typing import Optional", ""]
+        for i in range(spec.variables):
+            self.symbols += 1
+            lines.append(f"{self.name()}_{index}_{i}: int = {self.rng.randint(0, 10 ** 6)}")
+            lines.append(f'"""{self.sentence()}"""')
+        if spec.constant_table:
+            self.symbols += 1
+            lines.append(f"TABLE_{index} = {{")
+            lines += [f'    "{self.name(3)}_{i}": ({self.rng.random():.6f}, {self.rng.randint(0, 10 ** 9)}),'
+                      for i in range(spec.constant_table)]
+            lines.append("}")
+            lines.append('"""Constant table."""')
+        lines.append("")
+        for i in range(spec.functions):
+            lines += self.function("", f"{self.name()}_{i}", False, spec.nesting)
+            lines.append("")
+        for i in range(spec.classes):
+            self.symbols += 1
+            lines.append(f"class {self.name().title().replace('_', '')}{index}_{i}:")
+            lines += self.docstring("    ", [], False)
+            lines.append(f"    {self.rng.choice(WORDS)}: int = {self.rng.randint(0, 9)}")
+            for j in range(spec.methods):
+                lines.append("")
+                lines += self.function("    ", f"{self.name()}_{j}", True, min(spec.nesting, 1))
+            lines.append("")
+        return "\n".join(lines) + "\n"
+
+
+def module_dir(index: int, depth: int) -> list[str]:
+    """
+    按模块序号将模块分散到嵌套的子包中，每层3个分支
+    Args:
+        index: 模块序号
+        depth: 嵌套深度
+    Returns:
+        子包路径各段
+    """
+    levels = index % (depth + 1)
+    return [f"sub{index // 3 ** level % 3}" for level in range(levels)]
+
+
+def generate_package(root: str, spec: PackageSpec = PackageSpec(), name: str = "synth") -> SynthStats:
+    """
+    生成合成包
+    Args:
+        root: 生成到的目录
+        spec: 规模
+        name: 包名
+    Returns:
+        统计
+    """
+    rng = random.Random(spec.seed)
+    writer = _Writer(spec, rng)
+    package = os.path.join(root, name)
+    files = 0
+    total_bytes = 0
+    packages = {package}
+    for index in range(spec.modules):
+        folder = os.path.join(package, *module_dir(index, spec.depth))
+        packages.add(folder)
+        os.makedirs(folder, exist_ok=True)
+        data = writer.module(index).encode("utf-8")
+        with open(os.path.join(folder, f"mod_{index}.py"), "wb") as f:
+            f.write(data)
+        files += 1
+        total_bytes += len(data)
+    for folder in sorted(packages):
+        # 中间层目录也必须是包
+        while folder.startswith(package) and not os.path.exists(os.path.join(folder, "__init__.py")):
+            os.makedirs(folder, exist_ok=True)
+            data = f'"""\n{writer.sentence()}\n"""\n'.encode("utf-8")
+            with open(os.path.join(folder, "__init__.py"), "wb") as f:
+                f.write(data)
+            files += 1
+            total_bytes += len(data)
+            folder = os.path.dirname(folder)
+    return SynthStats(files, writer.symbols, writer.docstrings, total_bytes)
@@ -18,20 +18,52 @@ import argparse
 import os
 import sys
 
-from litedoc.output import generate_from_module
-
 
 def main():
+    if sys.argv[1:2] == ["serve-daemon"]:
+        from litedoc.daemon import serve_main
+        sys.exit(serve_main(sys.argv[2:]))
+
     parser = argparse.ArgumentParser(description="Generate documentation from Python modules.")
     parser.add_argument("path", type=str, help="Path to the Python module or package.")
-    parser.add_argument("-o", "--output", default="doc-output", type=str, help="Output directory.")
+    parser.add_argument("-o", "--output", default="doc-output", type=str,
+                        help="Output directory, {lang} is replaced by the language. "
+                             "Without {lang}, multiple languages are written to sub directories named after the language.")
     parser.add_argument("-c", "--contain-top", action="store_true", help="Whether to contain top-level dir in output dir.")
     parser.add_argument("-cs", "--create-same", action="store_true", help="Create same file with folder name")
     parser.add_argument("-bu", "--base-url", default=None, type=str, help="base url of the document.")
-    parser.add_argument("-l", "--lang", default="zh_Hans", type=str, help="Languages of the document.")
+    parser.add_argument("-l", "--lang", default="zh_Hans", type=str,
+                        help="Languages of the document, comma separated, e.g. en,zh-Hans. Each module is parsed once for all languages.")
+    parser.add_argument("--locale-dir", action="append", default=[], type=str,
+                        help="Directory of <lang>.json label files overriding or adding languages. Can be repeated, later ones take priority.")
     parser.add_argument("-t", "--theme", default="vitepress", type=str, help="Theme of the document.")
     parser.add_argument("-s", "--style", default="google", type=str, help="Style of the document.")
     parser.add_argument("-f", "--frontmatter", default=None, type=str, help="Frontmatter of the document.")
+    parser.add_argument("--force", action="store_true", help="Regenerate all files, ignoring the incremental build manifest.")
+    parser.add_argument("-e", "--exclude", action="append", default=[], type=str,
+                        help="Gitignore-style pattern of paths to exclude, relative to the module path. Can be repeated.")
+    parser.add_argument("--rev", default=None, type=str,
+                        help="Read the module from this git revision (tag, branch or commit) instead of the working tree, without checking it out.")
+    parser.add_argument("--versions", action="append", default=[], type=str,
+                        help="Build several versions at once, comma separated. Each item is a git revision of the module path or name=path of a "
+                             "directory or archive. Modules identical to an earlier version are rendered once and hard-linked. "
+                             "{version} in the output is replaced by the version name, otherwise versions are written to sub directories.")
+    parser.add_argument("--respect-gitignore", action="store_true", help="Exclude paths ignored by .gitignore files.")
+    parser.add_argument("--cache-dir", default=None, type=str, help="Directory of the persistent parse cache, disabled if not given.")
+    parser.add_argument("--cache-size", default=256, type=int, help="Size limit of the parse cache in MB.")
+    parser.add_argument("-j", "--jobs", default=1, type=int, help="Number of worker processes, 0 for all CPUs.")
+    parser.add_argument("-w", "--watch", action="store_true",
+                        help="Keep running after the build and regenerate only changed, created or deleted files. Always incremental.")
+    parser.add_argument("--watch-poll", action="store_true", help="Poll modification times even if inotify is available.")
+    parser.add_argument("--watch-interval", default=0.05, type=float, help="Polling interval of --watch in seconds.")
+    parser.add_argument("--client", action="store_true",
+                        help="Send the request to a running `litedoc serve-daemon` and print its output. Falls back to a local run if no daemon is listening.")
+    parser.add_argument("--socket", default=None, type=str, help="Unix socket of the daemon used by --client.")
+    parser.add_argument("--profile", action="store_true", help="Print wall and CPU time per stage and the slowest files.")
+    parser.add_argument("--profile-top", default=10, type=int, help="Number of slowest files listed by --profile.")
+    parser.add_argument("--profile-json", default=None, type=str, help="Write the timing report as JSON to this file, implies --profile.")
+    parser.add_argument("--profile-stats", default=None, type=str,
+                        help="Dump cProfile stats of the main process to this file (readable with pstats), implies --profile.")
 
     parser.add_argument("-fd", "--function-define", default="func", type=str, help="Function define of the document.")
     parser.add_argument("-md", "--method-define", default="method", type=str, help="Class function define of the document.")
@@ -42,12 +74,20 @@ def main():
 
     args = parser.parse_args()
 
-    if not os.path.exists(args.path):
-        print(f"Error: The path {args.path} does not exist.")
+    if args.versions and (args.rev is not None or args.watch or args.client):
+        print("Error: --versions cannot be combined with --rev, --watch or --client.")
+        sys.exit(1)
+    archive = args.rev is not None or bool(args.versions)
+    if not archive and not os.path.exists(args.path):
+        # wheel、sdist等归档内的目录不存在于磁盘上，sources模块只依赖标准库中的轻量模块
+        from litedoc.sources import is_source_path
+        archive = is_source_path(args.path)
+        if not archive:
+            print(f"Error: The path {args.path} does not exist.")
+            sys.exit(1)
+    if args.watch and (archive or os.path.isfile(args.path)):
+        print("Error: --watch requires a module directory, archives and git revisions are read only once.")
         sys.exit(1)
-
-    if not os.path.exists(args.output):
-        os.makedirs(args.output)
 
     lang = args.lang
 
@@ -59,13 +99,20 @@ def main():
     else:
         frontmatter = None
 
-    generate_from_module(
-        args.path, args.output,
+    options = dict(
         with_top=args.contain_top,
         lang=lang,
         theme=args.theme,
         style=args.style,
         frontmatter=frontmatter,
+        jobs=args.jobs,
+        incremental=not args.force,
+        exclude=args.exclude,
+        respect_gitignore=args.respect_gitignore,
+        cache_dir=args.cache_dir,
+        cache_size=args.cache_size * 1024 * 1024,
+        locale_dirs=args.locale_dir,
+        rev=args.rev,
         fd=args.function_define,
         md=args.method_define,
         cd=args.class_define,
@@ -74,6 +121,52 @@ def main():
         cs=args.create_same,
         bu=args.base_url
     )
+    if args.client:
+        from litedoc.daemon import run_client
+        exit_code = run_client(args.path, args.output, options, args.socket)
+        if exit_code is not None:
+            sys.exit(exit_code)
+        print("No litedoc daemon is listening, generating in this process", file=sys.stderr)
+
+    # 解析、渲染等模块在参数解析之后才导入，--help和参数错误时无需付出导入开销
+    from litedoc import profiling
+    from litedoc.output import generate_from_module
+
+    profile = args.profile or args.profile_json is not None or args.profile_stats is not None
+    profiler = profiling.enable() if profile else None
+    c_profiler = None
+    if args.profile_stats is not None:
+        import cProfile
+        c_profiler = cProfile.Profile()
+        c_profiler.enable()
+
+    if args.versions:
+        from litedoc.versions import generate_versions, parse_versions
+        options.pop("rev")
+        try:
+            versions = parse_versions(args.versions, args.path)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        generate_versions(versions, args.output, **options)
+    elif args.watch:
+        from litedoc.watch import Watcher
+        watcher = Watcher(args.path, args.output, poll=args.watch_poll, interval=args.watch_interval, **options)
+        try:
+            watcher.run()
+        except KeyboardInterrupt:
+            print("Stopped watching")
+    else:
+        generate_from_module(args.path, args.output, **options)
+
+    if c_profiler is not None:
+        c_profiler.disable()
+        c_profiler.dump_stats(args.profile_stats)
+    if profiler is not None:
+        profiling.disable()
+        print(profiler.summary(args.profile_top))
+        if args.profile_json is not None:
+            profiler.save_report(args.profile_json, args.profile_top)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+解析缓存
+
+以文件内容、注释风格和litedoc版本的哈希为键，将AstParser的解析结果以压缩JSON存放在缓存目录中，命中时跳过解析。
+写入使用临时文件加原子重命名，多个进程或CI任务可共用同一缓存目录；读取时更新修改时间，超出容量时按修改时间淘汰最久未使用的条目
+
+常驻进程中还可以使用MemoryParseCache，以相同的键将解析结果保存在内存中，命中时连磁盘读取和解压也一并跳过
+"""
+import json
+import os
+import zlib
+from collections import OrderedDict
+from typing import Optional
+
+from litedoc.docstring.parser import get_sections_fingerprint
+from litedoc.manifest import get_litedoc_version, hash_bytes
+
+CACHE_FORMAT = 2
+"""缓存条目的格式版本，AstParser.to_data()的结构变化时必须递增"""
+CACHE_SUFFIX = ".json.z"
+DEFAULT_CACHE_SIZE = 256 * 1024 * 1024
+"""默认缓存容量，字节"""
+MODEL_SIZE_FACTOR = 3
+"""内存中解析结果的大小与源文件大小之比的估计值，实测标准库模块的to_data()结果约为源文件的2.4到3倍"""
+
+
+def get_cache_key(content: bytes, style: str) -> str:
+    """
+    计算缓存键
+    Args:
+        content: 源文件内容
+        style: 注释风格
+    Returns:
+        缓存键，包含缓存格式、litedoc版本和段落标题表
+    """
+    return hash_bytes(f"{CACHE_FORMAT}\0{get_litedoc_version()}\0{style}\0{get_sections_fingerprint(style)}\0".encode("utf-8") + content)
+
+
+class ParseCache:
+    def __init__(self, cache_dir: str, max_size: int = DEFAULT_CACHE_SIZE):
+        """
+        Args:
+            cache_dir: 缓存目录
+            max_size: 缓存容量，字节
+        """
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(content: bytes, style: str) -> str:
+        """
+        计算缓存键，见get_cache_key
+        """
+        return get_cache_key(content, style)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], key[2:] + CACHE_SUFFIX)
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        读取缓存，命中时刷新条目的修改时间
+        Args:
+            key: 缓存键
+        Returns:
+            解析结果，未命中或条目损坏时为None
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = json.loads(zlib.decompress(f.read()))
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (OSError, ValueError, zlib.error):
+            # 损坏的条目视为未命中并删除，随后会被重新写入
+            self.misses += 1
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return data
+
+    def put(self, key: str, data: dict):
+        """
+        写入缓存，写入失败时忽略
+        Args:
+            key: 缓存键
+            data: 解析结果
+        """
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "wb") as f:
+                f.write(zlib.compress(json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")))
+            os.replace(tmp_path, path)
+        except OSError:
+            self._remove(tmp_path)
+
+    def evict(self) -> int:
+        """
+        缓存超出容量时，按修改时间从旧到新删除条目，直到不超过容量
+        Returns:
+            删除的条目数
+        """
+        entries = []
+        total_size = 0
+        try:
+            shards = os.scandir(self.cache_dir)
+        except OSError:
+            return 0
+        with shards:
+            for shard in shards:
+                if not shard.is_dir():
+                    continue
+                with os.scandir(shard.path) as it:
+                    for entry in it:
+                        if not entry.name.endswith(CACHE_SUFFIX):
+                            continue
+                        try:
+                            stat = entry.stat()
+                        except OSError:
+                            continue
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+                        total_size += stat.st_size
+        if total_size <= self.max_size:
+            return 0
+        entries.sort()
+        removed = 0
+        for _, size, path in entries:
+            if total_size <= self.max_size:
+                break
+            self._remove(path)
+            total_size -= size
+            removed += 1
+        return removed
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except OSError:
+            # 其他进程可能已经删除或正在使用
+            pass
+
+
+class MemoryParseCache:
+    def __init__(self, max_size: int = DEFAULT_CACHE_SIZE):
+        """
+        进程内的解析结果缓存，键与ParseCache相同，超出容量时淘汰最久未使用的条目
+        Args:
+            max_size: 容量，字节，按源文件大小乘以MODEL_SIZE_FACTOR估计每个条目的大小
+        """
+        self.max_size = max_size
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.entries: OrderedDict[str, tuple[dict, int]] = OrderedDict()
+        """缓存键 -> (解析结果, 估计大小)"""
+
+    def get(self, key: str) -> Optional[dict]:
+        """
+        Args:
+            key: 缓存键
+        Returns:
+            解析结果，调用方不可修改，未命中时为None
+        """
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: str, data: dict, source_size: int):
+        """
+        写入缓存，并淘汰超出容量的旧条目，单个条目超出容量时不缓存
+        Args:
+            key: 缓存键
+            data: 解析结果
+            source_size: 源文件大小，字节
+        """
+        size = source_size * MODEL_SIZE_FACTOR
+        if size > self.max_size:
+            return
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.size -= old[1]
+        self.entries[key] = (data, size)
+        self.size += size
+        while self.size > self.max_size:
+            _, (_, evicted_size) = self.entries.popitem(last=False)
+            self.size -= evicted_size
+
+    def clear(self):
+        self.entries.clear()
+        self.size = 0
@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""
+常驻的生成进程
+
+litedoc serve-daemon在本地Unix套接字上监听，启动时预先导入解析和渲染模块，并在内存中保留解析结果和docstring缓存，
+litedoc --client将生成请求(工作目录、路径和参数)发给它，输出逐行传回。空闲超过指定时间后自动退出
+
+协议：客户端发送一行JSON请求，服务端返回若干行JSON消息，{"stdout": 文本}或{"stderr": 文本}，最后一行为{"exit": 退出码}
+
+客户端只导入标准库中的轻量模块，启动开销只有解释器本身
+"""
+import argparse
+import json
+import os
+import socket
+import sys
+import tempfile
+from typing import IO, Any, Optional
+
+DEFAULT_IDLE_TIMEOUT = 30 * 60
+"""默认空闲超时，秒"""
+DEFAULT_CACHE_MB = 256
+"""默认内存解析缓存容量，MB"""
+
+
+def get_default_socket_path() -> str:
+    """
+    Returns:
+        默认套接字路径，优先放在XDG_RUNTIME_DIR下，否则放在临时目录下并以用户区分
+    """
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime_dir and os.path.isdir(runtime_dir):
+        return os.path.join(runtime_dir, "litedoc.sock")
+    user = os.getuid() if hasattr(os, "getuid") else os.environ.get("USERNAME", "user")
+    return os.path.join(tempfile.gettempdir(), f"litedoc-{user}.sock")
+
+
+def send_message(fp: IO[bytes], **message: Any):
+    fp.write(json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n")
+    fp.flush()
+
+
+class MessageStream:
+    """将写入的文本作为消息转发给客户端的文件对象，用于重定向stdout和stderr，客户端断开后丢弃输出"""
+
+    def __init__(self, fp: IO[bytes], name: str):
+        self.fp = fp
+        self.name = name
+        self.closed = False
+
+    def write(self, text: str) -> int:
+        if text and not self.closed:
+            try:
+                send_message(self.fp, **{self.name: text})
+            except OSError:
+                self.closed = True
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def request(message: dict, socket_path: Optional[str] = None, stdout: Optional[IO[str]] = None, stderr: Optional[IO[str]] = None) -> Optional[int]:
+    """
+    向守护进程发送请求并转发输出
+    Args:
+        message: 请求
+        socket_path: 套接字路径
+        stdout: 标准输出消息写入的位置，默认为sys.stdout
+        stderr: 标准错误消息写入的位置，默认为sys.stderr
+    Returns:
+        退出码，无法连接守护进程或平台不支持Unix套接字时为None
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path or get_default_socket_path())
+    except OSError:
+        sock.close()
+        return None
+    stdout = stdout or sys.stdout
+    stderr = stderr or sys.stderr
+    with sock, sock.makefile("rwb") as fp:
+        send_message(fp, **message)
+        for line in fp:
+            reply = json.loads(line)
+            if "exit" in reply:
+                return reply["exit"]
+            if "stdout" in reply:
+                stdout.write(reply["stdout"])
+            else:
+                stderr.write(reply["stderr"])
+    # 守护进程在请求中途退出
+    return 1
+
+
+def run_client(path: str, output: str, options: dict, socket_path: Optional[str] = None) -> Optional[int]:
+    """
+    请求守护进程生成文档，参数同generate_from_module，相对路径相对于当前工作目录
+    Args:
+        path: 模块路径
+        output: 输出路径
+        options: 其余参数
+        socket_path: 套接字路径
+    Returns:
+        退出码，无法连接守护进程时为None
+    """
+    return request({"command": "generate", "cwd": os.getcwd(), "path": path, "output": output, "options": options}, socket_path)
+
+
+class Daemon:
+    def __init__(self, socket_path: Optional[str] = None, idle_timeout: float = DEFAULT_IDLE_TIMEOUT, cache_size: int = DEFAULT_CACHE_MB * 1024 * 1024):
+        """
+        预先导入生成所需的模块，启用内存解析缓存并开始监听
+        Args:
+            socket_path: 套接字路径
+            idle_timeout: 空闲超时，秒，超时后退出
+            cache_size: 内存解析缓存容量，字节
+        Raises:
+            RuntimeError: 已有守护进程在运行
+        """
+        from litedoc import output
+        from litedoc.cache import MemoryParseCache
+
+        self.socket_path = os.path.abspath(socket_path or get_default_socket_path())
+        self.idle_timeout = idle_timeout
+        self.output = output
+        self.server = self.bind()
+        self.cache = output.memory_parse_cache = MemoryParseCache(cache_size)
+        self.running = False
+        self.request_count = 0
+
+    def bind(self) -> socket.socket:
+        """
+        监听套接字，已有其他守护进程在监听时报错，残留的套接字文件被删除，在构造时调用，此后客户端即可连接
+        Raises:
+            RuntimeError: 已有守护进程在运行
+        """
+        if os.path.exists(self.socket_path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.socket_path)
+            except OSError:
+                os.remove(self.socket_path)
+            else:
+                raise RuntimeError(f"A litedoc daemon is already listening on {self.socket_path}")
+            finally:
+                probe.close()
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+        server.listen()
+        return server
+
+    def serve(self):
+        """处理请求直到空闲超时或收到stop请求，请求按到达顺序逐个处理"""
+        server = self.server
+        server.settimeout(self.idle_timeout)
+        print(f"Litedoc daemon listening on {self.socket_path}")
+        self.running = True
+        try:
+            while self.running:
+                try:
+                    conn, _ = server.accept()
+                except socket.timeout:
+                    print(f"Idle for {self.idle_timeout}s, exiting")
+                    break
+                conn.settimeout(None)
+                with conn, conn.makefile("rwb") as fp:
+                    try:
+                        self.handle(fp)
+                    except (OSError, ValueError) as e:
+                        print(f"Bad request: {e}", file=sys.stderr)
+        finally:
+            server.close()
+            if self.output.memory_parse_cache is self.cache:
+                self.output.memory_parse_cache = None
+            try:
+                os.remove(self.socket_path)
+            except OSError:
+                pass
+
+    def handle(self, fp: IO[bytes]):
+        """
+        处理一个连接上的请求
+        Args:
+            fp: 连接的读写文件对象
+        """
+        import contextlib
+        import traceback
+
+        from litedoc.i18n import get_labels
+
+        line = fp.readline()
+        if not line:
+            return
+        message = json.loads(line)
+        command = message.get("command")
+        if command == "stop":
+            self.running = False
+            send_message(fp, stdout="Stopping litedoc daemon\n")
+            send_message(fp, exit=0)
+            return
+        if command == "status":
+            send_message(fp, stdout=f"pid {os.getpid()}    {self.request_count} builds    "
+                                    f"{len(self.cache.entries)} cached files    {self.cache.size / 2 ** 20:.1f}/{self.cache.max_size / 2 ** 20:.0f} MB\n")
+            send_message(fp, exit=0)
+            return
+        if command != "generate":
+            send_message(fp, stderr=f"Unknown command: {command}\n")
+            send_message(fp, exit=2)
+            return
+
+        self.request_count += 1
+        # 语言文件可能在两次请求之间被修改，每次生成重新读取
+        get_labels.cache_clear()
+        stdout, stderr = MessageStream(fp, "stdout"), MessageStream(fp, "stderr")
+        exit_code = 0
+        cwd = os.getcwd()
+        # 请求逐个处理，可以安全地切换工作目录，使相对路径与客户端一致
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            try:
+                os.chdir(message["cwd"])
+                self.output.generate_from_module(message["path"], message["output"], **message.get("options", {}))
+            except Exception:
+                traceback.print_exc()
+                exit_code = 1
+            finally:
+                os.chdir(cwd)
+        if not stdout.closed:
+            send_message(fp, exit=exit_code)
+
+
+def serve_main(argv: Optional[list[str]] = None) -> int:
+    """
+    litedoc serve-daemon的入口
+    Args:
+        argv: 命令行参数，不含serve-daemon
+    Returns:
+        退出码
+    """
+    parser = argparse.ArgumentParser(prog="litedoc serve-daemon", description="Serve generate requests from litedoc --client on a Unix socket.")
+    parser.add_argument("--socket", default=None, type=str, help="Path of the Unix socket, defaults to $XDG_RUNTIME_DIR/litedoc.sock.")
+    parser.add_argument("--idle-timeout", default=DEFAULT_IDLE_TIMEOUT, type=float, help="Exit after this many seconds without requests.")
+    parser.add_argument("--cache-memory", default=DEFAULT_CACHE_MB, type=int, help="Size limit of the in-memory parse cache in MB.")
+    parser.add_argument("--stop", action="store_true", help="Stop the running daemon.")
+    parser.add_argument("--status", action="store_true", help="Show the state of the running daemon.")
+    args = parser.parse_args(argv)
+
+    if not hasattr(socket, "AF_UNIX"):
+        print("Error: serve-daemon requires Unix domain sockets, which this platform does not support.")
+        return 1
+    if args.stop or args.status:
+        exit_code = request({"command": "stop" if args.stop else "status"}, args.socket)
+        if exit_code is None:
+            print("No litedoc daemon is running")
+            return 1
+        return exit_code
+
+    try:
+        Daemon(args.socket, args.idle_timeout, args.cache_memory * 1024 * 1024).serve()
+    except RuntimeError as e:
+        print(f"Error: {e}")
+        return 1
+    except KeyboardInterrupt:
+        pass
+    return 0
@@ -0,0 +1,260 @@
+# -*- coding: utf-8 -*-
+"""
+源文件发现
+
+使用os.scandir遍历模块目录，在进入子目录之前用编译好的gitignore风格规则剪枝，并惰性产出源文件路径
+"""
+import os
+import re
+from typing import Iterable, Iterator, Optional
+
+DEFAULT_EXCLUDES = [
+        "__pycache__/",
+        "node_modules/",
+        ".*/",
+]
+"""默认排除的目录，这些目录中不会有可导入的Python模块"""
+
+SOURCE_SUFFIXES = (".py", ".pyi")
+
+
+def translate_glob(pattern: str) -> str:
+    """
+    将gitignore风格的glob转换为正则表达式，*和?不匹配/，**可匹配任意层目录
+    Args:
+        pattern: glob，不含首尾的/
+    Returns:
+        正则表达式
+    """
+    i, n = 0, len(pattern)
+    res = ""
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            if pattern.startswith("**/", i):
+                res += "(?:.*/)?"
+                i += 3
+                continue
+            if pattern.startswith("**", i):
+                res += ".*"
+                i += 2
+                continue
+            res += "[^/]*"
+        elif c == "?":
+            res += "[^/]"
+        elif c == "[":
+            end = pattern.find("]", i + 2 if pattern.startswith(("[!", "[^"), i) else i + 1)
+            if end == -1:
+                res += re.escape(c)
+            else:
+                body = pattern[i + 1:end]
+                if body[0] in "!^":
+                    body = "^" + body[1:]
+                res += "[" + body.replace("\\", "\\\\") + "]"
+                i = end
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            res += re.escape(pattern[i])
+        else:
+            res += re.escape(c)
+        i += 1
+    return res
+
+
+class PathMatcher:
+    def __init__(self, patterns: Iterable[str]):
+        """
+        编译一组gitignore风格的规则
+        - 空行和#开头的行被忽略，!开头为反向规则，后出现的规则优先
+        - 以/结尾的规则只匹配目录
+        - 含有/(末尾除外)的规则相对于基准目录，否则匹配任意层级的名称
+        Args:
+            patterns: 规则
+        """
+        self.rules: list[tuple[re.Pattern, bool, bool]] = []
+        """(正则, 是否为反向规则, 是否只匹配目录)"""
+        for pattern in patterns:
+            pattern = pattern.rstrip("\n")
+            if not pattern.strip() or pattern.startswith("#"):
+                continue
+            pattern = pattern.rstrip(" ") if not pattern.endswith("\\ ") else pattern
+            negate = pattern.startswith("!")
+            if negate:
+                pattern = pattern[1:]
+            dir_only = pattern.endswith("/")
+            pattern = pattern.rstrip("/")
+            if not pattern:
+                continue
+            if "/" in pattern:
+                regex = "^" + translate_glob(pattern.lstrip("/")) + "$"
+            else:
+                regex = "^(?:.*/)?" + translate_glob(pattern) + "$"
+            self.rules.append((re.compile(regex), negate, dir_only))
+
+        self.has_negation = any(negate for _, negate, _ in self.rules)
+        # 没有反向规则时，文件和目录分别合并为一个正则，每个路径只需匹配一次
+        self.file_regex = self._combine(rule for rule in self.rules if not rule[2])
+        self.dir_regex = self._combine(self.rules)
+
+    @staticmethod
+    def _combine(rules: Iterable[tuple[re.Pattern, bool, bool]]) -> Optional[re.Pattern]:
+        patterns = [regex.pattern for regex, _, _ in rules]
+        return re.compile("|".join(f"(?:{pattern})" for pattern in patterns)) if patterns else None
+
+    @classmethod
+    def from_file(cls, path: str) -> "PathMatcher":
+        """
+        从.gitignore文件读取规则
+        Args:
+            path: 文件路径
+        """
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            return cls(f.read().splitlines())
+
+    def match(self, rel_path: str, is_dir: bool) -> Optional[bool]:
+        """
+        匹配相对路径
+        Args:
+            rel_path: 相对于基准目录、以/分隔的路径
+            is_dir: 是否为目录
+        Returns:
+            True为排除，False为被反向规则保留，None为没有规则匹配
+        """
+        if not self.has_negation:
+            regex = self.dir_regex if is_dir else self.file_regex
+            return True if regex is not None and regex.match(rel_path) else None
+        for regex, negate, dir_only in reversed(self.rules):
+            if dir_only and not is_dir:
+                continue
+            if regex.match(rel_path):
+                return not negate
+        return None
+
+
+def find_parent_gitignores(folder: str) -> list[tuple[str, PathMatcher]]:
+    """
+    查找folder所在git仓库中，folder上级目录的.gitignore，由外到内排列
+    Args:
+        folder: 目录
+    Returns:
+        [(相对于.gitignore所在目录的folder路径前缀, 规则)]，folder不在git仓库中时为空
+    """
+    folder = os.path.abspath(folder)
+    found = []
+    directory = os.path.dirname(folder)
+    while True:
+        gitignore = os.path.join(directory, ".gitignore")
+        if os.path.isfile(gitignore):
+            found.append((os.path.relpath(folder, directory).replace(os.sep, "/") + "/", PathMatcher.from_file(gitignore)))
+        if os.path.exists(os.path.join(directory, ".git")):
+            return found[::-1]
+        parent = os.path.dirname(directory)
+        if parent == directory:
+            return []
+        directory = parent
+
+
+def iter_source_files(module_folder: str,
+                      exclude: Optional[Iterable[str]] = None,
+                      respect_gitignore: bool = False,
+                      ignored_paths: Optional[Iterable[str]] = None
+                      ) -> Iterator[str]:
+    """
+    惰性产出模块目录下的源文件，顺序与os.walk一致：先产出目录中的文件，再依次进入子目录
+    Args:
+        module_folder: 模块目录
+        exclude: 额外的排除规则，gitignore风格，相对于模块目录
+        respect_gitignore: 是否遵循.gitignore，包括git仓库中模块目录上级的.gitignore
+        ignored_paths: 兼容旧参数，路径中包含任一字符串即被排除
+    Returns:
+        源文件路径，以module_folder开头
+    """
+    exclude_matcher = PathMatcher(DEFAULT_EXCLUDES + list(exclude or []))
+    ignored_paths = [ignored_path.replace("\\", "/") for ignored_path in ignored_paths or [] if ignored_path]
+    ignored_regex = re.compile("|".join(map(re.escape, ignored_paths))) if ignored_paths else None
+    # (规则, 路径前缀, 需去掉的相对路径长度)，只作用于其所在目录之下
+    gitignores: list[tuple[PathMatcher, str, int]] = []
+    if respect_gitignore:
+        gitignores = [(matcher, prefix, 0) for prefix, matcher in find_parent_gitignores(module_folder)]
+
+    def is_excluded(path: str, rel_path: str, is_dir: bool, matchers: list[tuple[PathMatcher, str, int]]) -> bool:
+        if exclude_matcher.match(rel_path, is_dir):
+            return True
+        if ignored_regex is not None and ignored_regex.search(path.replace("\\", "/") + ("/" if is_dir else "")):
+            return True
+        result = None
+        for matcher, prefix, strip in matchers:
+            matched = matcher.match(prefix + rel_path[strip:], is_dir)
+            if matched is not None:
+                result = matched
+        return bool(result)
+
+    def walk(folder: str, rel_folder: str, matchers: list[tuple[PathMatcher, str, int]]) -> Iterator[str]:
+        try:
+            with os.scandir(folder) as it:
+                entries = list(it)
+        except OSError:
+            return
+        if respect_gitignore and any(entry.name == ".gitignore" and entry.is_file() for entry in entries):
+            matchers = matchers + [(PathMatcher.from_file(os.path.join(folder, ".gitignore")), "", len(rel_folder))]
+
+        sub_folders = []
+        for entry in entries:
+            rel_path = rel_folder + entry.name
+            try:
+                is_dir = entry.is_dir()
+            except OSError:
+                is_dir = False
+            if is_dir:
+                if not entry.is_symlink() and not is_excluded(entry.path, rel_path, True, matchers):
+                    sub_folders.append((entry.path, rel_path + "/"))
+            elif entry.name.endswith(SOURCE_SUFFIXES) and not is_excluded(entry.path, rel_path, False, matchers):
+                yield entry.path
+        for sub_folder, rel_sub_folder in sub_folders:
+            yield from walk(sub_folder, rel_sub_folder, matchers)
+
+    yield from walk(module_folder, "", gitignores)
+
+
+def iter_source_members(names: Iterable[str],
+                        exclude: Optional[Iterable[str]] = None,
+                        ignored_paths: Optional[Iterable[str]] = None,
+                        prefix: str = ""
+                        ) -> Iterator[str]:
+    """
+    从归档文件或git树等已知的路径列表中筛选源文件，规则与iter_source_files相同(不支持.gitignore)，
+    顺序与iter_source_files一致：先产出目录中的文件，再依次进入子目录
+    Args:
+        names: 相对于模块目录、以/分隔的文件路径
+        exclude: 额外的排除规则，gitignore风格，相对于模块目录
+        ignored_paths: 兼容旧参数，路径中包含任一字符串即被排除
+        prefix: 与ignored_paths匹配时加在路径前的模块目录
+    Returns:
+        相对路径
+    """
+    exclude_matcher = PathMatcher(DEFAULT_EXCLUDES + list(exclude or []))
+    ignored_paths = [ignored_path.replace("\\", "/") for ignored_path in ignored_paths or [] if ignored_path]
+    ignored_regex = re.compile("|".join(map(re.escape, ignored_paths))) if ignored_paths else None
+    excluded_dirs: dict[str, bool] = {}
+
+    def is_excluded(rel_path: str, is_dir: bool) -> bool:
+        if exclude_matcher.match(rel_path, is_dir):
+            return True
+        return ignored_regex is not None and bool(ignored_regex.search(prefix + rel_path + ("/" if is_dir else "")))
+
+    def is_dir_excluded(rel_dir: str) -> bool:
+        if not rel_dir:
+            return False
+        if rel_dir not in excluded_dirs:
+            parent = rel_dir.rpartition("/")[0]
+            excluded_dirs[rel_dir] = is_dir_excluded(parent) or is_excluded(rel_dir, True)
+        return excluded_dirs[rel_dir]
+
+    def walk_order(rel_path: str) -> list[tuple[int, str]]:
+        *dirs, name = rel_path.split("/")
+        return [(1, part) for part in dirs] + [(0, name)]
+
+    for rel_path in sorted(names, key=walk_order):
+        if (rel_path.endswith(SOURCE_SUFFIXES) and not is_dir_excluded(rel_path.rpartition("/")[0])
+                and not is_excluded(rel_path, False)):
+            yield rel_path
@@ -8,56 +8,216 @@ Copyright (C) 2020-2024 LiteyukiStudio. All Rights Reserved
 @File    : docstring.py
 @Software: PyCharm
 """
-from typing import Optional
+from typing import Any, ClassVar, Optional
 
-from pydantic import BaseModel, Field
+from litedoc.i18n import LabelBundle, get_labels
 
-from litedoc.i18n import get_text
 
+class FrozenList(list):
+    """只读列表，冻结后的模型中的列表字段使用此类型"""
 
-class Attr(BaseModel):
-    name: str
-    type: str = ""
-    desc: str = ""
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("frozen list is read-only")
 
+    append = extend = insert = remove = pop = clear = sort = reverse = _readonly
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _readonly
 
-class Args(BaseModel):
-    name: str
-    type: str = ""
-    desc: str = ""
+    def __reduce__(self):
+        return FrozenList, (list(self),)
 
 
-class Return(BaseModel):
-    desc: str = ""
+class FrozenDict(dict):
+    """只读字典，冻结后的模型中的字典字段使用此类型"""
 
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("frozen dict is read-only")
 
-class Exception_(BaseModel):
-    name: str
-    desc: str = ""
+    __setitem__ = __delitem__ = __ior__ = clear = pop = popitem = setdefault = update = _readonly
 
+    def __reduce__(self):
+        return FrozenDict, (dict(self),)
 
-class Raise(BaseModel):
-    exceptions: list[Exception_] = []
 
+class FreezableModel:
+    """
+    可冻结的轻量模型，冻结后字段及其中的列表、字典和子模型都不可再修改，用于在缓存中安全地共享同一对象
 
-class Example(BaseModel):
-    desc: str = ""
-    input: str = ""
-    output: str = ""
+    不依赖pydantic，导出接口model_dump()和model_validate()与pydantic兼容，需要校验时使用to_model()
+    """
+    __slots__ = ("_frozen",)
 
+    _defaults: ClassVar[dict[str, Any]] = {}
+    """字段名 -> 默认值，列表和字典默认值在每个实例中复制，子类以此声明__slots__"""
+    _children: ClassVar[dict[str, type["FreezableModel"]]] = {}
+    """字段名 -> 子模型类型，用于从导出数据恢复"""
 
-class Docstring(BaseModel):
-    raw: str = ""
-    desc: str = ""
-    args: list[Args] = []
-    attrs: list[Attr] = []
-    return_: Optional[Return] = None
-    raise_: list[Exception_] = []
-    example: Optional[str] = None
+    def __init__(self, **kwargs: Any):
+        object.__setattr__(self, "_frozen", False)
+        for name, default in self._defaults.items():
+            value = kwargs.pop(name, default)
+            object.__setattr__(self, name, value.copy() if value is default and isinstance(value, (list, dict)) else value)
+        if kwargs:
+            raise TypeError(f"{type(self).__name__} got unexpected fields: {', '.join(kwargs)}")
 
-    front_matter: Optional[dict[str, str]] = None
+    def __setattr__(self, name: str, value: Any):
+        if self._frozen:
+            raise TypeError(f"{type(self).__name__} is frozen, use mutable_copy() to get a modifiable copy")
+        object.__setattr__(self, name, value)
 
-    is_module: bool = False
+    @staticmethod
+    def _freeze_value(value: Any) -> Any:
+        if isinstance(value, FreezableModel):
+            return value.freeze()
+        if isinstance(value, list):
+            return FrozenList(FreezableModel._freeze_value(item) for item in value)
+        if isinstance(value, dict):
+            return FrozenDict((k, FreezableModel._freeze_value(v)) for k, v in value.items())
+        return value
+
+    def freeze(self):
+        """
+        冻结自身及所有子对象
+        Returns:
+            self
+        """
+        if not self._frozen:
+            for name in self._defaults:
+                object.__setattr__(self, name, self._freeze_value(getattr(self, name)))
+            object.__setattr__(self, "_frozen", True)
+        return self
+
+    @property
+    def frozen(self) -> bool:
+        return self._frozen
+
+    def mutable_copy(self):
+        """
+        Returns:
+            未冻结的深拷贝
+        """
+        return type(self).model_validate(self.model_dump())
+
+    def model_dump(self) -> dict[str, Any]:
+        """
+        Returns:
+            仅包含基本类型的字典
+        """
+        return {name: _dump(getattr(self, name)) for name in self._defaults}
+
+    @classmethod
+    def model_validate(cls, data: dict[str, Any]):
+        """
+        从model_dump的结果恢复
+        Args:
+            data: model_dump的结果
+        """
+        data = dict(data)
+        for name, value in data.items():
+            child_type = cls._children.get(name)
+            if isinstance(value, list):
+                data[name] = [child_type.model_validate(item) if child_type and isinstance(item, dict) else item for item in value]
+            elif isinstance(value, dict):
+                data[name] = child_type.model_validate(value) if child_type else dict(value)
+        return cls(**data)
+
+    def to_model(self):
+        """
+        构建经过校验的pydantic模型
+        Returns:
+            litedoc.docstring.model中的同名模型
+        """
+        from litedoc.docstring import model
+        return getattr(model, type(self).__name__).model_validate(self.model_dump())
+
+    def __eq__(self, other: Any) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self._defaults)
+
+    __hash__ = None  # type: ignore
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({', '.join(f'{name}={getattr(self, name)!r}' for name in self._defaults)})"
+
+    def __reduce__(self):
+        return _restore, (type(self), tuple(getattr(self, name) for name in self._defaults), self._frozen)
+
+
+def _dump(value: Any) -> Any:
+    if isinstance(value, FreezableModel):
+        return value.model_dump()
+    if isinstance(value, list):
+        return [_dump(item) for item in value]
+    if isinstance(value, dict):
+        return {k: _dump(v) for k, v in value.items()}
+    return value
+
+
+def _restore(cls: type[FreezableModel], values: tuple, frozen: bool) -> FreezableModel:
+    self = cls.__new__(cls)
+    for name, value in zip(cls._defaults, values):
+        object.__setattr__(self, name, value)
+    object.__setattr__(self, "_frozen", frozen)
+    return self
+
+
+class Attr(FreezableModel):
+    _defaults = {"name": "", "type": "", "desc": ""}
+    __slots__ = tuple(_defaults)
+
+
+class Args(FreezableModel):
+    _defaults = {"name": "", "type": "", "desc": ""}
+    __slots__ = tuple(_defaults)
+
+
+class Return(FreezableModel):
+    _defaults = {"desc": ""}
+    __slots__ = tuple(_defaults)
+
+
+class Exception_(FreezableModel):
+    _defaults = {"name": "", "desc": ""}
+    __slots__ = tuple(_defaults)
+
+
+class Raise(FreezableModel):
+    _defaults = {"exceptions": []}
+    __slots__ = tuple(_defaults)
+    _children = {"exceptions": Exception_}
+
+
+class Example(FreezableModel):
+    _defaults = {"desc": "", "input": "", "output": ""}
+    __slots__ = tuple(_defaults)
+
+
+class Docstring(FreezableModel):
+    _defaults = {
+            "raw"         : "",
+            "desc"        : "",
+            "args"        : [],
+            "attrs"       : [],
+            "return_"     : None,
+            "raise_"      : [],
+            "example"     : None,
+            "front_matter": None,
+            "is_module"   : False,
+    }
+    __slots__ = tuple(_defaults)
+    _children = {"args": Args, "attrs": Attr, "return_": Return, "raise_": Exception_}
+
+    raw: str
+    desc: str
+    args: list[Args]
+    attrs: list[Attr]
+    return_: Optional[Return]
+    raise_: list[Exception_]
+    example: Optional[str]
+
+    front_matter: Optional[dict[str, str]]
+
+    is_module: bool
 
     def add_desc(self, desc: str):
         if self.desc == "":
@@ -121,49 +281,21 @@ class Docstring(BaseModel):
                 ret += f"    {self.example}\n"
         return ret
 
-    def markdown(self, lang: str, indent: int = 4) -> str:
+    def markdown(self, lang: str, indent: int = 4, labels: Optional[LabelBundle] = None) -> str:
         """
         生成markdown文档
         Args:
             lang:
             indent:
+            labels: 标签包，为None时使用lang的内置标签
         Returns:
         """
-        PREFIX = "" * indent
-        ret = ""
-        # ret += self.desc + "\n\n"
-        # print(self.reduction())
-        # print(self.desc, self.return_)
-        # 单数属性
-        if self.desc:
-            if not self.is_module:
-                ret += PREFIX + f"**{get_text(lang, 'desc')}**: {self.desc}\n"
-            else:
-                ret += PREFIX + f"{self.desc}\n"
-
-        # 复数属性
-        if self.args:
-            ret += PREFIX + f"\n**{get_text(lang, 'docstring.args')}**:\n"
-            for arg in self.args:
-                ret += PREFIX + f"> - {arg.name}: {arg.type}  {arg.desc}\n"
-        if self.attrs:
-            ret += PREFIX + f"\n**{get_text(lang, 'docstring.attrs')}**:\n"
-            for attr in self.attrs:
-                ret += PREFIX + f"> - {attr.name}: {attr.type}  {attr.desc}\n"
-
-        # 单数属性
-        if self.return_ is not None:
-            ret += PREFIX + f"\n**{get_text(lang, 'docstring.return')}**: {self.return_.desc}\n"
-        # 复数属性
-        if self.example:
-            ret += PREFIX + f"\n**{get_text(lang, 'docstring.example')}**:\n"
-            ret += self.example + "\n"
-        if self.raise_:
-            ret += PREFIX + f"\n**{get_text(lang, 'docstring.raises')}**:\n"
-            for exception in self.raise_:
-                ret += PREFIX + f"> - {exception.name}  {exception.desc}\n"
-
-        return ret
+        if labels is None:
+            labels = get_labels(lang)
+        from litedoc.style.renderer import get_renderer  # 渲染器依赖语法节点，在此延迟导入
+        out: list[str] = []
+        get_renderer(labels).render_docstring(out, self)
+        return "".join(out)
 
     def __str__(self):
         return self.desc
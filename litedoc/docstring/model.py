@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""
+docstring解析结果的pydantic模型
+
+解析和渲染使用litedoc.docstring.docstring中不依赖pydantic的轻量模型，这里的模型只在需要校验或导出JSON Schema时
+由to_model()构建，字段与同名的轻量模型一致
+"""
+from typing import Optional
+
+from pydantic import BaseModel
+
+
+class Attr(BaseModel):
+    name: str
+    type: str = ""
+    desc: str = ""
+
+
+class Args(BaseModel):
+    name: str
+    type: str = ""
+    desc: str = ""
+
+
+class Return(BaseModel):
+    desc: str = ""
+
+
+class Exception_(BaseModel):
+    name: str
+    desc: str = ""
+
+
+class Raise(BaseModel):
+    exceptions: list[Exception_] = []
+
+
+class Example(BaseModel):
+    desc: str = ""
+    input: str = ""
+    output: str = ""
+
+
+class Docstring(BaseModel):
+    raw: str = ""
+    desc: str = ""
+    args: list[Args] = []
+    attrs: list[Attr] = []
+    return_: Optional[Return] = None
+    raise_: list[Exception_] = []
+    example: Optional[str] = None
+
+    front_matter: Optional[dict[str, str]] = None
+
+    is_module: bool = False
@@ -1,6 +1,8 @@
 """
 Google docstring parser for Python.
 """
+import hashlib
+from functools import lru_cache
 from typing import Optional
 
 from litedoc.docstring.docstring import Docstring
@@ -92,18 +94,32 @@ class GoogleDocstringParser(Parser):
             self.lineno += 1
         return line
 
+    @classmethod
+    def register_section(cls, header: str, token: str):
+        """
+        注册段落标题别名，例如register_section("Parameters", "args")
+        Args:
+            header: 段落标题，不含冒号
+            token: 段落类型，即_tokens中的值
+        """
+        # 复制一份，避免修改父类的表
+        cls._tokens = {**cls._tokens, header: token}
+        # 之前缓存的结果可能是按旧的表解析的
+        clear_parse_cache()
+
     def match_token(self) -> Optional[str]:
         """
-        解析下一行的token
+        解析下一行的token，整行去掉结尾的冒号后须与段落标题完全一致，例如"Args:"、"返回："
         Returns:
 
         """
-        for token in self._tokens:
-            line = self.read_line(move=False)
-            if line.strip().startswith(token):
-                self.lineno += 1
-                return self._tokens[token]
-        return None
+        header = self.read_line(move=False).strip()
+        if header.endswith((":", "：")):
+            header = header[:-1].rstrip()
+        token = self._tokens.get(header)
+        if token is not None:
+            self.lineno += 1
+        return token
 
     def parse_args(self):
         """
@@ -216,8 +232,62 @@ class ReStructuredParser(Parser):
     ...
 
 
-def parse(docstring: str, parser: str = "google", indent: int = 4, **kwargs) -> Docstring:
+PARSE_CACHE_SIZE = 4096
+"""进程内docstring解析缓存的最大条目数"""
+
+
+def parse_uncached(docstring: str, parser: str = "google", indent: int = 4, **kwargs) -> Docstring:
+    """
+    解析docstring，不使用缓存，返回的Docstring可以修改
+    """
     if parser == "google":
         return GoogleDocstringParser(docstring, indent, **kwargs).parse()
     else:
         raise ValueError(f"Unknown parser: {parser}")
+
+
+@lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_cached(docstring: str, parser: str, indent: int, is_module: bool) -> Docstring:
+    return parse_uncached(docstring, parser, indent, is_module=is_module).freeze()
+
+
+def parse(docstring: str, parser: str = "google", indent: int = 4, **kwargs) -> Docstring:
+    """
+    解析docstring，结果以(docstring, parser, indent, is_module)为键缓存在进程内的LRU中，
+    重复出现的docstring(重载、包装函数、子类中重复声明的方法等)只解析一次
+    Args:
+        docstring: 文档字符串
+        parser: 注释风格
+        indent: 缩进
+        **kwargs: 传给解析器的参数，除is_module外的参数会跳过缓存
+    Returns:
+        Docstring，使用缓存时为共享的冻结对象，修改前请调用mutable_copy()
+    """
+    if kwargs.keys() <= {"is_module"}:
+        return _parse_cached(docstring, parser, indent, bool(kwargs.get("is_module", False)))
+    return parse_uncached(docstring, parser, indent, **kwargs)
+
+
+def get_sections_fingerprint(parser: str = "google") -> str:
+    """
+    段落标题表的指纹，register_section后改变，计入磁盘和内存解析缓存的键
+    Args:
+        parser: 注释风格
+    Returns:
+        指纹
+    """
+    tokens = GoogleDocstringParser._tokens if parser == "google" else {}
+    return hashlib.sha256(repr(sorted(tokens.items())).encode("utf-8")).hexdigest()[:16]
+
+
+def parse_cache_info():
+    """
+    Returns:
+        缓存统计，包括hits、misses、maxsize、currsize
+    """
+    return _parse_cached.cache_info()
+
+
+def clear_parse_cache():
+    """清空缓存及其统计"""
+    _parse_cached.cache_clear()
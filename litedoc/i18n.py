@@ -2,6 +2,11 @@
 """
 Internationalization module.
 """
+import json
+import os
+from collections.abc import Iterator, Mapping
+from functools import lru_cache
+from types import MappingProxyType
 from typing import Optional, TypeAlias
 
 NestedDict: TypeAlias = dict[str, 'str | NestedDict']
@@ -130,3 +135,104 @@ def get_text(lang: str, key: str, default: Optional[str] = None, fallback: Optio
 
 
 litedoc_hide = "@litedoc-hide"
+
+
+REQUIRED_LABELS: tuple[str, ...] = (
+        "docstring.args",
+        "docstring.return",
+        "docstring.attribute",
+        "docstring.raises",
+        "docstring.example",
+        "module",
+        "src",
+        "desc",
+        "type",
+        "or",
+        "view_on_github",
+        "default_value",
+)
+"""生成文档时用到的标签，每种语言的标签包在应用回退后都必须包含这些键"""
+
+LOCALE_SUFFIX = ".json"
+
+
+class LabelBundle(Mapping[str, str]):
+    """
+    一种语言解析完成的只读标签表，回退语言已被合并，查找只需一次字典访问
+
+    访问不存在的键会抛出KeyError，而不是像get_text一样返回键名
+    """
+    __slots__ = ("lang", "_labels", "_hash")
+
+    def __init__(self, lang: str, labels: dict[str, str]):
+        """
+        Args:
+            lang: 语言
+            labels: 扁平化的标签，键形如docstring.args
+        """
+        self.lang = lang
+        self._labels = MappingProxyType(dict(labels))
+        self._hash = hash(frozenset(self._labels.items()))
+
+    def __getitem__(self, key: str) -> str:
+        try:
+            return self._labels[key]
+        except KeyError:
+            raise KeyError(f"label {key!r} is not defined for language {self.lang!r}") from None
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._labels)
+
+    def __len__(self) -> int:
+        return len(self._labels)
+
+    def __hash__(self) -> int:
+        return self._hash
+
+    def __repr__(self) -> str:
+        return f"LabelBundle({self.lang!r}, {dict(self._labels)!r})"
+
+    def __reduce__(self):
+        return LabelBundle, (self.lang, dict(self._labels))
+
+
+def load_locale_file(path: str) -> dict[str, str]:
+    """
+    读取外部语言文件，格式为与i18n_dict中单个语言相同结构的JSON
+    Args:
+        path: 文件路径
+    Returns:
+        扁平化的标签
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError(f"Locale file {path} must contain a JSON object")
+    return flat_i18n_dict({"": data})[""]
+
+
+@lru_cache(maxsize=None)
+def get_labels(lang: str, fallback: Optional[str] = "en", locale_dirs: tuple[str, ...] = ()) -> LabelBundle:
+    """
+    获取语言的标签包，每个进程中每组参数只构建一次
+    优先级：locale_dirs中的<lang>.json(靠后的目录优先) > 内置表 > 回退语言
+    Args:
+        lang: 语言
+        fallback: 回退语言，同样会从locale_dirs中查找
+        locale_dirs: 外部语言文件所在目录，只在需要该语言时读取
+    Returns:
+        LabelBundle
+    Raises:
+        ValueError: 回退后仍缺少REQUIRED_LABELS中的标签
+    """
+    labels = dict(get_labels(fallback, None, locale_dirs)) if fallback is not None and fallback != lang else {}
+    labels.update(i18n_flat_dict.get(lang, {}))
+    for locale_dir in locale_dirs:
+        path = os.path.join(locale_dir, lang + LOCALE_SUFFIX)
+        if os.path.isfile(path):
+            labels.update(load_locale_file(path))
+
+    missing = [key for key in REQUIRED_LABELS if key not in labels]
+    if missing:
+        raise ValueError(f"Missing labels for language {lang!r}: {', '.join(missing)}")
+    return LabelBundle(lang, labels)
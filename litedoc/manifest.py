@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+增量构建清单
+
+输出目录下的清单记录每个源文件的内容哈希及其输出文件，源文件未变化时跳过生成，源文件被删除或改名时清理其旧输出
+"""
+import hashlib
+import json
+import os
+from functools import lru_cache
+from typing import Any
+
+MANIFEST_NAME = ".litedoc-manifest.json"
+MANIFEST_FORMAT = 1
+
+
+def hash_bytes(data: bytes) -> str:
+    """
+    计算内容哈希
+    Args:
+        data: 内容
+    Returns:
+        十六进制哈希
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+@lru_cache(maxsize=None)
+def get_litedoc_version() -> str:
+    """
+    获取当前litedoc的版本，未安装时(例如直接从源码运行)使用litedoc源码的哈希，保证代码变化后清单失效
+    Returns:
+        版本字符串
+    """
+    from importlib.metadata import PackageNotFoundError, version
+    try:
+        return version("litedoc")
+    except PackageNotFoundError:
+        package_dir = os.path.dirname(os.path.abspath(__file__))
+        digest = hashlib.sha256()
+        for root, dirs, files in os.walk(package_dir):
+            dirs.sort()
+            for file in sorted(files):
+                if file.endswith(".py"):
+                    with open(os.path.join(root, file), "rb") as f:
+                        digest.update(f.read())
+        return f"0+src.{digest.hexdigest()[:12]}"
+
+
+def get_options_fingerprint(**options: Any) -> str:
+    """
+    计算影响输出内容的选项的指纹
+    Args:
+        **options: 选项
+    Returns:
+        指纹
+    """
+    return hash_bytes(json.dumps(options, sort_keys=True, default=str).encode("utf-8"))
+
+
+class Manifest:
+    def __init__(self, output_dir: str, build_key: str, fingerprint: str):
+        """
+        加载输出目录下的清单，同一输出目录可以存放多个模块的构建，以build_key区分，互不清理
+        Args:
+            output_dir: 输出目录
+            build_key: 构建标识，通常为模块路径
+            fingerprint: 选项指纹
+        """
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, MANIFEST_NAME)
+        self.build_key = build_key
+        self.version = get_litedoc_version()
+        self.fingerprint = fingerprint
+
+        self.builds: dict[str, dict] = {}
+        """所有构建，build_key -> 构建信息"""
+        self.previous: dict[str, dict] = {}
+        """上次构建的源文件记录，源文件路径 -> {"hash": 内容哈希, "outputs": 相对输出路径列表}"""
+        self.current: dict[str, dict] = {}
+        """本次构建的源文件记录"""
+        self.reusable = False
+        """上次构建的版本和选项与本次一致，未变化的源文件可跳过"""
+
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict) or data.get("format") != MANIFEST_FORMAT:
+            return
+        self.builds = data.get("builds", {})
+        build = self.builds.get(self.build_key)
+        if build is None:
+            return
+        self.previous = build.get("sources", {})
+        self.reusable = build.get("version") == self.version and build.get("fingerprint") == self.fingerprint
+
+    def is_fresh(self, source: str, content_hash: str) -> bool:
+        """
+        判断源文件是否可以跳过，可以跳过时会将上次的记录带入本次构建
+        Args:
+            source: 源文件路径
+            content_hash: 源文件内容哈希
+        Returns:
+            是否可以跳过
+        """
+        if not self.reusable:
+            return False
+        entry = self.previous.get(source)
+        if entry is None or entry.get("hash") != content_hash:
+            return False
+        if not all(os.path.exists(os.path.join(self.output_dir, output)) for output in entry["outputs"]):
+            return False
+        self.current[source] = entry
+        return True
+
+    def record(self, source: str, content_hash: str, output_paths: list[str]):
+        """
+        记录本次生成的源文件
+        Args:
+            source: 源文件路径
+            content_hash: 源文件内容哈希
+            output_paths: 输出文件路径
+        """
+        self.current[source] = {
+                "hash"   : content_hash,
+                "outputs": [os.path.relpath(output, self.output_dir).replace("\\", "/") for output in output_paths],
+        }
+
+    def keep_previous(self, source: str):
+        """
+        将上次构建的记录带入本次构建，用于生成失败的源文件：保留其旧输出，哈希仍为旧内容的哈希，下次构建时会重试
+        Args:
+            source: 源文件路径
+        """
+        self.current.pop(source, None)
+        if source in self.previous:
+            self.current[source] = self.previous[source]
+
+    def remove_stale(self) -> list[str]:
+        """
+        删除上次构建产生、本次构建不再产生的输出文件，并清理因此变空的目录
+        Returns:
+            被删除的文件路径
+        """
+        current_outputs = {output for entry in self.current.values() for output in entry["outputs"]}
+        removed = []
+        for entry in self.previous.values():
+            for output in entry["outputs"]:
+                if output in current_outputs:
+                    continue
+                path = os.path.join(self.output_dir, output)
+                if os.path.isfile(path):
+                    os.remove(path)
+                    removed.append(path)
+                    self._remove_empty_dirs(os.path.dirname(path))
+                current_outputs.add(output)
+        return removed
+
+    def _remove_empty_dirs(self, directory: str):
+        root = os.path.abspath(self.output_dir)
+        directory = os.path.abspath(directory)
+        while directory != root and directory.startswith(root) and not os.listdir(directory):
+            os.rmdir(directory)
+            directory = os.path.dirname(directory)
+
+    def save(self):
+        self.builds[self.build_key] = {
+                "version"    : self.version,
+                "fingerprint": self.fingerprint,
+                "sources"    : self.current,
+        }
+        os.makedirs(self.output_dir, exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"format": MANIFEST_FORMAT, "builds": self.builds}, f, ensure_ascii=False, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
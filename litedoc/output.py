@@ -9,35 +9,152 @@ Copyright (C) 2020-2024 LiteyukiStudio. All Rights Reserved
 @Software: PyCharm
 """
 import os.path
+import sys
+import threading
 import traceback
-from typing import Optional
+from collections import deque
+from concurrent.futures import Future
+from functools import lru_cache
+from itertools import islice
+from queue import Queue
+from typing import Iterable, Iterator, NamedTuple, Optional
 
+from litedoc import profiling
+from litedoc.cache import DEFAULT_CACHE_SIZE, MemoryParseCache, ParseCache, get_cache_key
+from litedoc.docstring.parser import parse_cache_info
+from litedoc.discovery import iter_source_files
+from litedoc.i18n import get_labels
+from litedoc.manifest import Manifest, get_options_fingerprint, hash_bytes
+from litedoc.sources import close_sources, get_source, is_source_path, read_source
 from litedoc.style.markdown import generate
 from litedoc.syntax.astparser import AstParser
+from litedoc.syntax.node import lazy_counter
 
 
-def write_to_file(content: str, output: str) -> None:
+def encode_content(content: str) -> bytes:
     """
-    Write content to file.
+    Encode content the way a text-mode write would put it on disk.
 
     Args:
-        content: str, content to write.
+        content: str, content to encode.
+    Returns:
+        bytes, utf-8 data with platform line endings.
+    """
+    return content.encode("utf-8") if os.linesep == "\n" else content.replace("\n", os.linesep).encode("utf-8")
+
+
+def write_data_to_file(data: bytes, output: str) -> bool:
+    """
+    Write encoded data to file.
+
+    The file is left untouched when its content is already identical, otherwise
+    it is written to a temporary file and renamed over the target atomically.
+
+    Args:
+        data: bytes, encoded content to write.
         output: str, path to output file.
+    Returns:
+        bool, whether the file was written.
     """
+    try:
+        if os.path.getsize(output) == len(data):
+            with open(output, "rb") as f:
+                if f.read() == data:
+                    return False
+    except OSError:
+        pass
+
     if not os.path.exists(os.path.dirname(output)):
-        os.makedirs(os.path.dirname(output))
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+
+    tmp_output = os.path.join(os.path.dirname(output), f".{os.path.basename(output)}.{os.getpid()}.tmp")
+    try:
+        with open(tmp_output, "wb") as f:
+            f.write(data)
+        os.replace(tmp_output, output)
+    except BaseException:
+        if os.path.exists(tmp_output):
+            os.remove(tmp_output)
+        raise
+    return True
+
+
+def write_to_file(content: str, output: str) -> bool:
+    """
+    Write content to file, see write_data_to_file.
+
+    Args:
+        content: str, content to write.
+        output: str, path to output file.
+    Returns:
+        bool, whether the file was written.
+    """
+    return write_data_to_file(encode_content(content), output)
+
+
+class OutputWriter:
+    """
+    后台写入线程，生成结果经有界队列送入，生成与磁盘IO重叠进行，且内存中最多只保留队列长度的页面
+    """
+
+    def __init__(self, queue_size: int = 32):
+        """
+        Args:
+            queue_size: 队列长度，队列满时提交方阻塞
+        """
+        self.queue: Queue[Optional[tuple[str, list[str], str]]] = Queue(maxsize=queue_size)
+        self.written_count = 0
+        self.unchanged_count = 0
+        self.failed_sources: dict[str, str] = {}
+        """写入失败的源文件 -> 异常信息"""
+        self.thread = threading.Thread(target=self._run, name="litedoc-writer", daemon=True)
+        self.thread.start()
+
+    def submit(self, pyfile_path: str, output_paths: list[str], content: str):
+        """
+        提交一个页面，内容只编码一次，所有输出路径共用同一份数据
+        Args:
+            pyfile_path: 源文件路径
+            output_paths: 输出路径
+            content: markdown内容
+        """
+        self.queue.put((pyfile_path, output_paths, content))
 
-    with open(output, "w", encoding="utf-8") as f:
-        f.write(content)
+    def close(self):
+        """等待队列中的页面全部写入"""
+        self.queue.put(None)
+        self.thread.join()
 
+    def _run(self):
+        while (item := self.queue.get()) is not None:
+            pyfile_path, output_paths, content = item
+            # 任何异常都只记为该源文件失败，线程必须继续取出队列，否则submit和close会一直阻塞
+            with profiling.file(pyfile_path), profiling.stage("write"):
+                try:
+                    data = encode_content(content)
+                except Exception as e:
+                    self.failed_sources[pyfile_path] = f"{output_paths[0]}: {e}"
+                    continue
+                for output_path in output_paths:
+                    try:
+                        if write_data_to_file(data, output_path):
+                            self.written_count += 1
+                        else:
+                            self.unchanged_count += 1
+                    except Exception as e:
+                        self.failed_sources[pyfile_path] = f"{output_path}: {e}"
 
-def get_file_list(module_folder: str):
-    file_list = []
-    for root, dirs, files in os.walk(module_folder):
-        for file in files:
-            if file.endswith((".py", ".pyi")):
-                file_list.append(os.path.join(root, file))
-    return file_list
+
+def get_file_list(module_folder: str, **kwargs) -> list[str]:
+    """
+    获取模块目录下的所有源文件
+    Args:
+        module_folder: 模块目录
+        **kwargs: 传给iter_source_files的参数
+    Returns:
+        源文件路径列表
+    """
+    return list(iter_source_files(module_folder, **kwargs))
 
 
 def get_relative_path(base_path: str, target_path: str) -> str:
@@ -50,65 +167,155 @@ def get_relative_path(base_path: str, target_path: str) -> str:
     return os.path.relpath(target_path, base_path)
 
 
-def generate_from_module(module_folder: str,
-                         output_dir: str,
-                         with_top: bool = False,
-                         lang: str = "zh-Hans",
-                         ignored_paths=None,
-                         theme: str = "vitepress",
-                         style: str = "google",
-                         frontmatter: Optional[dict] = None,
-                         **kwargs
-                         ):
+def parse_langs(lang: str | Iterable[str]) -> list[str]:
     """
-    生成文档
+    解析语言参数
     Args:
-        module_folder: 模块文件夹
-        output_dir: 输出文件夹
-        with_top: 是否包含顶层文件夹 False时例如docs/api/module_a, docs/api/module_b， True时例如docs/api/module/module_a.md， docs/api/module/module_b.md
-        ignored_paths: 忽略的路径
-        lang: 语言
-        theme: 主题
-        style: 样式
-        frontmatter:
+        lang: 语言，可以是逗号分隔的多个语言，例如"en,zh-Hans"，或语言列表
+    Returns:
+        去重后的语言列表
     """
-    if ignored_paths is None:
-        ignored_paths = []
-    file_data: dict[str, str] = {}  # 路径 -> 字串
+    if isinstance(lang, str):
+        lang = lang.split(",")
+    return list(dict.fromkeys(item.strip() for item in lang if item.strip()))
 
-    file_list = get_file_list(module_folder)
 
-    # 清理输出目录
-    if not os.path.exists(output_dir):
-        os.makedirs(output_dir)
+def get_output_roots(output_dir: str, langs: list[str]) -> dict[str, str]:
+    """
+    获取每种语言的输出根目录
+    Args:
+        output_dir: 输出文件夹，包含{lang}时以语言替换，例如docs/{lang}/api
+        langs: 语言列表
+    Returns:
+        语言 -> 输出根目录，output_dir不含{lang}时，单语言为output_dir本身，多语言为output_dir下以语言命名的子目录
+    """
+    if "{lang}" in output_dir:
+        return {lang: output_dir.replace("{lang}", lang) for lang in langs}
+    if len(langs) == 1:
+        return {langs[0]: output_dir}
+    return {lang: os.path.join(output_dir, lang) for lang in langs}
 
-    replace_data = {
-            "__init__": "index" if theme == "vitepress" else "README",
-            ".py"     : ".md",
-    }
 
-    total_file_count = len(file_list)
-    generate_file_count = 0
-    for pyfile_path in file_list:
+class RenderedPage(NamedTuple):
+    """单个文件在一种语言下的页面"""
+    lang: str
+    output_paths: list[str]
+    """输出路径，第一个为主文件，其余为内容相同的副本"""
+    content: str
+    """markdown内容"""
+
+
+class RenderResult(NamedTuple):
+    """单个文件的生成结果"""
+    pyfile_path: str
+    pages: list[RenderedPage]
+    """每种语言的页面，出错时为空"""
+    error: Optional[str] = None
+    """出错时的异常信息"""
+    error_traceback: Optional[str] = None
+    """出错时的异常堆栈"""
+    cache_hit: Optional[bool] = None
+    """是否命中解析缓存，未使用缓存时为None"""
+
+
+@lru_cache(maxsize=None)
+def get_parse_cache(cache_dir: str, cache_size: int = DEFAULT_CACHE_SIZE) -> ParseCache:
+    """
+    获取当前进程中的解析缓存实例
+    Args:
+        cache_dir: 缓存目录
+        cache_size: 缓存容量，字节
+    """
+    return ParseCache(cache_dir, cache_size)
+
+
+memory_parse_cache: Optional[MemoryParseCache] = None
+"""常驻进程(例如serve-daemon)中启用的内存解析缓存，为None时不使用，与cache_dir可同时使用"""
+
+
+def render_file(pyfile_path: str,
+                module_folder: str,
+                output_dir: str,
+                with_top: bool = False,
+                lang: str | list[str] = "zh-Hans",
+                theme: str = "vitepress",
+                style: str = "google",
+                frontmatter: Optional[dict] = None,
+                cache_dir: Optional[str] = None,
+                cache_size: int = DEFAULT_CACHE_SIZE,
+                locale_dirs: tuple[str, ...] = (),
+                source: Optional[str] = None,
+                rev: Optional[str] = None,
+                content: Optional[bytes] = None,
+                **kwargs
+                ) -> RenderResult:
+    """
+    解析单个文件一次，并生成每种语言的markdown，不写入文件，异常会被捕获并放入结果
+    Args:
+        pyfile_path: Python文件路径
+        module_folder: 模块文件夹
+        output_dir: 输出文件夹，多语言时见get_output_roots
+        lang: 语言，可以是多个
+        cache_dir: 解析缓存目录，None为不使用缓存
+        cache_size: 解析缓存容量，字节
+        locale_dirs: 外部语言文件所在目录
+        source: 源码来源的模块路径(例如归档)，见litedoc.sources，此时pyfile_path和module_folder为虚拟路径，None为本地文件
+        rev: 从git修订中读取source，见litedoc.sources.GitSource
+        content: 已读取的源文件内容，None时读取pyfile_path
+        其余参数同generate_from_module，启用memory_parse_cache时优先从内存缓存中读取解析结果
+    Returns:
+        RenderResult
+    """
+    with profiling.file(pyfile_path):
         try:
-            if any(ignored_path.replace("\\", "/") in pyfile_path.replace("\\", "/") for ignored_path in ignored_paths):
-                continue
+            replace_data = {
+                    "__init__": "index" if theme == "vitepress" else "README",
+                    ".py"     : ".md",
+            }
             no_module_name_pyfile_path = get_relative_path(module_folder, pyfile_path)  # 去头路径
             # markdown相对路径
             rel_md_path = pyfile_path if with_top else no_module_name_pyfile_path
             for rk, rv in replace_data.items():
                 rel_md_path = rel_md_path.replace(rk, rv)
             base_name = os.path.basename(rel_md_path)  # index.md
-            abs_md_path = os.path.join(output_dir, rel_md_path)  # 最终输出路径
-
-            create_same_path = os.path.join(os.path.dirname(abs_md_path), os.path.basename(os.path.dirname(abs_md_path))) + ".md"
 
             title = (pyfile_path.replace("\\", "/")
                      .replace("/", ".")
                      .replace(".py", "")
                      .replace(".__init__", ""))
             # 获取模块信息
-            ast_parser = AstParser(open(pyfile_path, "r", encoding="utf-8").read(), title=title, style=style, file_path=no_module_name_pyfile_path)
+            cache_hit = None
+            memory_cache = memory_parse_cache
+            cache = get_parse_cache(cache_dir, cache_size) if cache_dir is not None else None
+            if content is None:
+                with profiling.stage("read"):
+                    content = read_source(pyfile_path, source, rev)
+            # 与文本模式读取一致，统一换行符，命中缓存时用于计算延迟的源码字段
+            code = content.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+            if cache is None and memory_cache is None:
+                with profiling.stage("extract"):
+                    ast_parser = AstParser(code, title=title, style=style, file_path=no_module_name_pyfile_path)
+            else:
+                with profiling.stage("cache"):
+                    cache_key = get_cache_key(content, style)
+                    cache_data = memory_cache.get(cache_key) if memory_cache is not None else None
+                    if cache_data is None and cache is not None:
+                        cache_data = cache.get(cache_key)
+                        if cache_data is not None and memory_cache is not None:
+                            memory_cache.put(cache_key, cache_data, len(content))
+                    cache_hit = cache_data is not None
+                if cache_hit:
+                    with profiling.stage("cache"):
+                        ast_parser = AstParser.from_data(cache_data, title=title, style=style, file_path=no_module_name_pyfile_path, code=code)
+                else:
+                    with profiling.stage("extract"):
+                        ast_parser = AstParser(code, title=title, style=style, file_path=no_module_name_pyfile_path)
+                    with profiling.stage("cache"):
+                        cache_data = ast_parser.to_data()
+                        if cache is not None:
+                            cache.put(cache_key, cache_data)
+                        if memory_cache is not None:
+                            memory_cache.put(cache_key, cache_data, len(content))
             # 生成markdown
             config_front_matter = {
                     "title": title,
@@ -120,16 +327,269 @@ def generate_from_module(module_folder: str,
             if base_name == "index.md":
                 config_front_matter["collapsed"] = "true"
 
-            md_content = generate(ast_parser, lang=lang, frontmatter=config_front_matter, **kwargs)
-            file_data[abs_md_path] = md_content
-            if kwargs.get("cs", False) and base_name == "index.md":
-                file_data[create_same_path] = md_content
-            print(f"Output {pyfile_path} -> {abs_md_path}")
-            generate_file_count += 1
+            # 同一解析结果生成每种语言的页面，生成过程不修改解析结果
+            pages = []
+            for page_lang, lang_output_dir in get_output_roots(output_dir, parse_langs(lang)).items():
+                abs_md_path = os.path.join(lang_output_dir, rel_md_path)  # 最终输出路径
+                output_paths = [abs_md_path]
+                if kwargs.get("cs", False) and base_name == "index.md":
+                    create_same_path = os.path.join(os.path.dirname(abs_md_path), os.path.basename(os.path.dirname(abs_md_path))) + ".md"
+                    output_paths.append(create_same_path)
+                labels = get_labels(page_lang, locale_dirs=locale_dirs)
+                with profiling.stage("render"):
+                    md_content = generate(ast_parser, lang=page_lang, frontmatter=config_front_matter, labels=labels, **kwargs)
+                pages.append(RenderedPage(page_lang, output_paths, md_content))
+            return RenderResult(pyfile_path, pages, cache_hit=cache_hit)
         except Exception as e:
-            print(f"Error in {pyfile_path}: {e}")
-            traceback.print_exc()
+            return RenderResult(pyfile_path, [], str(e), traceback.format_exc())
+
+
+worker_docstring_cache_stats = [0, 0]
+"""子进程中docstring解析缓存的[命中, 未命中]次数之和"""
+
+
+def _render_chunk_in_worker(chunk: list[tuple[str, Optional[bytes]]], profile: bool = False, **kwargs) -> tuple[list[RenderResult], tuple[dict[str, int], dict[str, int]], tuple[int, int], Optional[dict]]:
+    """
+    子进程中对一块(文件路径, 已读取的内容)执行render_file，并带回这些文件的延迟字段统计、docstring缓存统计，以及启用计时时的计时统计
+    """
+    lazy_counter.reset()
+    before = parse_cache_info()
+    # fork出的子进程继承了父进程的计时器及其已有的统计，丢弃后重新计时，否则合并时会重复计入
+    profiling.disable()
+    if profile:
+        profiling.enable()
+    try:
+        results = [render_file(pyfile_path, content=content, **kwargs) for pyfile_path, content in chunk]
+    finally:
+        profiler = profiling.disable()
+    after = parse_cache_info()
+    profile_snapshot = profiler.snapshot() if profiler is not None else None
+    return results, lazy_counter.snapshot(), (after.hits - before.hits, after.misses - before.misses), profile_snapshot
+
+
+def render_files(file_list: Iterable[str], jobs: int = 1, chunksize: int = 8, contents: Optional[dict[str, bytes]] = None, **kwargs) -> Iterator[RenderResult]:
+    """
+    按file_list的顺序逐个产出生成结果，file_list可以是惰性的迭代器
+    Args:
+        file_list: Python文件路径
+        jobs: 进程数，1为在当前进程中串行生成，0为使用全部CPU
+        chunksize: 并行时每个任务包含的文件数
+        contents: 已读取的源文件内容，可以随file_list的迭代而填充，生成时从中取出，其中没有的文件由render_file读取
+        **kwargs: 传给render_file的参数
+    Returns:
+        RenderResult迭代器
+    """
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    if contents is None:
+        contents = {}
+    if jobs <= 1:
+        for pyfile_path in file_list:
+            yield render_file(pyfile_path, content=contents.pop(pyfile_path, None), **kwargs)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor  # 导入multiprocessing较慢，仅在并行时导入
+
+    # 边发现边分块提交，每个进程最多积压2块，结果按提交顺序取回
+    file_iter = iter(file_list)
+    pending: deque[Future] = deque()
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        while chunk := [(pyfile_path, contents.pop(pyfile_path, None)) for pyfile_path in islice(file_iter, chunksize)]:
+            pending.append(executor.submit(_render_chunk_in_worker, chunk, profile=profiling.active is not None, **kwargs))
+            while len(pending) > jobs * 2:
+                yield from _collect_chunk(pending.popleft())
+        while pending:
+            yield from _collect_chunk(pending.popleft())
+
+
+def _collect_chunk(future: Future) -> list[RenderResult]:
+    results, snapshot, (hits, misses), profile_snapshot = future.result()
+    lazy_counter.merge(snapshot)
+    if profile_snapshot is not None and profiling.active is not None:
+        profiling.active.merge(profile_snapshot)
+    worker_docstring_cache_stats[0] += hits
+    worker_docstring_cache_stats[1] += misses
+    return results
+
+
+BUILD_ONLY_OPTIONS = ("ignored_paths", "jobs", "incremental", "exclude", "respect_gitignore", "cache_dir", "cache_size", "locale_dirs", "rev")
+"""generate_from_module中只影响如何构建、不影响页面内容的参数，不计入清单指纹"""
+
+
+def get_content_options(module_folder: str,
+                        langs: list[str],
+                        with_top: bool = False,
+                        theme: str = "vitepress",
+                        style: str = "google",
+                        frontmatter: Optional[dict] = None,
+                        **kwargs) -> dict:
+    """
+    获取影响页面内容的选项，generate_from_module和监视模式以同样的方式计算清单指纹
+    Args:
+        module_folder: 模块文件夹
+        langs: 语言列表
+        其余参数同generate_from_module，BUILD_ONLY_OPTIONS中的参数被忽略
+    Returns:
+        选项
+    """
+    return dict(
+        module_folder=module_folder,
+        with_top=with_top,
+        lang=langs,
+        theme=theme,
+        style=style,
+        frontmatter=frontmatter,
+        **{key: value for key, value in kwargs.items() if key not in BUILD_ONLY_OPTIONS}
+    )
+
+
+def get_manifests(module_folder: str, output_roots: dict[str, str], labels: dict[str, dict], options: dict) -> dict[str, Manifest]:
+    """
+    加载每个语言的输出根目录下的清单，指纹只包含该语言及其标签
+    Args:
+        module_folder: 模块文件夹
+        output_roots: 语言 -> 输出根目录
+        labels: 语言 -> 标签
+        options: 影响输出内容的选项
+    Returns:
+        语言 -> 清单
+    """
+    build_key = os.path.normpath(module_folder).replace("\\", "/")
+    return {
+            page_lang: Manifest(lang_output_dir, build_key,
+                                get_options_fingerprint(**{**options, "lang": page_lang, "labels": labels[page_lang]}))
+            for page_lang, lang_output_dir in output_roots.items()
+    }
+
+
+def generate_from_module(module_folder: str,
+                         output_dir: str,
+                         with_top: bool = False,
+                         lang: str | list[str] = "zh-Hans",
+                         ignored_paths=None,
+                         theme: str = "vitepress",
+                         style: str = "google",
+                         frontmatter: Optional[dict] = None,
+                         jobs: int = 1,
+                         incremental: bool = False,
+                         exclude: Optional[list[str]] = None,
+                         respect_gitignore: bool = False,
+                         cache_dir: Optional[str] = None,
+                         cache_size: int = DEFAULT_CACHE_SIZE,
+                         locale_dirs: Optional[list[str]] = None,
+                         rev: Optional[str] = None,
+                         **kwargs
+                         ):
+    """
+    生成文档
+    Args:
+        module_folder: 模块文件夹，也可以是wheel、zip或tar归档，或归档路径后接归档内的目录，见litedoc.sources
+        output_dir: 输出文件夹
+        with_top: 是否包含顶层文件夹 False时例如docs/api/module_a, docs/api/module_b， True时例如docs/api/module/module_a.md， docs/api/module/module_b.md
+        ignored_paths: 忽略的路径，路径中包含其中任一字符串即被忽略
+        lang: 语言，可以是逗号分隔的多个语言或语言列表，每个文件只解析一次，各语言输出到各自的根目录，见get_output_roots
+        theme: 主题
+        style: 样式
+        frontmatter:
+        jobs: 并行生成的进程数，1为串行，0为使用全部CPU
+        incremental: 是否增量构建，为True时在输出目录中记录清单，跳过内容和选项均未变化的文件，并清理已删除源文件的旧输出，命令行默认开启
+        exclude: 排除规则，gitignore风格，相对于模块文件夹
+        respect_gitignore: 是否遵循.gitignore
+        cache_dir: 解析缓存目录，None为不使用缓存
+        cache_size: 解析缓存容量，字节，超出时淘汰最久未使用的条目
+        locale_dirs: 外部语言文件所在目录，其中的<语言>.json覆盖或补充内置的标签，靠后的目录优先
+        rev: git修订，不为None时从仓库中该修订的module_folder读取源文件，不检出也不读取工作区
+    """
+    lazy_counter.reset()
+    worker_docstring_cache_stats[:] = [0, 0]
+    docstring_cache_before = parse_cache_info()
+
+    langs = parse_langs(lang)
+    # get_labels以目录为缓存键，转为绝对路径，避免常驻进程切换工作目录后命中其他目录的标签
+    locale_dirs = tuple(os.path.abspath(locale_dir) for locale_dir in locale_dirs or ())
+    # 在开始生成前构建所有语言的标签包，缺少标签时立即报错
+    labels = {page_lang: dict(get_labels(page_lang, locale_dirs=locale_dirs)) for page_lang in langs}
+    output_roots = get_output_roots(output_dir, langs)
+    for lang_output_dir in output_roots.values():
+        if not os.path.exists(lang_output_dir):
+            os.makedirs(lang_output_dir)
+
+    # 归档等非目录来源以虚拟的模块目录代替，清单仍以原始路径区分
+    source = None
+    if is_source_path(module_folder, rev):
+        source, module_folder = module_folder, get_source(module_folder, rev).module_folder
+
+    options = get_content_options(module_folder, langs, with_top=with_top, theme=theme, style=style, frontmatter=frontmatter, **kwargs)
+    manifests = get_manifests(source or module_folder, output_roots, labels, options) if incremental else {}
+
+    total_file_count = 0
+    generate_file_count = 0
+    unchanged_file_count = 0
+    cache_hit_count = 0
+    content_hashes: dict[str, str] = {}  # 路径 -> 源文件哈希
+    contents: dict[str, bytes] = {}  # 为计算哈希已读取、尚未生成的源文件内容，生成时不再读取
+
+    def iter_render_list() -> Iterator[str]:
+        """边发现边过滤出需要生成的文件"""
+        nonlocal total_file_count, unchanged_file_count
+        discover_options = dict(exclude=exclude, respect_gitignore=respect_gitignore, ignored_paths=ignored_paths)
+        if source is not None:
+            source_files = get_source(source, rev).iter_files(**discover_options)
+        else:
+            source_files = iter_source_files(module_folder, **discover_options)
+        for pyfile_path in profiling.timed_iter(source_files, "discover"):
+            total_file_count += 1
+            if manifests:
+                with profiling.file(pyfile_path), profiling.stage("read"):
+                    content = read_source(pyfile_path, source, rev)
+                    content_hashes[pyfile_path] = hash_bytes(content)
+                if all(manifest.is_fresh(pyfile_path, content_hashes[pyfile_path]) for manifest in manifests.values()):
+                    unchanged_file_count += 1
+                    continue
+                contents[pyfile_path] = content
+            yield pyfile_path
+
+    writer = OutputWriter()
+    try:
+        for result in render_files(iter_render_list(), jobs=jobs, contents=contents, output_dir=output_dir, cache_dir=cache_dir, cache_size=cache_size,
+                                   locale_dirs=locale_dirs, source=source, rev=rev, **options):
+            if result.error is not None:
+                print(f"Error in {result.pyfile_path}: {result.error}")
+                print(result.error_traceback, end="", file=sys.stderr)
+                for manifest in manifests.values():
+                    manifest.keep_previous(result.pyfile_path)
+                continue
+            if result.cache_hit:
+                cache_hit_count += 1
+            for page in result.pages:
+                writer.submit(result.pyfile_path, page.output_paths, page.content)
+                if manifests:
+                    manifests[page.lang].record(result.pyfile_path, content_hashes[result.pyfile_path], page.output_paths)
+                print(f"Output {result.pyfile_path} -> {page.output_paths[0]}")
+            generate_file_count += 1
+    finally:
+        writer.close()
+        if source is not None:
+            close_sources()
 
-    for fn, content in file_data.items():
-        write_to_file(content, fn)
-    print(f"\nComplete:    {generate_file_count}/{total_file_count} success    {total_file_count - generate_file_count} failed\n")
+    for pyfile_path, error in writer.failed_sources.items():
+        print(f"Error in {pyfile_path}: {error}")
+        generate_file_count -= 1
+        for manifest in manifests.values():
+            manifest.keep_previous(pyfile_path)
+    for manifest in manifests.values():
+        for removed_path in manifest.remove_stale():
+            print(f"Removed {removed_path}")
+        manifest.save()
+    print(f"\nComplete:    {generate_file_count}/{total_file_count} success    {total_file_count - generate_file_count - unchanged_file_count} failed    {unchanged_file_count} unchanged")
+    print(f"Write:       {writer.written_count} written    {writer.unchanged_count} unchanged")
+    if cache_dir is not None:
+        evicted = get_parse_cache(cache_dir, cache_size).evict()
+        print(f"Cache:       {cache_hit_count} hit    {generate_file_count - cache_hit_count} miss    {evicted} evicted")
+    if memory_parse_cache is not None:
+        print(f"Memory:      {len(memory_parse_cache.entries)} entries    {memory_parse_cache.size / 2 ** 20:.1f}/{memory_parse_cache.max_size / 2 ** 20:.0f} MB")
+    docstring_cache_after = parse_cache_info()
+    docstring_cache_hits = docstring_cache_after.hits - docstring_cache_before.hits + worker_docstring_cache_stats[0]
+    docstring_cache_misses = docstring_cache_after.misses - docstring_cache_before.misses + worker_docstring_cache_stats[1]
+    print(f"Docstring:   {docstring_cache_hits} hit    {docstring_cache_misses} miss")
+    print(f"Lazy:        {lazy_counter.summary()}\n")
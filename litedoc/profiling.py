@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""
+分阶段计时
+
+启用后记录每个阶段(发现、读取、解析、docstring解析、源码提取、生成、写入等)及每个文件的墙钟时间和CPU时间，
+阶段可以嵌套，外层阶段只计入扣除内层阶段后的时间。未启用时stage()和file()返回共享的空上下文，几乎没有开销
+"""
+import json
+import threading
+import time
+from contextlib import nullcontext
+from typing import Any, ContextManager, Iterable, Iterator, Optional
+
+STAGES = ("discover", "read", "cache", "ast", "extract", "docstring", "source", "render", "write")
+"""已知阶段，按流水线顺序排列，报告中按此顺序输出"""
+
+_NULL_CONTEXT = nullcontext()
+
+
+class _Stage:
+    __slots__ = ("profiler", "name", "wall", "cpu", "child_wall", "child_cpu")
+
+    def __init__(self, profiler: "Profiler", name: str):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.child_wall = self.child_cpu = 0.0
+        self.profiler._stack().append(self)
+        self.wall = time.perf_counter()
+        self.cpu = time.thread_time()
+
+    def __exit__(self, *exc_info):
+        wall = time.perf_counter() - self.wall
+        cpu = time.thread_time() - self.cpu
+        stack = self.profiler._stack()
+        stack.pop()
+        if stack:
+            stack[-1].child_wall += wall
+            stack[-1].child_cpu += cpu
+        self.profiler.add(self.name, wall - self.child_wall, cpu - self.child_cpu)
+
+
+class _File:
+    __slots__ = ("profiler", "path", "previous")
+
+    def __init__(self, profiler: "Profiler", path: str):
+        self.profiler = profiler
+        self.path = path
+
+    def __enter__(self):
+        local = self.profiler._local
+        self.previous = getattr(local, "file", None)
+        local.file = self.path
+
+    def __exit__(self, *exc_info):
+        self.profiler._local.file = self.previous
+
+
+class Profiler:
+    def __init__(self):
+        self.stages: dict[str, list[float]] = {}
+        """阶段 -> [墙钟时间, CPU时间, 次数]"""
+        self.files: dict[str, dict[str, float]] = {}
+        """文件 -> 阶段 -> 墙钟时间"""
+        self.start_wall = time.perf_counter()
+        self.start_cpu = time.process_time()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _stack(self) -> list[_Stage]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def stage(self, name: str) -> _Stage:
+        """
+        计时一个阶段，时间计入当前线程正在处理的文件
+        Args:
+            name: 阶段名
+        """
+        return _Stage(self, name)
+
+    def file(self, path: str) -> _File:
+        """
+        标记当前线程正在处理的文件
+        Args:
+            path: 文件路径
+        """
+        return _File(self, path)
+
+    def add(self, name: str, wall: float, cpu: float, file: Optional[str] = None):
+        """
+        记录一次阶段耗时
+        Args:
+            name: 阶段名
+            wall: 墙钟时间，秒
+            cpu: CPU时间，秒
+            file: 文件路径，默认为当前线程正在处理的文件
+        """
+        if file is None:
+            file = getattr(self._local, "file", None)
+        with self._lock:
+            stat = self.stages.setdefault(name, [0.0, 0.0, 0])
+            stat[0] += wall
+            stat[1] += cpu
+            stat[2] += 1
+            if file is not None:
+                file_stages = self.files.setdefault(file, {})
+                file_stages[name] = file_stages.get(name, 0.0) + wall
+
+    def snapshot(self) -> dict[str, Any]:
+        """
+        Returns:
+            阶段和文件统计的副本，用于从子进程传回
+        """
+        with self._lock:
+            return {
+                    "stages": {name: list(stat) for name, stat in self.stages.items()},
+                    "files" : {file: dict(stages) for file, stages in self.files.items()},
+            }
+
+    def merge(self, snapshot: dict[str, Any]):
+        """
+        合并其他进程的统计
+        Args:
+            snapshot: snapshot()的返回值
+        """
+        with self._lock:
+            for name, (wall, cpu, count) in snapshot["stages"].items():
+                stat = self.stages.setdefault(name, [0.0, 0.0, 0])
+                stat[0] += wall
+                stat[1] += cpu
+                stat[2] += count
+            for file, stages in snapshot["files"].items():
+                file_stages = self.files.setdefault(file, {})
+                for name, wall in stages.items():
+                    file_stages[name] = file_stages.get(name, 0.0) + wall
+
+    def top_files(self, n: int = 10) -> list[tuple[str, float, dict[str, float]]]:
+        """
+        Args:
+            n: 数量
+        Returns:
+            [(文件, 总墙钟时间, 阶段 -> 墙钟时间)]，按总时间从大到小排列
+        """
+        totals = [(file, sum(stages.values()), stages) for file, stages in self.files.items()]
+        totals.sort(key=lambda item: item[1], reverse=True)
+        return totals[:n]
+
+    def _ordered_stages(self) -> list[str]:
+        return [name for name in STAGES if name in self.stages] + sorted(set(self.stages) - set(STAGES))
+
+    def report(self, top: int = 10) -> dict[str, Any]:
+        """
+        生成可序列化的计时报告
+        Args:
+            top: 最慢文件的数量
+        Returns:
+            报告
+        """
+        return {
+                "total" : {
+                        "wall": time.perf_counter() - self.start_wall,
+                        "cpu" : time.process_time() - self.start_cpu,
+                },
+                "stages": {
+                        name: {"wall": self.stages[name][0], "cpu": self.stages[name][1], "count": self.stages[name][2]}
+                        for name in self._ordered_stages()
+                },
+                "slowest_files": [
+                        {"file": file, "wall": total, "stages": stages}
+                        for file, total, stages in self.top_files(top)
+                ],
+                "files" : self.files,
+        }
+
+    def save_report(self, path: str, top: int = 10):
+        """
+        将计时报告写入JSON文件
+        Args:
+            path: 文件路径
+            top: 最慢文件的数量
+        """
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.report(top), f, ensure_ascii=False, indent=1)
+
+    def summary(self, top: int = 10) -> str:
+        """
+        Args:
+            top: 最慢文件的数量
+        Returns:
+            多行的计时摘要，子进程的阶段时间会被累加，因此可能超过总墙钟时间
+        """
+        lines = [f"Profile:     {time.perf_counter() - self.start_wall:.3f}s wall    {time.process_time() - self.start_cpu:.3f}s cpu (main process)"]
+        for name in self._ordered_stages():
+            wall, cpu, count = self.stages[name]
+            lines.append(f"  {name:<12}{wall:>9.3f}s wall{cpu:>9.3f}s cpu{count:>9} calls")
+        top_files = self.top_files(top)
+        if top_files:
+            lines.append(f"Slowest {len(top_files)} files:")
+            for file, total, stages in top_files:
+                detail = ", ".join(f"{name} {wall:.3f}s" for name, wall in sorted(stages.items(), key=lambda item: item[1], reverse=True)[:3])
+                lines.append(f"  {total:>9.3f}s  {file}  ({detail})")
+        return "\n".join(lines)
+
+
+active: Optional[Profiler] = None
+"""当前进程中启用的计时器，未启用时为None"""
+
+
+def enable() -> Profiler:
+    """
+    在当前进程中启用计时，已启用时返回现有的计时器
+    Returns:
+        Profiler
+    """
+    global active
+    if active is None:
+        active = Profiler()
+    return active
+
+
+def disable() -> Optional[Profiler]:
+    """
+    停用计时
+    Returns:
+        停用前的计时器
+    """
+    global active
+    profiler, active = active, None
+    return profiler
+
+
+def stage(name: str) -> ContextManager:
+    """
+    计时一个阶段，未启用时返回空上下文
+    Args:
+        name: 阶段名
+    """
+    return _NULL_CONTEXT if active is None else active.stage(name)
+
+
+def file(path: str) -> ContextManager:
+    """
+    标记当前线程正在处理的文件，未启用时返回空上下文
+    Args:
+        path: 文件路径
+    """
+    return _NULL_CONTEXT if active is None else active.file(path)
+
+
+def timed_iter(iterable: Iterable, name: str) -> Iterable:
+    """
+    对迭代器每次产出之前的工作计时，例如惰性的文件发现，未启用时原样返回
+    Args:
+        iterable: 可迭代对象
+        name: 阶段名
+    """
+    if active is None:
+        return iterable
+    return _timed_iter(active, iter(iterable), name)
+
+
+def _timed_iter(profiler: Profiler, iterator: Iterator, name: str) -> Iterator:
+    while True:
+        with profiler.stage(name):
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+        yield item
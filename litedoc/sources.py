@@ -0,0 +1,322 @@
+# -*- coding: utf-8 -*-
+"""
+非目录的源码来源
+
+模块路径可以是wheel、zip或tar归档，也可以在归档路径后接归档内的目录，例如dist/foo-1.0.tar.gz/foo-1.0/src/foo。
+归档不会被解压到磁盘：zip和wheel只读取一次中央目录，成员按需读取；tar没有中央目录，只顺序读取一遍并在内存中保留源文件内容。
+页面标题和输出路径与解压后在包的上级目录中运行相同，源文件的虚拟路径形如foo/sub/mod.py
+
+指定git修订时从仓库对象中读取模块目录：一次git ls-tree -r列出文件，由一个常驻的git cat-file --batch进程按需传回内容，
+不检出、不读写工作区，页面与检出该修订后运行相同
+"""
+import abc
+import os
+import posixpath
+import threading
+from functools import lru_cache
+from typing import IO, Iterable, Iterator, Optional
+
+from litedoc.discovery import SOURCE_SUFFIXES, iter_source_members
+
+ARCHIVE_SUFFIXES = (".whl", ".zip", ".tar.gz", ".tgz", ".tar.bz2", ".tbz2", ".tar.xz", ".txz", ".tar")
+
+
+def split_archive_path(path: str) -> Optional[tuple[str, str]]:
+    """
+    将模块路径拆分为归档文件和归档内的目录
+    Args:
+        path: 模块路径
+    Returns:
+        (归档文件路径, 归档内以/分隔的目录，可为空)，路径不在归档中时为None
+    """
+    parts = path.replace("\\", "/").split("/")
+    for i in range(len(parts), 0, -1):
+        candidate = "/".join(parts[:i])
+        if candidate.lower().endswith(ARCHIVE_SUFFIXES) and os.path.isfile(candidate):
+            return candidate, "/".join(part for part in parts[i:] if part)
+    return None
+
+
+def find_package_root(names: Iterable[str]) -> str:
+    """
+    找到归档中最浅的包目录，例如sdist中的foo-1.0/src/foo
+    Args:
+        names: 源文件路径
+    Returns:
+        包目录，没有包时为空字符串，即归档根目录
+    Raises:
+        ValueError: 最浅的一层有多个包
+    """
+    inits = [posixpath.dirname(name) for name in names if posixpath.basename(name) in ("__init__.py", "__init__.pyi")]
+    if not inits:
+        return ""
+    depth = min(init.count("/") for init in inits)
+    roots = sorted({init for init in inits if init.count("/") == depth})
+    if len(roots) > 1:
+        raise ValueError(f"found several packages ({', '.join(roots)}), append one of them to the archive path")
+    return roots[0]
+
+
+class MemberSource(abc.ABC):
+    """以已知文件列表代替目录遍历的源码来源，子类设置names和module_folder并实现read"""
+    names: list[str]
+    """相对于模块目录、以/分隔的文件路径"""
+    module_folder: str
+    """虚拟的模块目录，源文件的虚拟路径以它开头"""
+
+    def iter_files(self, exclude: Optional[list[str]] = None, ignored_paths=None, **kwargs) -> Iterator[str]:
+        """
+        产出源文件的虚拟路径
+        Args:
+            exclude: 排除规则
+            ignored_paths: 忽略的路径
+            **kwargs: 其余iter_source_files的参数，不支持.gitignore，被忽略
+        """
+        prefix = os.path.join(self.module_folder, "")
+        for rel_path in iter_source_members(self.names, exclude=exclude, ignored_paths=ignored_paths, prefix=prefix):
+            yield prefix + rel_path
+
+    def relative_path(self, path: str) -> str:
+        """
+        Args:
+            path: iter_files产出的虚拟路径
+        Returns:
+            相对于模块目录、以/分隔的路径
+        """
+        return path[len(os.path.join(self.module_folder, "")):].replace("\\", "/")
+
+    @abc.abstractmethod
+    def read(self, path: str) -> bytes:
+        """
+        读取源文件
+        Args:
+            path: iter_files产出的虚拟路径
+        Returns:
+            内容
+        """
+
+    def close(self):
+        pass
+
+
+class ArchiveSource(MemberSource):
+    def __init__(self, archive_path: str, inner: str = ""):
+        """
+        打开归档并读取文件列表
+        Args:
+            archive_path: 归档文件路径
+            inner: 归档内的模块目录，为空时自动查找包目录
+        """
+        # 归档模块导入较慢，只在读取归档时导入
+        import tarfile
+        import zipfile
+
+        self.archive_path = archive_path
+        self.zip: Optional[zipfile.ZipFile] = None
+        self.data: dict[str, bytes] = {}
+        """tar归档中源文件的内容"""
+        if zipfile.is_zipfile(archive_path):
+            self.zip = zipfile.ZipFile(archive_path)
+            names = [info.filename for info in self.zip.infolist() if not info.is_dir()]
+        else:
+            with tarfile.open(archive_path, "r:*") as tar:
+                for member in tar:
+                    if member.isfile() and member.name.endswith(SOURCE_SUFFIXES):
+                        self.data[member.name.removeprefix("./")] = tar.extractfile(member).read()
+            names = list(self.data)
+
+        self.root = inner.strip("/") or find_package_root(name for name in names if name.endswith(SOURCE_SUFFIXES))
+        self.names = [name[len(self.root) + 1:] if self.root else name for name in names
+                      if not self.root or name.startswith(self.root + "/")]
+        stem = os.path.basename(archive_path)
+        for suffix in ARCHIVE_SUFFIXES:
+            if stem.lower().endswith(suffix):
+                stem = stem[:-len(suffix)]
+                break
+        self.module_folder = posixpath.basename(self.root) or stem.split("-")[0]
+
+    def read(self, path: str) -> bytes:
+        rel_path = self.relative_path(path)
+        member = f"{self.root}/{rel_path}" if self.root else rel_path
+        if self.zip is not None:
+            return self.zip.read(member)
+        try:
+            return self.data[member]
+        except KeyError:
+            raise FileNotFoundError(f"{member} not found in {self.archive_path}") from None
+
+    def close(self):
+        if self.zip is not None:
+            self.zip.close()
+
+
+def run_git(args: list[str], cwd: str) -> bytes:
+    """
+    运行git命令
+    Args:
+        args: git之后的参数
+        cwd: 工作目录
+    Returns:
+        标准输出
+    Raises:
+        ValueError: 命令失败，例如修订或路径不存在
+    """
+    import subprocess
+    try:
+        result = subprocess.run(["git", *args], cwd=cwd, capture_output=True)
+    except FileNotFoundError:
+        raise ValueError("git executable not found") from None
+    if result.returncode != 0:
+        raise ValueError(result.stderr.decode("utf-8", "replace").strip() or f"git {args[0]} failed")
+    return result.stdout
+
+
+class GitSource(MemberSource):
+    def __init__(self, path: str, rev: str):
+        """
+        列出修订中模块目录下的文件，模块目录不需要存在于工作区中
+        Args:
+            path: 模块目录，相对路径相对于当前工作目录，虚拟路径与直接对该目录运行时相同
+            rev: git修订，例如标签、分支或提交
+        Raises:
+            ValueError: 不在git仓库中，或修订中没有该目录
+        """
+        self.module_folder = path
+        # 修订中的目录可能已从工作区删除，从最近的存在的上级目录查找仓库
+        existing_dir = os.path.abspath(path)
+        while not os.path.isdir(existing_dir) and os.path.dirname(existing_dir) != existing_dir:
+            existing_dir = os.path.dirname(existing_dir)
+        self.repo = os.fsdecode(run_git(["rev-parse", "--show-toplevel"], existing_dir)).strip()
+        self.prefix = os.path.relpath(os.path.realpath(path), os.path.realpath(self.repo)).replace(os.sep, "/")
+        if self.prefix == ".":
+            self.prefix = ""
+        elif self.prefix.startswith("../"):
+            raise ValueError(f"{path} is outside of the git repository {self.repo}")
+        try:
+            self.commit = os.fsdecode(run_git(["rev-parse", "--verify", "--quiet", f"{rev}^{{commit}}"], self.repo)).strip()
+        except ValueError:
+            raise ValueError(f"unknown revision {rev} in {self.repo}") from None
+        """修订解析得到的提交，构建期间引用移动不影响结果"""
+
+        self.blobs: dict[str, str] = {}
+        """相对路径 -> blob对象名"""
+        listing = run_git(["ls-tree", "-r", "-z", f"{self.commit}:{self.prefix}"], self.repo)
+        for entry in listing.split(b"\0"):
+            if not entry:
+                continue
+            info, _, name = entry.partition(b"\t")
+            mode, object_type, object_name = info.split()
+            # 跳过子模块和符号链接
+            if object_type == b"blob" and mode != b"120000":
+                self.blobs[os.fsdecode(name)] = object_name.decode("ascii")
+        self.names = list(self.blobs)
+
+        self.process = None
+        self.lock = threading.Lock()
+
+    def start(self) -> tuple[IO[bytes], IO[bytes]]:
+        """
+        启动git cat-file --batch进程，在第一次读取时调用
+        Returns:
+            (标准输入, 标准输出)
+        """
+        import subprocess
+        if self.process is None:
+            self.process = subprocess.Popen(["git", "cat-file", "--batch"], cwd=self.repo, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        return self.process.stdin, self.process.stdout
+
+    def read(self, path: str) -> bytes:
+        rel_path = self.relative_path(path)
+        try:
+            object_name = self.blobs[rel_path]
+        except KeyError:
+            raise FileNotFoundError(f"{rel_path} not found in {self.commit[:12]}:{self.prefix}") from None
+        with self.lock:
+            stdin, stdout = self.start()
+            stdin.write(object_name.encode("ascii") + b"\n")
+            stdin.flush()
+            # <对象名> <类型> <大小>\n<内容>\n
+            header = stdout.readline().split()
+            if len(header) != 3:
+                raise FileNotFoundError(f"{rel_path} ({object_name}) is missing from the repository")
+            data = stdout.read(int(header[2]))
+            stdout.read(1)
+        return data
+
+    def close(self):
+        """关闭cat-file进程"""
+        if self.process is not None:
+            self.process.stdin.close()
+            self.process.wait()
+            self.process = None
+
+
+opened_sources: list[MemberSource] = []
+"""当前进程中打开的源码来源"""
+
+
+@lru_cache(maxsize=8)
+def get_source(path: str, rev: Optional[str] = None) -> MemberSource:
+    """
+    获取当前进程中打开的源码来源，同一归档或修订只打开一次
+    Args:
+        path: 模块路径，见split_archive_path
+        rev: git修订，不为None时从仓库中读取path
+    Raises:
+        FileNotFoundError: 路径不在归档中
+        ValueError: 无法读取修订
+    """
+    if rev is not None:
+        source = GitSource(path, rev)
+    else:
+        archive = split_archive_path(path)
+        if archive is None:
+            raise FileNotFoundError(f"{path} is not inside an archive")
+        source = ArchiveSource(*archive)
+    opened_sources.append(source)
+    return source
+
+
+def is_source_path(path: str, rev: Optional[str] = None) -> bool:
+    """
+    Args:
+        path: 模块路径
+        rev: git修订
+    Returns:
+        是否需要通过get_source读取，即指定了修订或路径指向归档
+    """
+    return rev is not None or split_archive_path(path) is not None
+
+
+def close_sources():
+    """关闭当前进程中打开的所有源码来源，构建结束时调用，常驻进程中的下一次构建会重新读取归档和修订"""
+    for source in opened_sources:
+        source.close()
+    opened_sources.clear()
+    get_source.cache_clear()
+
+
+def forget_sources():
+    """fork出的子进程(例如并行生成的工作进程)不能与父进程共用文件偏移和cat-file管道，只丢弃继承的对象，在子进程中重新打开"""
+    opened_sources.clear()
+    get_source.cache_clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=forget_sources)
+
+
+def read_source(path: str, source: Optional[str] = None, rev: Optional[str] = None) -> bytes:
+    """
+    读取源文件
+    Args:
+        path: 源文件路径，source不为None时为虚拟路径
+        source: 模块路径，None为本地文件
+        rev: git修订，见get_source
+    Returns:
+        内容
+    """
+    if source is None:
+        with open(path, "rb") as f:
+            return f.read()
+    return get_source(source, rev).read(path)
@@ -9,12 +9,13 @@ Copyright (C) 2020-2024 LiteyukiStudio. All Rights Reserved
 @Software: PyCharm
 """
 
+from litedoc.i18n import LabelBundle, get_labels
+from litedoc.style.renderer import get_renderer_for
 from litedoc.syntax.astparser import AstParser
 from litedoc.syntax.node import *
-from litedoc.i18n import litedoc_hide
 
 
-def generate(parser: AstParser, lang: str, frontmatter: Optional[dict] = None, **kwargs) -> str:
+def generate(parser: AstParser, lang: str, frontmatter: Optional[dict] = None, labels: Optional[LabelBundle] = None, **kwargs) -> str:
     """
     Generate markdown style document from ast
     You can modify this function to generate markdown style that enjoys you
@@ -22,38 +23,11 @@ def generate(parser: AstParser, lang: str, frontmatter: Optional[dict] = None, *
         parser:
         lang: language
         frontmatter:
+        labels: 标签包，为None时使用lang的内置标签
         **kwargs: 更多参数
     Returns:
         markdown style document
     """
-    code_frontmatter = parser.description.front_matter if parser.description is not None and parser.description.front_matter else {}
-    frontmatter = frontmatter or {}
-    frontmatter.update(code_frontmatter)
-    if frontmatter:
-        md = "---\n"
-        for k, v in frontmatter.items():
-            md += f"{k}: {v}\n"
-        md += "---\n"
-    else:
-        md = ""
-
-    # 添加标题，如果有
-    if parser.title is not None:
-        md += f"# **{get_text(lang, 'module')}** `{parser.title}`\n\n"
-
-    # 添加描述，如果有
-    if parser.description is not None:
-        md += f"{parser.description.markdown(lang)}\n\n"
-
-    for node in parser.all_nodes:
-        if isinstance(node, FunctionNode):
-            if node.name.startswith("_") or (node.docs is not None and litedoc_hide in node.docs.reduction()):
-                print("skip", node.name)
-                continue
-            md += node.markdown(lang, **kwargs)
-        elif isinstance(node, ClassNode):
-            md += node.markdown(lang, **kwargs)
-        elif isinstance(node, AssignNode):
-            if node.docs is not None and litedoc_hide not in node.docs:
-                md += node.markdown(lang, **kwargs)
-    return md
+    if labels is None:
+        labels = get_labels(lang)
+    return get_renderer_for(labels, **kwargs).render(parser, frontmatter)
@@ -0,0 +1,290 @@
+# -*- coding: utf-8 -*-
+"""
+预编译的markdown渲染器
+
+标签、定义词和源码折叠块等静态片段在构造渲染器时一次拼好，渲染时只向共享的片段列表追加，
+每个顶层符号结束时合并为一块输出，既可以拼成完整页面，也可以逐块写入文件对象
+"""
+from functools import lru_cache
+from typing import IO, Iterator, Optional
+
+from litedoc.docstring.docstring import Docstring
+from litedoc.i18n import LabelBundle
+from litedoc.syntax.astparser import AstParser
+from litedoc.syntax.node import AssignNode, ClassNode, FunctionNode, MAGIC_METHODS, TypeHint
+
+SPECIAL_DECORATORS = {
+        "classmethod"   : "https://docs.python.org/3/library/functions.html#classmethod",
+        "staticmethod"  : "https://docs.python.org/3/library/functions.html#staticmethod",
+        "property"      : "https://docs.python.org/3/library/functions.html#property",
+        "abstractmethod": "https://docs.python.org/3/library/abc.html#abc.abstractmethod",
+}
+"""链接到Python文档的装饰器"""
+
+HIDDEN_METHODS = ("__str__", "__repr__")
+"""类文档中不展示的方法"""
+
+
+class MarkdownRenderer:
+    def __init__(self,
+                 labels: LabelBundle,
+                 fd: str = "func",
+                 md: str = "method",
+                 cd: str = "class",
+                 vd: str = "var",
+                 ad: Optional[str] = None,
+                 bu: Optional[str] = None):
+        """
+        预编译一种语言和一组定义词下的所有静态片段
+        Args:
+            labels: 标签包
+            fd: 函数定义词
+            md: 方法定义词
+            cd: 类定义词
+            vd: 变量定义词
+            ad: 属性定义词，为None时使用标签docstring.attribute
+            bu: 源码链接的基础URL，为空时不生成链接
+        """
+        self.labels = labels
+        self.bu = bu
+
+        self.module_title = f"# **{labels['module']}** `"
+
+        self.function_heads = {
+                (is_method, is_async): f"{'####' if is_method else '###'} ***{'async ' if is_async else ''}{md if is_method else fd}*** "
+                for is_method in (False, True) for is_async in (False, True)
+        }
+        """(是否为方法, 是否为异步) -> 函数标题"""
+        self.decorator_lines = {name: f"[`@{name}`]({url})\n" for name, url in SPECIAL_DECORATORS.items()}
+        self.source_open = f"\n<details>\n<summary> <b>{labels['src']}</b>"
+        self.source_link_open = f" {labels['or']} <a href='{bu}"
+        self.source_link_close = f"' target='_blank'>{labels['view_on_github']}</a>"
+        self.source_body = "</summary>\n\n```python\n"
+        self.source_close = "\n```\n</details>\n\n"
+
+        self.class_head = f"### ***{cd}*** `"
+        self.attr_head = f"#### ***{labels['docstring.attribute'] if ad is None else ad}*** `"
+
+        self.assign_head = f"### {vd} `"
+        self.assign_desc = f"- **{labels['desc']}**: "
+        self.assign_type = f"- **{labels['type']}**: `"
+        self.assign_default = f"- **{labels['default_value']}**: `"
+
+        self.docstring_desc = f"**{labels['desc']}**: "
+        self.docstring_args = f"\n**{labels['docstring.args']}**:\n"
+        self.docstring_attrs = f"\n**{labels['docstring.attribute']}**:\n"
+        self.docstring_return = f"\n**{labels['docstring.return']}**: "
+        self.docstring_example = f"\n**{labels['docstring.example']}**:\n"
+        self.docstring_raises = f"\n**{labels['docstring.raises']}**:\n"
+
+    def iter_chunks(self, parser: AstParser, frontmatter: Optional[dict] = None) -> Iterator[str]:
+        """
+        逐块生成页面，每块为页面头部或一个顶层符号
+        Args:
+            parser: 解析结果
+            frontmatter: frontmatter，会被模块文档中的frontmatter覆盖
+        Returns:
+            markdown片段
+        """
+        out: list[str] = []
+        description = parser.description
+        code_frontmatter = description.front_matter if description is not None and description.front_matter else {}
+        frontmatter = {**(frontmatter or {}), **code_frontmatter}
+        if frontmatter:
+            out.append("---\n")
+            for k, v in frontmatter.items():
+                out += (f"{k}: {v}", "\n")
+            out.append("---\n")
+
+        if parser.title is not None:
+            out += (self.module_title, parser.title, "`\n\n")
+        if description is not None:
+            self.render_docstring(out, description)
+            out.append("\n\n")
+        if out:
+            yield "".join(out)
+
+        for node in parser.all_nodes:
+            out.clear()
+            if isinstance(node, FunctionNode):
+                if node.name.startswith("_") or node.hidden:
+                    print("skip", node.name)
+                    continue
+                self.render_function(out, node)
+            elif isinstance(node, ClassNode):
+                if node.hidden:
+                    continue
+                self.render_class(out, node)
+            elif isinstance(node, AssignNode):
+                if node.docs is None or node.hidden:
+                    continue
+                self.render_assign(out, node)
+            yield "".join(out)
+
+    def render(self, parser: AstParser, frontmatter: Optional[dict] = None) -> str:
+        """
+        生成完整页面
+        Args:
+            parser: 解析结果
+            frontmatter: frontmatter
+        Returns:
+            markdown
+        """
+        return "".join(self.iter_chunks(parser, frontmatter))
+
+    def write(self, parser: AstParser, fp: IO[str], frontmatter: Optional[dict] = None):
+        """
+        将页面逐块写入文件对象，内存中只保留当前符号的内容
+        Args:
+            parser: 解析结果
+            fp: 文本文件对象
+            frontmatter: frontmatter
+        """
+        for chunk in self.iter_chunks(parser, frontmatter):
+            fp.write(chunk)
+
+    def render_assign(self, out: list[str], node: AssignNode):
+        out += (self.assign_head, node.name, "`\n\n")
+        if node.docs is not None:
+            out += (self.assign_desc, node.docs, "\n\n")
+        if node.type != TypeHint.NO_TYPEHINT:
+            out += (self.assign_type, node.type, "`\n\n")
+        out += (self.assign_default, node.value, "`\n\n")
+
+    def render_function(self, out: list[str], node: FunctionNode):
+        out.append("---\n")
+        for decorator in node.decorators:
+            out.append(self.decorator_lines.get(decorator) or f"`@{decorator}`\n")
+        out.append(self.function_heads[node.is_classmethod, node.is_async])
+
+        # 配对位置参数和位置参数默认值
+        args: list[str] = []
+        defaults = node.complete_default_args()
+        arg_i = 0
+        for arg in node.posonlyargs:
+            args.append(format_arg(arg.name, arg.type, defaults[arg_i].value))
+            arg_i += 1
+        if node.posonlyargs:
+            args.append("/")
+        for arg in node.args:
+            args.append(format_arg(arg.name, arg.type, defaults[arg_i].value))
+            arg_i += 1
+        if arg := node.vararg:
+            args.append(format_arg("*" + arg.name, arg.type))
+        if node.kwonlyargs:
+            args.append("*")
+            for arg, kw_default in zip(node.kwonlyargs, node.kw_defaults):
+                args.append(format_arg(arg.name, arg.type, kw_default.value))
+        if arg := node.kwarg:
+            args.append(format_arg("**" + arg.name, arg.type))
+
+        operator = MAGIC_METHODS.get(node.name)
+        if operator is not None:
+            if len(args) == 2:
+                out += ("`", args[0], " ", operator, " ", args[1])
+            elif len(args) == 1:
+                out += ("`", operator, " ", args[0])
+            if node.return_ != TypeHint.NO_RETURN:
+                out += (" => ", node.return_)
+        else:
+            out += ("`", node.name, "(", ", ".join(args), ")")
+            if node.return_ != TypeHint.NO_RETURN:
+                out += (" -> ", node.return_)
+        out.append("`\n\n")
+
+        if node.docs is not None:
+            self.render_docstring(out, node.docs)
+            out.append("\n")
+
+        out.append(self.source_open)
+        if self.bu:
+            out += (self.source_link_open, node.module_file_path.replace("\\", "/"), "#L", str(node.lineno), self.source_link_close)
+        out += (self.source_body, node.get_src_without_docstring(), self.source_close)
+
+    def render_class(self, out: list[str], node: ClassNode):
+        out += (self.class_head, node.name)
+        if node.inherits:
+            out += ("(", ", ".join(node.inherits), ")")
+        out.append("`\n")
+        for method in node.methods:
+            name = method.name
+            if name in HIDDEN_METHODS or name.startswith("_") and not name.startswith("__") or method.hidden:
+                continue
+            self.render_function(out, method)
+        for attr in node.attrs:
+            if attr.hidden:
+                continue
+            if attr.type == TypeHint.NO_TYPEHINT:
+                out += (self.attr_head, attr.name, " = ", attr.value, "`\n\n")
+            else:
+                out += (self.attr_head, attr.name, ": ", attr.type, " = ", attr.value, "`\n\n")
+
+    def render_docstring(self, out: list[str], docs: Docstring):
+        if docs.desc:
+            if not docs.is_module:
+                out += (self.docstring_desc, docs.desc, "\n")
+            else:
+                out += (docs.desc, "\n")
+
+        if docs.args:
+            out.append(self.docstring_args)
+            for arg in docs.args:
+                out += ("> - ", arg.name, ": ", arg.type, "  ", arg.desc, "\n")
+        if docs.attrs:
+            out.append(self.docstring_attrs)
+            for attr in docs.attrs:
+                out += ("> - ", attr.name, ": ", attr.type, "  ", attr.desc, "\n")
+
+        if docs.return_ is not None:
+            out += (self.docstring_return, docs.return_.desc, "\n")
+        if docs.example:
+            out += (self.docstring_example, docs.example, "\n")
+        if docs.raise_:
+            out.append(self.docstring_raises)
+            for exception in docs.raise_:
+                out += ("> - ", exception.name, "  ", exception.desc, "\n")
+
+
+def format_arg(name: str, type_: str, default: str = TypeHint.NO_DEFAULT) -> str:
+    """
+    格式化函数签名中的单个参数
+    Args:
+        name: 参数名，可带*或**
+        type_: 类型注解
+        default: 默认值
+    Returns:
+        形如name: type = default的文本
+    """
+    if type_ != TypeHint.NO_TYPEHINT:
+        name += ": " + type_
+    if default != TypeHint.NO_DEFAULT:
+        name += " = " + default
+    return name
+
+
+@lru_cache(maxsize=64)
+def get_renderer(labels: LabelBundle,
+                 fd: str = "func",
+                 md: str = "method",
+                 cd: str = "class",
+                 vd: str = "var",
+                 ad: Optional[str] = None,
+                 bu: Optional[str] = None) -> MarkdownRenderer:
+    """
+    获取预编译的渲染器，相同的标签和定义词只编译一次，参数同MarkdownRenderer
+    """
+    return MarkdownRenderer(labels, fd, md, cd, vd, ad, bu)
+
+
+RENDER_OPTIONS = ("fd", "md", "cd", "vd", "ad", "bu")
+"""影响渲染结果的额外参数"""
+
+
+def get_renderer_for(labels: LabelBundle, **kwargs) -> MarkdownRenderer:
+    """
+    从generate风格的参数中取出渲染参数并获取渲染器，其余参数被忽略
+    Args:
+        labels: 标签包
+        **kwargs: 参数
+    """
+    return get_renderer(labels, **{key: kwargs[key] for key in RENDER_OPTIONS if key in kwargs})
@@ -10,11 +10,40 @@ Copyright (C) 2020-2024 LiteyukiStudio. All Rights Reserved
 """
 import ast
 import inspect
+from types import SimpleNamespace
 
 from .node import *
+from .source import SourceIndex
+from .. import profiling
 from ..docstring.parser import parse
 
 
+class ModuleLevelVisitor(ast.NodeVisitor):
+    """
+    单次遍历收集模块级别的类、函数和变量定义，结果按源码顺序排列
+
+    类和函数的内部属于其他作用域，不会被进入；模块级别的if/try/with等复合语句会被继续遍历
+    """
+
+    def __init__(self):
+        self.nodes: list[ast.ClassDef | ast.FunctionDef | ast.AsyncFunctionDef | ast.Assign | ast.AnnAssign] = []
+
+    def visit_definition(self, node: ast.ClassDef | ast.FunctionDef | ast.AsyncFunctionDef | ast.Assign | ast.AnnAssign):
+        self.nodes.append(node)
+
+    visit_ClassDef = visit_definition
+    visit_FunctionDef = visit_definition
+    visit_AsyncFunctionDef = visit_definition
+    visit_Assign = visit_definition
+    visit_AnnAssign = visit_definition
+
+    def generic_visit(self, node: ast.AST):
+        # 表达式中不会出现语句，只需进入语句块
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, (ast.stmt, ast.excepthandler, ast.match_case)):
+                self.visit(child)
+
+
 class AstParser:
     def __init__(self, code: str, title: Optional[str] = None, style: str = "google", file_path: Optional[str] = None):
         """
@@ -27,13 +56,19 @@ class AstParser:
         """
         self.style = style
         self.code = code
-        self.tree = ast.parse(code)
+        with profiling.stage("ast"):
+            self.tree = ast.parse(code)
+        self.source = SourceIndex(code)
+        """行表及注释、字符串索引"""
         self.title = title
         """模块标题, 通常位于文件开头的单行注释, 会被解析为h1"""
 
         self.file_path = file_path
 
-        self.description = parse(ast.get_docstring(self.tree), parser=self.style, is_module=True) if ast.get_docstring(self.tree) else None
+        module_docstring = ast.get_docstring(self.tree)
+        self.claimed_string_ends: Optional[set[int]] = None
+        """已属于其他语句的字符串的结束行号，见get_claimed_string_ends"""
+        self.description = parse(module_docstring, parser=self.style, is_module=True) if module_docstring else None
         """模块描述, 通常位于文件开头的多行注释"""
         self.classes: list[ClassNode] = []
         self.functions: list[FunctionNode] = []
@@ -62,272 +97,392 @@ class AstParser:
             代码行内容
         """
         if ignore_index_out:
-            if lineno < 1 or lineno > len(self.code.split("\n")):
-                return ""
-        return self.code.split("\n")[lineno - 1]
+            return self.source.get_line(lineno)
+        return self.source.lines[lineno - 1]
 
-    @staticmethod
-    def match_line_docs(linecontent: str) -> str:
-        """匹配行内注释
+    def get_claimed_string_ends(self) -> set[int]:
+        """
+        模块和类中已有归属的字符串语句：模块、类或函数的文档字符串，以及紧跟在赋值语句后的变量文档，
+        它们不能再作为下一个赋值语句前的文档，第一次需要时计算
+        Returns:
+            这些字符串的结束行号
+        """
+        if self.claimed_string_ends is None:
+            self.claimed_string_ends = set()
+            for scope in ast.walk(self.tree):
+                if not isinstance(scope, (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+                    continue
+                previous = None
+                for stmt in scope.body:
+                    if isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Constant) and isinstance(stmt.value.value, str):
+                        if previous is None or (isinstance(previous, (ast.Assign, ast.AnnAssign)) and previous.end_lineno + 1 == stmt.lineno):
+                            self.claimed_string_ends.add(stmt.end_lineno)
+                    previous = stmt
+        return self.claimed_string_ends
+
+    def get_assign_docs(self, node: ast.Assign | ast.AnnAssign) -> Optional[str]:
+        """获取变量的文档
+        优先使用紧跟在赋值语句后的字符串，其次为紧挨在赋值语句前、且不属于其他语句的字符串，最后为行内注释
         Args:
-            linecontent: 行内容
+            node: 赋值节点
         Returns:
-            文档字符串
-        """
-        in_string = False
-        string_char = ''
-        for i, char in enumerate(linecontent):
-            if char in ('"', "'"):
-                if in_string:
-                    if char == string_char:
-                        in_string = False
-                else:
-                    in_string = True
-                    string_char = char
-            elif char == '#' and not in_string:
-                return linecontent[i + 1:].strip()
-        return ""
+            文档字符串，没有则为None
+        """
+        docs = self.source.strings_by_start.get(node.end_lineno + 1)
+        if docs is None and node.lineno - 1 in self.source.strings_by_end and node.lineno - 1 not in self.get_claimed_string_ends():
+            docs = self.source.strings_by_end.get(node.lineno - 1)
+        if docs is None:
+            docs = self.source.comments.get(node.lineno) or self.source.comments.get(node.end_lineno) or None
+        return docs
 
     def parse(self):
-        for node in ast.walk(self.tree):
+        visitor = ModuleLevelVisitor()
+        visitor.visit(self.tree)
+        for node in visitor.nodes:
             if isinstance(node, ast.ClassDef):
-                if not self._is_module_level_class(node):
-                    continue
-
-                class_node = ClassNode(
-                    name=node.name,
-                    docs=parse(ast.get_docstring(node), parser=self.style) if ast.get_docstring(node) else None,
-                    inherits=[ast.unparse(base) for base in node.bases]
-                )
-                self.classes.append(class_node)
-                self.all_nodes.append(class_node)
-
-                # 继续遍历类内部的函数
-                for sub_node in node.body:
-                    if isinstance(sub_node, (ast.FunctionDef, ast.AsyncFunctionDef)):
-                        class_node.methods.append(FunctionNode(
-                            name=sub_node.name,
-                            docs=parse(ast.get_docstring(sub_node), parser=self.style) if ast.get_docstring(sub_node) else None,
-                            posonlyargs=[
-                                    ArgNode(
-                                        name=arg.arg,
-                                        type=self.clear_quotes(ast.unparse(arg.annotation).strip()) if arg.annotation else TypeHint.NO_TYPEHINT,
-                                    )
-                                    for arg in sub_node.args.posonlyargs
-                            ],
-                            args=[
-                                    ArgNode(
-                                        name=arg.arg,
-                                        type=self.clear_quotes(ast.unparse(arg.annotation).strip()) if arg.annotation else TypeHint.NO_TYPEHINT,
-                                    )
-                                    for arg in sub_node.args.args
-                            ],
-                            vararg=ArgNode(
-                                name=sub_node.args.vararg.arg,
-                                type=self.clear_quotes(
-                                    ast.unparse(sub_node.args.vararg.annotation).strip()) if sub_node.args.vararg.annotation else TypeHint.NO_TYPEHINT
-                            ) if sub_node.args.vararg else None,
-                            kwonlyargs=[
-                                    ArgNode(
-                                        name=arg.arg,
-                                        type=self.clear_quotes(ast.unparse(arg.annotation).strip()) if arg.annotation else TypeHint.NO_TYPEHINT,
-                                    )
-                                    for arg in sub_node.args.kwonlyargs
-                            ],
-                            kwarg=ArgNode(
-                                name=sub_node.args.kwarg.arg,
-                                type=self.clear_quotes(
-                                    ast.unparse(sub_node.args.kwarg.annotation).strip()) if sub_node.args.kwarg.annotation else TypeHint.NO_TYPEHINT
-                            ) if sub_node.args.kwarg else None,
-                            kw_defaults=[
-                                    ConstantNode(
-                                        value=ast.unparse(default).strip() if default else TypeHint.NO_DEFAULT
-                                    )
-                                    for default in sub_node.args.kw_defaults
-                            ],
-                            defaults=[
-                                    ConstantNode(
-                                        value=ast.unparse(default).strip() if default else TypeHint.NO_DEFAULT
-                                    )
-                                    for default in sub_node.args.defaults
-                            ],
-                            return_=self.clear_quotes(ast.unparse(sub_node.returns).strip()) if sub_node.returns else TypeHint.NO_RETURN,
-                            decorators=[ast.unparse(decorator).strip() for decorator in sub_node.decorator_list],
-                            is_async=isinstance(sub_node, ast.AsyncFunctionDef),
-                            src=ast.unparse(sub_node).strip(),
-                            is_classmethod=True,
-                            lineno=sub_node.lineno,
-                            module_file_path=self.file_path
-                        ))
-                    elif isinstance(sub_node, (ast.Assign, ast.AnnAssign)):
-                        if isinstance(sub_node, ast.Assign):
-                            class_node.attrs.append(AttrNode(
-                                name=sub_node.targets[0].id,  # type: ignore
-                                type=TypeHint.NO_TYPEHINT,
-                                value=ast.unparse(sub_node.value).strip()
-                            ))
-                        elif isinstance(sub_node, ast.AnnAssign):
-                            class_node.attrs.append(AttrNode(
-                                name=sub_node.target.id,
-                                type=ast.unparse(sub_node.annotation).strip(),
-                                value=ast.unparse(sub_node.value).strip() if sub_node.value else TypeHint.NO_DEFAULT
-                            ))
-                        else:
-                            raise ValueError(f"Unsupported node type: {type(sub_node)}")
-
+                self.parse_class(node)
             elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
-                # 仅打印模块级别的函数
-                if not self._is_module_level_function(node):
-                    continue
-                function_node = FunctionNode(
-                    name=node.name,
-                    docs=parse(ast.get_docstring(node), parser=self.style) if ast.get_docstring(node) else None,
-                    posonlyargs=[
-                            ArgNode(
-                                name=arg.arg,
-                                type=self.clear_quotes(ast.unparse(arg.annotation).strip()) if arg.annotation else TypeHint.NO_TYPEHINT,
-                            )
-                            for arg in node.args.posonlyargs
-                    ],
-                    args=[
-                            ArgNode(
-                                name=arg.arg,
-                                type=self.clear_quotes(ast.unparse(arg.annotation).strip()) if arg.annotation else TypeHint.NO_TYPEHINT,
-                            )
-                            for arg in node.args.args
-                    ],
-                    vararg=ArgNode(
-                        name=node.args.vararg.arg,
-                        type=self.clear_quotes(ast.unparse(node.args.vararg.annotation).strip()) if node.args.vararg.annotation else TypeHint.NO_TYPEHINT
-                    ) if node.args.vararg else None,
-                    kwonlyargs=[
-                            ArgNode(
-                                name=arg.arg,
-                                type=self.clear_quotes(ast.unparse(arg.annotation).strip()) if arg.annotation else TypeHint.NO_TYPEHINT,
-                            )
-                            for arg in node.args.kwonlyargs
-                    ],
-                    kwarg=ArgNode(
-                        name=node.args.kwarg.arg,
-                        type=self.clear_quotes(ast.unparse(node.args.kwarg.annotation).strip()) if node.args.kwarg.annotation else TypeHint.NO_TYPEHINT
-                    ) if node.args.kwarg else None,
-                    kw_defaults=[
-                            ConstantNode(
-                                value=ast.unparse(default).strip() if default else TypeHint.NO_DEFAULT
-                            )
-                            for default in node.args.kw_defaults
-                    ],
-                    defaults=[
-                            ConstantNode(
-                                value=ast.unparse(default).strip() if default else TypeHint.NO_DEFAULT
-                            )
-                            for default in node.args.defaults
-                    ],
-                    return_=self.clear_quotes(ast.unparse(node.returns).strip()) if node.returns else TypeHint.NO_RETURN,
-                    decorators=[ast.unparse(decorator).strip() for decorator in node.decorator_list],
-                    is_async=isinstance(node, ast.AsyncFunctionDef),
-                    src=ast.unparse(node).strip(),
-                    lineno=node.lineno,
-                    module_file_path=self.file_path
-                )
+                function_node = self.parse_function(node)
                 self.functions.append(function_node)
                 self.all_nodes.append(function_node)
-
             elif isinstance(node, (ast.Assign, ast.AnnAssign)):
-                if not self._is_module_level_variable2(node):
-                    continue
-                else:
-                    pass
-                lineno = node.lineno
-                prev_line = self.get_line_content(lineno - 1).strip()
-                curr_line = self.get_line_content(lineno).strip()
-                next_line = self.get_line_content(lineno + 1).strip()
-
-                # 获取文档字符串，优先检测下行"""
-                if next_line.startswith('"""'):
-                    docs = next_line[3:-3]
-                elif prev_line.startswith('"""'):
-                    docs = prev_line[3:-3]
+                self.parse_assign(node)
+
+    def parse_class(self, node: ast.ClassDef):
+        """
+        解析模块级别的类及其方法和属性
+        Args:
+            node: 类定义节点
+        """
+        class_node = ClassNode(
+            name=node.name,
+            docs=Lazy(self.parse_docstring, node),
+            inherits=[ast.unparse(base) for base in node.bases],
+            directives=self.get_directives(node)
+        )
+        self.classes.append(class_node)
+        self.all_nodes.append(class_node)
+
+        # 继续遍历类内部的函数
+        for sub_node in node.body:
+            if isinstance(sub_node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                class_node.methods.append(self.parse_function(sub_node, is_classmethod=True))
+            elif isinstance(sub_node, (ast.Assign, ast.AnnAssign)):
+                if isinstance(sub_node, ast.Assign):
+                    class_node.attrs.append(AttrNode(
+                        name=sub_node.targets[0].id,  # type: ignore
+                        type=TypeHint.NO_TYPEHINT,
+                        value=ast.unparse(sub_node.value).strip(),
+                        directives=find_directives(self.get_assign_docs(sub_node))
+                    ))
+                elif isinstance(sub_node, ast.AnnAssign):
+                    class_node.attrs.append(AttrNode(
+                        name=sub_node.target.id,
+                        type=ast.unparse(sub_node.annotation).strip(),
+                        value=ast.unparse(sub_node.value).strip() if sub_node.value else TypeHint.NO_DEFAULT,
+                        directives=find_directives(self.get_assign_docs(sub_node))
+                    ))
                 else:
-                    curr_docs = self.match_line_docs(curr_line)
-                    if curr_docs:
-                        docs = curr_docs
-                    else:
-                        docs = None
-
-                if isinstance(node, ast.Assign):
-                    for target in node.targets:
-                        if isinstance(target, ast.Name):
-                            ass_node = AssignNode(
-                                name=target.id,
-                                value=ast.unparse(node.value).strip(),
-                                type=ast.unparse(node.annotation).strip() if isinstance(node, ast.AnnAssign) else TypeHint.NO_TYPEHINT,
-                                docs=docs
-                            )
-                            self.variables.append(ass_node)
-                            self.all_nodes.append(ass_node)
-                if isinstance(node, ast.AnnAssign):
-                    annass_node = AssignNode(
-                        name=node.target.id,
-                        value=ast.unparse(node.value).strip() if node.value else TypeHint.NO_DEFAULT,
-                        type=ast.unparse(node.annotation).strip(),
-                        docs=docs
+                    raise ValueError(f"Unsupported node type: {type(sub_node)}")
+
+    def parse_arg(self, arg: ast.arg) -> ArgNode:
+        """
+        解析单个参数
+        Args:
+            arg: 参数节点
+        Returns:
+            ArgNode
+        """
+        return ArgNode(
+            name=arg.arg,
+            type=self.clear_quotes(ast.unparse(arg.annotation).strip()) if arg.annotation else TypeHint.NO_TYPEHINT,
+        )
+
+    def parse_function(self, node: ast.FunctionDef | ast.AsyncFunctionDef, is_classmethod: bool = False) -> FunctionNode:
+        """
+        解析函数或方法
+        Args:
+            node: 函数定义节点
+            is_classmethod: 是否为类中定义的方法
+        Returns:
+            FunctionNode
+        """
+        return FunctionNode(
+            name=node.name,
+            docs=Lazy(self.parse_docstring, node),
+            posonlyargs=[self.parse_arg(arg) for arg in node.args.posonlyargs],
+            args=[self.parse_arg(arg) for arg in node.args.args],
+            vararg=self.parse_arg(node.args.vararg) if node.args.vararg else None,
+            kwonlyargs=[self.parse_arg(arg) for arg in node.args.kwonlyargs],
+            kwarg=self.parse_arg(node.args.kwarg) if node.args.kwarg else None,
+            kw_defaults=[
+                    ConstantNode(value=ast.unparse(default).strip()) if default else NO_DEFAULT_CONSTANT
+                    for default in node.args.kw_defaults
+            ],
+            defaults=[
+                    ConstantNode(value=ast.unparse(default).strip()) if default else NO_DEFAULT_CONSTANT
+                    for default in node.args.defaults
+            ],
+            return_=self.clear_quotes(ast.unparse(node.returns).strip()) if node.returns else TypeHint.NO_RETURN,
+            decorators=[ast.unparse(decorator).strip() for decorator in node.decorator_list],
+            is_async=isinstance(node, ast.AsyncFunctionDef),
+            src=Lazy(self.get_src, node),
+            src_without_docstring=Lazy(self.get_src_without_docstring, node),
+            is_classmethod=is_classmethod,
+            directives=self.get_directives(node),
+            lineno=node.lineno,
+            module_file_path=self.file_path or ""
+        )
+
+    def parse_docstring(self, node: ast.ClassDef | ast.FunctionDef | ast.AsyncFunctionDef) -> Optional[Docstring]:
+        """
+        解析类或函数的文档字符串
+        Args:
+            node: 类或函数定义节点
+        Returns:
+            Docstring，没有文档字符串时为None
+        """
+        with profiling.stage("docstring"):
+            docstring = ast.get_docstring(node)
+            return parse(docstring, parser=self.style) if docstring else None
+
+    def get_src(self, node: ast.FunctionDef | ast.AsyncFunctionDef) -> str:
+        """
+        获取函数源码，包括装饰器
+        Args:
+            node: 函数定义节点
+        Returns:
+            源码
+        """
+        with profiling.stage("source"):
+            return self.source.get_segment(node)
+
+    @staticmethod
+    def get_directives(node: ast.ClassDef | ast.FunctionDef | ast.AsyncFunctionDef) -> frozenset[str]:
+        """
+        从未解析的文档字符串中识别litedoc指令，不会触发文档字符串的解析
+        Args:
+            node: 类或函数定义节点
+        Returns:
+            指令名集合
+        """
+        return find_directives(ast.get_docstring(node, clean=False))
+
+    def get_src_without_docstring(self, node: ast.FunctionDef | ast.AsyncFunctionDef) -> str:
+        """
+        获取去除文档字符串后的函数源码
+        Args:
+            node: 函数定义节点
+        Returns:
+            源码
+        """
+        with profiling.stage("source"):
+            return self.source.get_segment(node, exclude=self.get_docstring_nodes(node))
+
+    @staticmethod
+    def get_docstring_nodes(node: ast.FunctionDef | ast.AsyncFunctionDef) -> list[ast.Expr]:
+        """
+        获取函数及其内部嵌套函数的文档字符串语句
+        Args:
+            node: 函数定义节点
+        Returns:
+            文档字符串语句
+        """
+        docstring_nodes = []
+        for sub_node in ast.walk(node):
+            if isinstance(sub_node, (ast.FunctionDef, ast.AsyncFunctionDef)) and sub_node.body:
+                first = sub_node.body[0]
+                if isinstance(first, ast.Expr) and isinstance(first.value, ast.Constant) and isinstance(first.value.value, str):
+                    docstring_nodes.append(first)
+        return docstring_nodes
+
+    def parse_assign(self, node: ast.Assign | ast.AnnAssign):
+        """
+        解析模块级别的变量赋值
+        Args:
+            node: 赋值节点
+        """
+        docs = self.get_assign_docs(node)
+        directives = find_directives(docs)
+
+        if isinstance(node, ast.Assign):
+            for target in node.targets:
+                if isinstance(target, ast.Name):
+                    ass_node = AssignNode(
+                        name=target.id,
+                        value=ast.unparse(node.value).strip(),
+                        type=TypeHint.NO_TYPEHINT,
+                        docs=docs,
+                        directives=directives
                     )
-                    self.variables.append(annass_node)
-                    self.all_nodes.append(annass_node)
-
-    def _is_module_level_function(self, node: ast.FunctionDef | ast.AsyncFunctionDef):
-        for parent in ast.walk(self.tree):
-            if isinstance(parent, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
-                if node in parent.body:
-                    return False
-        return True
-
-    def _is_module_level_class(self, node: ast.ClassDef):
-        for parent in ast.walk(self.tree):
-            if isinstance(parent, ast.ClassDef):
-                if node in parent.body:
-                    return False
-        return True
-
-    def _is_module_level_variable(self, node: ast.Assign | ast.AnnAssign):
-        """在类方法或函数内部的变量不会被记录"""
-
-        # for parent in ast.walk(self.tree):
-        #     if isinstance(parent, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
-        #         if node in parent.body:
-        #             return False
-        #         else:
-        #             for sub_node in parent.body:
-        #                 if isinstance(sub_node, (ast.FunctionDef, ast.AsyncFunctionDef)):
-        #                     if node in sub_node.body:
-        #                         return False
-        # return True
-        # 递归检查
-        def _check(_node, _parent):
-            if isinstance(_parent, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
-                if _node in _parent.body:
-                    return False
-                else:
-                    for sub_node in _parent.body:
-                        if isinstance(sub_node, (ast.FunctionDef, ast.AsyncFunctionDef)):
-                            return _check(_node, sub_node)
-            return True
+                    self.variables.append(ass_node)
+                    self.all_nodes.append(ass_node)
+        elif isinstance(node.target, ast.Name):
+            annass_node = AssignNode(
+                name=node.target.id,
+                value=ast.unparse(node.value).strip() if node.value else TypeHint.NO_DEFAULT,
+                type=ast.unparse(node.annotation).strip(),
+                docs=docs,
+                directives=directives
+            )
+            self.variables.append(annass_node)
+            self.all_nodes.append(annass_node)
 
-        for parent in ast.walk(self.tree):
-            if not _check(node, parent):
-                return False
-        return True
+    def export_lazy(self, name: str, lazy: Lazy) -> Optional[dict]:
+        """
+        导出尚未计算的延迟字段的输入而不计算它：文档字符串导出为未解析的原文，源码导出为行列范围，
+        from_data恢复后仍是延迟字段，缓存未命中时也不会解析用不到的文档字符串或截取用不到的源码
+        Args:
+            name: 字段名
+            lazy: 延迟值
+        Returns:
+            {"lazy": 类型, ...}，没有文档字符串时为None
+        """
+        if lazy.func == self.parse_docstring_text:
+            return {"lazy": "docstring", "text": lazy.args[0]}
+        if lazy.func == self.get_segment_from_span:
+            return {"lazy": "segment", "span": lazy.args[0], "exclude": lazy.args[1]}
+        node = lazy.args[0]
+        if lazy.func == self.parse_docstring:
+            docstring = ast.get_docstring(node)
+            return {"lazy": "docstring", "text": docstring} if docstring else None
+        if lazy.func == self.get_src_without_docstring:
+            exclude = self.get_docstring_nodes(node)
+        elif lazy.func == self.get_src:
+            exclude = []
+        else:
+            raise ValueError(f"cannot export lazy field {name}")
+        start = min([node.lineno] + [decorator.lineno for decorator in node.decorator_list])
+        return {
+                "lazy"   : "segment",
+                "span"   : [start, node.end_lineno, node.end_col_offset],
+                "exclude": [[stmt.lineno, stmt.col_offset, stmt.end_lineno, stmt.end_col_offset] for stmt in exclude],
+        }
+
+    def load_lazy(self, data: Any) -> Any:
+        """
+        恢复export_lazy导出的延迟字段，其余值原样返回
+        Args:
+            data: 导出的值
+        Returns:
+            Lazy或原值
+        """
+        if not isinstance(data, dict) or "lazy" not in data:
+            return data
+        if data["lazy"] == "docstring":
+            return Lazy(self.parse_docstring_text, data["text"])
+        return Lazy(self.get_segment_from_span, data["span"], data["exclude"])
 
-    def _is_module_level_variable2(self, node: ast.Assign | ast.AnnAssign) -> bool:
+    def parse_docstring_text(self, docstring: str) -> Docstring:
         """
-        检查变量是否在模块级别定义。
+        解析缓存中未解析的文档字符串原文
+        Args:
+            docstring: 文档字符串
+        Returns:
+            Docstring
+        """
+        with profiling.stage("docstring"):
+            return parse(docstring, parser=self.style)
+
+    def get_segment_from_span(self, span: list[int], exclude: list[list[int]]) -> str:
         """
-        for parent in ast.walk(self.tree):
-            if isinstance(parent, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
-                if node in parent.body:
-                    return False
-        return True
+        按缓存中的行列范围截取源码，第一次需要时才为代码切行
+        Args:
+            span: [起始行, 结束行, 结束列]
+            exclude: 需要去除的子语句的[起始行, 起始列, 结束行, 结束列]
+        Returns:
+            源码
+        """
+        with profiling.stage("source"):
+            if self.source is None:
+                self.source = SourceIndex(self.code, scan=False)
+            start, end_lineno, end_col_offset = span
+            node = SimpleNamespace(lineno=start, end_lineno=end_lineno, end_col_offset=end_col_offset)
+            stmts = [SimpleNamespace(lineno=lineno, col_offset=col_offset, end_lineno=stmt_end_lineno, end_col_offset=stmt_end_col_offset)
+                     for lineno, col_offset, stmt_end_lineno, stmt_end_col_offset in exclude]
+            return self.source.get_segment(node, exclude=stmts)  # type: ignore
+
+    def to_data(self) -> dict:
+        """
+        导出与文件路径无关的解析结果，仅包含基本类型，可直接序列化，尚未计算的延迟字段只导出其输入，见export_lazy
+        Returns:
+            解析结果
+        """
+        node_kinds = {id(node): "class" for node in self.classes}
+        node_kinds.update({id(node): "function" for node in self.functions})
+
+        def dump_function(func: FunctionNode) -> dict:
+            data = func.to_dict(self.export_lazy)
+            del data["module_file_path"]
+            return data
+
+        def dump_class(cls: ClassNode) -> dict:
+            data = cls.to_dict(self.export_lazy)
+            data["methods"] = [dump_function(method) for method in cls.methods]
+            return data
+
+        return {
+                "description": self.description.model_dump() if self.description is not None else None,
+                "classes"    : [dump_class(cls) for cls in self.classes],
+                "functions"  : [dump_function(func) for func in self.functions],
+                "variables"  : [var.to_dict() for var in self.variables],
+                "order"      : [node_kinds.get(id(node), "variable") for node in self.all_nodes],
+        }
+
+    @classmethod
+    def from_data(cls, data: dict, title: Optional[str] = None, style: str = "google", file_path: Optional[str] = None,
+                  code: Optional[str] = None) -> "AstParser":
+        """
+        从to_data的结果恢复，不解析代码
+        Args:
+            data: to_data的结果
+            title: 模块标题
+            style: 注释风格
+            file_path: Python文件路径
+            code: 代码，用于计算导出时尚未计算的源码字段，只在需要时切行
+        Returns:
+            AstParser，其中tree和source为None
+        """
+        self = cls.__new__(cls)
+        self.style = style
+        self.code = code
+        self.tree = None
+        self.source = None
+        self.title = title
+        self.file_path = file_path
+        self.claimed_string_ends = None
+        self.description = Docstring.model_validate(data["description"]) if data["description"] is not None else None
+
+        def load_docs(docs_data: Optional[dict]) -> Docstring | Lazy | None:
+            if docs_data is None or "lazy" in docs_data:
+                return self.load_lazy(docs_data)
+            return Docstring.model_validate(docs_data)
+
+        def load_function(function_data: dict) -> FunctionNode:
+            return FunctionNode.from_dict({
+                    **function_data,
+                    "docs"                 : load_docs(function_data["docs"]),
+                    "src"                  : self.load_lazy(function_data["src"]),
+                    "src_without_docstring": self.load_lazy(function_data["src_without_docstring"]),
+                    "module_file_path"     : file_path or "",
+            })
+
+        def load_class(class_data: dict) -> ClassNode:
+            return ClassNode.from_dict({
+                    **class_data,
+                    "docs"   : load_docs(class_data["docs"]),
+                    "methods": [load_function(method) for method in class_data["methods"]],
+            })
+
+        self.classes = [load_class(class_data) for class_data in data["classes"]]
+        self.functions = [load_function(function_data) for function_data in data["functions"]]
+        self.variables = [AssignNode.from_dict(variable_data) for variable_data in data["variables"]]
+
+        self.all_nodes = []
+        nodes = {"class": iter(self.classes), "function": iter(self.functions), "variable": iter(self.variables)}
+        for kind in data["order"]:
+            self.all_nodes.append(next(nodes[kind]))
+        return self
 
     def __str__(self):
         s = ""
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+"""
+语法节点的pydantic模型
+
+解析和渲染使用litedoc.syntax.node中的轻量节点，这里的模型只在需要校验或导出时由Node.to_model()构建，字段与同名节点一致
+"""
+from typing import Optional
+
+from pydantic import BaseModel
+
+from litedoc.docstring.model import Docstring
+from litedoc.syntax.node import TypeHint
+
+
+class AssignNode(BaseModel):
+    name: str
+    type: str = ""
+    value: str
+    docs: Optional[str] = ""
+    directives: list[str] = []
+
+
+class ArgNode(BaseModel):
+    name: str
+    type: str = TypeHint.NO_TYPEHINT
+
+
+class AttrNode(BaseModel):
+    name: str
+    type: str = ""
+    value: str = ""
+    directives: list[str] = []
+
+
+class ImportNode(BaseModel):
+    name: str
+    as_: str = ""
+
+
+class ConstantNode(BaseModel):
+    value: str
+
+
+class FunctionNode(BaseModel):
+    name: str
+
+    posonlyargs: list[ArgNode] = []
+    args: list[ArgNode] = []
+    vararg: Optional[ArgNode] = None
+    kwonlyargs: list[ArgNode] = []
+    kwarg: Optional[ArgNode] = None
+    kw_defaults: list[ConstantNode] = []
+    defaults: list[ConstantNode] = []
+
+    lineno: int = 0
+    module_file_path: str = ""
+
+    return_: str = TypeHint.NO_RETURN
+    decorators: list[str] = []
+    is_async: bool = False
+    is_classmethod: bool = False
+    directives: list[str] = []
+
+    docs: Optional[Docstring] = None
+    src: str = ""
+    src_without_docstring: Optional[str] = None
+
+
+class ClassNode(BaseModel):
+    name: str
+    attrs: list[AttrNode] = []
+    methods: list[FunctionNode] = []
+    inherits: list[str] = []
+    directives: list[str] = []
+    docs: Optional[Docstring] = None
@@ -8,12 +8,11 @@ Copyright (C) 2020-2024 LiteyukiStudio. All Rights Reserved
 @File    : node.py
 @Software: PyCharm
 """
-from typing import Optional
-
-from pydantic import BaseModel
+import re
+from typing import Any, Callable, ClassVar, Iterable, Optional
 
 from litedoc.docstring.docstring import Docstring
-from litedoc.i18n import get_text, litedoc_hide
+from litedoc.i18n import LabelBundle, get_labels
 from litedoc.utils import remove_docstrings_from_code
 
 
@@ -23,9 +22,284 @@ class TypeHint:
     NO_RETURN = "NO_RETURN"
 
 
-class AssignNode(BaseModel):
+class Directive:
+    """
+    写在文档字符串或注释中的litedoc指令, 形如@litedoc-hide
+    """
+    HIDE = "hide"
+
+
+DIRECTIVE_PATTERN = re.compile(r"@litedoc-([A-Za-z][\w-]*)")
+NO_DIRECTIVES: frozenset[str] = frozenset()
+
+
+def find_directives(text: Optional[str]) -> frozenset[str]:
+    """
+    查找文本中的litedoc指令
+    Args:
+        text: 文档字符串或注释
+    Returns:
+        指令名集合, 例如{"hide"}
+    """
+    if not text or "@litedoc-" not in text:
+        return NO_DIRECTIVES
+    return frozenset(DIRECTIVE_PATTERN.findall(text))
+
+
+class Lazy:
+    """
+    延迟计算的字段值, 传给节点的延迟字段后, 在首次访问该字段时才调用func(*args)计算
+    """
+    __slots__ = ("func", "args")
+
+    def __init__(self, func: Callable[..., Any], *args: Any):
+        self.func = func
+        self.args = args
+
+    def __call__(self) -> Any:
+        return self.func(*self.args)
+
+
+class LazyCounter:
+    """
+    统计延迟字段的创建次数与实际计算次数, 二者之差即为被跳过的解析工作
+    """
+
+    def __init__(self):
+        self.deferred: dict[str, int] = {}
+        self.loaded: dict[str, int] = {}
+
+    def add_deferred(self, name: str):
+        self.deferred[name] = self.deferred.get(name, 0) + 1
+
+    def add_loaded(self, name: str):
+        self.loaded[name] = self.loaded.get(name, 0) + 1
+
+    def avoided(self) -> dict[str, int]:
+        """
+        Returns:
+            字段名 -> 从未被计算的次数
+        """
+        return {name: count - self.loaded.get(name, 0) for name, count in self.deferred.items()}
+
+    def reset(self):
+        self.deferred.clear()
+        self.loaded.clear()
+
+    def snapshot(self) -> tuple[dict[str, int], dict[str, int]]:
+        """
+        Returns:
+            (deferred, loaded)的副本, 用于从子进程传回统计
+        """
+        return dict(self.deferred), dict(self.loaded)
+
+    def merge(self, snapshot: tuple[dict[str, int], dict[str, int]]):
+        """
+        合并其他进程的统计
+        Args:
+            snapshot: snapshot()的返回值
+        """
+        deferred, loaded = snapshot
+        for name, count in deferred.items():
+            self.deferred[name] = self.deferred.get(name, 0) + count
+        for name, count in loaded.items():
+            self.loaded[name] = self.loaded.get(name, 0) + count
+
+    def summary(self) -> str:
+        """
+        Returns:
+            形如"docs 12/30, src 8/25 skipped"的统计文本
+        """
+        if not self.deferred:
+            return "nothing deferred"
+        avoided = self.avoided()
+        return ", ".join(f"{name} {avoided[name]}/{count}" for name, count in self.deferred.items()) + " skipped"
+
+
+lazy_counter = LazyCounter()
+"""全局延迟字段计数器"""
+
+
+class LazyField:
+    """
+    节点的延迟字段, 值存放在以_开头的同名slot中
+
+    赋值为Lazy时, 在首次访问该字段时才计算并缓存
+    """
+    __slots__ = ("name", "slot")
+
+    def __set_name__(self, owner: type, name: str):
+        self.name = name
+        self.slot = "_" + name
+
+    def __get__(self, instance: Any, owner: Optional[type] = None) -> Any:
+        if instance is None:
+            return self
+        value = getattr(instance, self.slot)
+        if isinstance(value, Lazy):
+            lazy_counter.add_loaded(self.name)
+            value = value()
+            setattr(instance, self.slot, value)
+        return value
+
+    def __set__(self, instance: Any, value: Any):
+        if isinstance(value, Lazy):
+            lazy_counter.add_deferred(self.name)
+        setattr(instance, self.slot, value)
+
+
+class Node:
+    """
+    语法节点的基类, 子类使用__slots__存放字段, 构造时不做校验
+
+    需要校验或导出时, 通过to_model()构建对应的pydantic模型(见litedoc.syntax.model)
+    """
+    __slots__ = ()
+
+    _fields: ClassVar[tuple[str, ...]] = ()
+    """字段名, 按导出顺序排列"""
+    _children: ClassVar[dict[str, type["Node"]]] = {}
+    """字段名 -> 子节点类型, 用于从导出数据恢复"""
+
+    def to_dict(self, export_lazy: Optional[Callable[[str, Lazy], Any]] = None) -> dict[str, Any]:
+        """
+        导出为仅包含基本类型的字典
+        Args:
+            export_lazy: 导出尚未计算的延迟字段的函数, 参数为字段名和Lazy, 为None时延迟字段会在此被计算
+        Returns:
+            字段名 -> 值
+        """
+        data = {}
+        for name in self._fields:
+            value = getattr(self, "_" + name, None) if export_lazy is not None else None
+            data[name] = export_lazy(name, value) if isinstance(value, Lazy) else _export(getattr(self, name), export_lazy)
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "Node":
+        """
+        从to_dict的结果恢复, 以字典表示的子节点会被一并恢复
+        Args:
+            data: to_dict的结果
+        Returns:
+            节点
+        """
+        data = dict(data)
+        for name, child_type in cls._children.items():
+            value = data.get(name)
+            if isinstance(value, list):
+                data[name] = [child_type.from_dict(item) if isinstance(item, dict) else item for item in value]
+            elif isinstance(value, dict):
+                data[name] = child_type.from_dict(value)
+        return cls(**data)
+
+    def to_model(self):
+        """
+        构建经过校验的pydantic模型
+        Returns:
+            litedoc.syntax.model中的同名模型
+        """
+        from litedoc.syntax import model
+        return getattr(model, type(self).__name__).model_validate(self.to_dict())
+
+    def model_dump(self, **kwargs: Any) -> dict[str, Any]:
+        """
+        兼容pydantic的导出接口, 等同于to_model().model_dump(**kwargs)
+        """
+        return self.to_model().model_dump(**kwargs)
+
+    def __eq__(self, other: Any) -> bool:
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self._fields)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({', '.join(f'{name}={getattr(self, name)!r}' for name in self._fields)})"
+
+
+class DirectiveNode(Node):
+    """
+    可以带有litedoc指令的节点, 指令在解析时从文档字符串或注释中识别
     """
-    AssignNode is a pydantic model that represents an assignment.
+    __slots__ = ()
+
+    directives: frozenset[str]
+
+    @property
+    def hidden(self) -> bool:
+        """是否被@litedoc-hide隐藏"""
+        return Directive.HIDE in self.directives
+
+
+def _export(value: Any, export_lazy: Optional[Callable[[str, Lazy], Any]] = None) -> Any:
+    if isinstance(value, Node):
+        return value.to_dict(export_lazy)
+    if isinstance(value, list):
+        return [_export(item, export_lazy) for item in value]
+    if isinstance(value, frozenset):
+        return sorted(value)
+    if isinstance(value, Docstring):
+        return value.model_dump()
+    return value
+
+
+MAGIC_METHODS: dict[str, str] = {
+        "__add__"     : "+",
+        "__radd__"    : "+",
+        "__sub__"     : "-",
+        "__rsub__"    : "-",
+        "__mul__"     : "*",
+        "__rmul__"    : "*",
+        "__matmul__"  : "@",
+        "__rmatmul__" : "@",
+        "__mod__"     : "%",
+        "__truediv__" : "/",
+        "__rtruediv__": "/",
+        "__neg__"     : "-",
+        "__and__"     : "&",
+        "__rand__"    : "&",
+        "__or__"      : "|",
+        "__ror__"     : "|",
+        "__xor__"     : "^",
+        "__rxor__"    : "^",
+        "__lshift__"  : "<<",
+        "__rlshift__" : "<<",
+        "__rshift__"  : ">>",
+        "__rrshift__" : ">>",
+        "__getitem__" : "[]",
+        "__setitem__" : "[] =",
+        "__delitem__" : "del []",
+        "__iter__"    : "iter",
+        "__next__"    : "next",
+        "__contains__": "in",
+        "__len__"     : "len",
+        "__str__"     : "str",
+        "__repr__"    : "repr",
+        "__call__"    : "()",
+        "__enter__"   : "with",
+        "__exit__"    : "with",
+        "__await__"   : "await",
+        "__aiter__"   : "aiter",
+        "__anext__"   : "anext",
+        "__aenter__"  : "awith",
+        "__aexit__"   : "awith",
+        "__hash__"    : "hash",
+        "__eq__"      : "==",
+        "__ne__"      : "!=",
+        "__lt__"      : "<",
+        "__le__"      : "<=",
+        "__gt__"      : ">",
+        "__ge__"      : ">=",
+        "__index__"   : "index",
+        "__round__"   : "round",
+        "__floor__"   : "floor"
+}
+"""魔术方法, 例如运算符, 所有FunctionNode共享"""
+
+
+class AssignNode(DirectiveNode):
+    """
+    AssignNode represents an assignment.
     Attributes:
         name: str
             The name of the assignment.
@@ -34,50 +308,54 @@ class AssignNode(BaseModel):
         value: str
             The value of the assignment.
     """
-    name: str
-    type: str = ""
-    value: str
-    docs: Optional[str] = ""
-
-    def markdown(self, lang: str, **kwargs) -> str:
+    __slots__ = ("name", "type", "value", "docs", "directives")
+    _fields = __slots__
+
+    def __init__(self, *, name: str, value: str, type: str = "", docs: Optional[str] = "",
+                 directives: Iterable[str] = NO_DIRECTIVES):
+        self.name = name
+        self.type = type
+        self.value = value
+        self.docs = docs
+        self.directives = frozenset(directives)
+
+    def markdown(self, lang: str, labels: Optional[LabelBundle] = None, **kwargs) -> str:
         """
         Args:
             lang: str
                 The language of the
+            labels: 标签包，为None时使用lang的内置标签
         Returns:
             markdown style document
         """
-        vd = kwargs.get("vd", "var")
-        md = ""
-        md += f"### {vd} `{self.name}`\n\n"
-        if self.docs is not None:
-            md += f"- **{get_text(lang, 'desc')}**: {self.docs}\n\n"
-        if self.type != TypeHint.NO_TYPEHINT:
-            md += f"- **{get_text(lang, 'type')}**: `{self.type}`\n\n"
-        md += f"- **{get_text(lang, 'default_value')}**: `{self.value}`\n\n"
+        if labels is None:
+            labels = get_labels(lang)
+        from litedoc.style.renderer import get_renderer_for  # 渲染器依赖节点类型，在此延迟导入
+        out: list[str] = []
+        get_renderer_for(labels, **kwargs).render_assign(out, self)
+        return "".join(out)
 
 
-        return md
-
-
-class ArgNode(BaseModel):
+class ArgNode(Node):
     """
-    ArgNode is a pydantic model that represents an argument.
+    ArgNode represents an argument.
     Attributes:
         name: str
             The name of the argument.
         type: str = ""
             The type of the argument.
-        default: str = ""
-            The default value of the argument.
     """
-    name: str
-    type: str = TypeHint.NO_TYPEHINT
+    __slots__ = ("name", "type")
+    _fields = __slots__
+
+    def __init__(self, *, name: str, type: str = TypeHint.NO_TYPEHINT):
+        self.name = name
+        self.type = type
 
 
-class AttrNode(BaseModel):
+class AttrNode(DirectiveNode):
     """
-    AttrNode is a pydantic model that represents an attribute.
+    AttrNode represents an attribute.
     Attributes:
         name: str
             The name of the attribute.
@@ -86,37 +364,54 @@ class AttrNode(BaseModel):
         value: str = ""
             The value of the attribute
     """
-    name: str
-    type: str = ""
-    value: str = ""
+    __slots__ = ("name", "type", "value", "directives")
+    _fields = __slots__
 
+    def __init__(self, *, name: str, type: str = "", value: str = "", directives: Iterable[str] = NO_DIRECTIVES):
+        self.name = name
+        self.type = type
+        self.value = value
+        self.directives = frozenset(directives)
 
-class ImportNode(BaseModel):
+
+class ImportNode(Node):
     """
-    ImportNode is a pydantic model that represents an import statement.
+    ImportNode represents an import statement.
     Attributes:
         name: str
             The name of the import statement.
         as_: str = ""
             The alias of the import
     """
-    name: str
-    as_: str = ""
+    __slots__ = ("name", "as_")
+    _fields = __slots__
+
+    def __init__(self, *, name: str, as_: str = ""):
+        self.name = name
+        self.as_ = as_
 
 
-class ConstantNode(BaseModel):
+class ConstantNode(Node):
     """
-    ConstantNode is a pydantic model that represents a constant.
+    ConstantNode represents a constant.
     Attributes:
         value: str
             The value of the constant.
     """
-    value: str
+    __slots__ = ("value",)
+    _fields = __slots__
+
+    def __init__(self, *, value: str):
+        self.value = value
 
 
-class FunctionNode(BaseModel):
+NO_DEFAULT_CONSTANT = ConstantNode(value=TypeHint.NO_DEFAULT)
+"""无默认值的参数共享的常量节点，不应被修改"""
+
+
+class FunctionNode(DirectiveNode):
     """
-    FunctionNode is a pydantic model that represents a function.
+    FunctionNode represents a function.
     Attributes:
         name: str
             The name of the function.
@@ -131,77 +426,72 @@ class FunctionNode(BaseModel):
         is_async: bool = False
             Whether the function is asynchronous.
     """
-    name: str
-    docs: Optional[Docstring] = None
-
-    posonlyargs: list[ArgNode] = []
-    args: list[ArgNode] = []
-    vararg: Optional[ArgNode] = None
-    kwonlyargs: list[ArgNode] = []
-    kwarg: Optional[ArgNode] = None
-    kw_defaults: list[ConstantNode] = []
-    defaults: list[ConstantNode] = []
-
-    lineno: int = 0
-    module_file_path: str = ""  # 去头路径，不包含模块顶级文件夹
-
-    return_: str = TypeHint.NO_RETURN
-    decorators: list[str] = []
-    src: str    # 源码
-    is_async: bool = False
-    is_classmethod: bool = False
-
-    magic_methods: dict[str, str] = {
-            "__add__"     : "+",
-            "__radd__"    : "+",
-            "__sub__"     : "-",
-            "__rsub__"    : "-",
-            "__mul__"     : "*",
-            "__rmul__"    : "*",
-            "__matmul__"  : "@",
-            "__rmatmul__" : "@",
-            "__mod__"     : "%",
-            "__truediv__" : "/",
-            "__rtruediv__": "/",
-            "__neg__"     : "-",
-            "__and__"     : "&",
-            "__rand__"    : "&",
-            "__or__"      : "|",
-            "__ror__"     : "|",
-            "__xor__"     : "^",
-            "__rxor__"    : "^",
-            "__lshift__"  : "<<",
-            "__rlshift__" : "<<",
-            "__rshift__"  : ">>",
-            "__rrshift__" : ">>",
-            "__getitem__" : "[]",
-            "__setitem__" : "[] =",
-            "__delitem__" : "del []",
-            "__iter__"    : "iter",
-            "__next__"    : "next",
-            "__contains__": "in",
-            "__len__"     : "len",
-            "__str__"     : "str",
-            "__repr__"    : "repr",
-            "__call__"    : "()",
-            "__enter__"   : "with",
-            "__exit__"    : "with",
-            "__await__"   : "await",
-            "__aiter__"   : "aiter",
-            "__anext__"   : "anext",
-            "__aenter__"  : "awith",
-            "__aexit__"   : "awith",
-            "__hash__"    : "hash",
-            "__eq__"      : "==",
-            "__ne__"      : "!=",
-            "__lt__"      : "<",
-            "__le__"      : "<=",
-            "__gt__"      : ">",
-            "__ge__"      : ">=",
-            "__index__"   : "index",
-            "__round__"   : "round",
-            "__floor__"   : "floor"
-    }  # 魔术方法, 例如运算符
+    __slots__ = (
+            "name", "posonlyargs", "args", "vararg", "kwonlyargs", "kwarg", "kw_defaults", "defaults",
+            "lineno", "module_file_path", "return_", "decorators", "is_async", "is_classmethod", "directives",
+            "_docs", "_src", "_src_without_docstring",
+    )
+    _fields = (
+            "name", "posonlyargs", "args", "vararg", "kwonlyargs", "kwarg", "kw_defaults", "defaults",
+            "lineno", "module_file_path", "return_", "decorators", "is_async", "is_classmethod", "directives",
+            "docs", "src", "src_without_docstring",
+    )
+    _children = {
+            "posonlyargs": ArgNode,
+            "args"       : ArgNode,
+            "vararg"     : ArgNode,
+            "kwonlyargs" : ArgNode,
+            "kwarg"      : ArgNode,
+            "kw_defaults": ConstantNode,
+            "defaults"   : ConstantNode,
+    }
+
+    magic_methods: ClassVar[dict[str, str]] = MAGIC_METHODS
+
+    docs = LazyField()
+    """文档字符串"""
+    src = LazyField()
+    """源码"""
+    src_without_docstring = LazyField()
+    """去除文档字符串后的源码，为None时由src计算"""
+
+    def __init__(self, *,
+                 name: str,
+                 posonlyargs: Optional[list[ArgNode]] = None,
+                 args: Optional[list[ArgNode]] = None,
+                 vararg: Optional[ArgNode] = None,
+                 kwonlyargs: Optional[list[ArgNode]] = None,
+                 kwarg: Optional[ArgNode] = None,
+                 kw_defaults: Optional[list[ConstantNode]] = None,
+                 defaults: Optional[list[ConstantNode]] = None,
+                 lineno: int = 0,
+                 module_file_path: str = "",
+                 return_: str = TypeHint.NO_RETURN,
+                 decorators: Optional[list[str]] = None,
+                 is_async: bool = False,
+                 is_classmethod: bool = False,
+                 directives: Iterable[str] = NO_DIRECTIVES,
+                 docs: Optional[Docstring] | Lazy = None,
+                 src: str | Lazy = "",
+                 src_without_docstring: Optional[str] | Lazy = None):
+        self.name = name
+        self.posonlyargs = posonlyargs if posonlyargs is not None else []
+        self.args = args if args is not None else []
+        self.vararg = vararg
+        self.kwonlyargs = kwonlyargs if kwonlyargs is not None else []
+        self.kwarg = kwarg
+        self.kw_defaults = kw_defaults if kw_defaults is not None else []
+        self.defaults = defaults if defaults is not None else []
+        self.lineno = lineno
+        self.module_file_path = module_file_path  # 去头路径，不包含模块顶级文件夹
+        self.return_ = return_
+        self.decorators = decorators if decorators is not None else []
+        self.is_async = is_async
+        self.is_classmethod = is_classmethod
+        self.directives = frozenset(directives)
+        self.docs = docs
+        self.src = src
+        self.src_without_docstring = src_without_docstring
 
     def is_private(self):
         """
@@ -219,144 +509,33 @@ class FunctionNode(BaseModel):
         """
         return self.name.startswith("__") and self.name.endswith("__")
 
-    def markdown(self, lang: str, indent: int = 0, **kwargs) -> str:
+    def markdown(self, lang: str, indent: int = 0, labels: Optional[LabelBundle] = None, **kwargs) -> str:
         """
         Args:
             indent: int
                 The number of spaces to indent the markdown.
             lang: str
                 The language of the
+            labels: 标签包，为None时使用lang的内置标签
             **kwargs: more parameters
         Returns:
             markdown style document
         """
-        self.complete_default_args()
-        PREFIX = "" * indent
-        # if is_classmethod:
-        #     PREFIX = "- #"
-        func_type = kwargs.get("fd", "func") if not self.is_classmethod else kwargs.get("md", "method")
-        h_level = 3 if not self.is_classmethod else 4
-        h = "#" * h_level
-        """标题等级"""
-
-        md = "---\n"
-        # 装饰器部分
-        # 特殊装饰器
-        special_decorators = {
-            "classmethod": "https://docs.python.org/3/library/functions.html#classmethod",
-            "staticmethod": "https://docs.python.org/3/library/functions.html#staticmethod",
-            "property": "https://docs.python.org/3/library/functions.html#property",
-            "abstractmethod": "https://docs.python.org/3/library/abc.html#abc.abstractmethod",
-        }
-        if len(self.decorators) > 0:
-            for decorator in self.decorators:
-                if decorator in special_decorators:
-                    md += PREFIX + f"[`@{decorator}`]({special_decorators[decorator]})\n"
-                else:
-                    md += PREFIX + f"`@{decorator}`\n"
-
-        if self.is_async:
-            md += PREFIX + f"{h} ***async {func_type}*** "
-        else:
-            md += PREFIX + f"{h} ***{func_type}*** "
-
-        # code start
-        # 配对位置参数和位置参数默认值，无默认值用TypeHint.NO_DEFAULT
-        args: list[str] = []  # 可直接", ".join(args)得到位置参数部分
-        arg_i = 0
-
-        if len(self.posonlyargs) > 0:
-            for arg in self.posonlyargs:
-                arg_text = f"{arg.name}"
-                if arg.type != TypeHint.NO_TYPEHINT:
-                    arg_text += f": {arg.type}"
-                arg_default = self.defaults[arg_i].value
-                if arg_default != TypeHint.NO_DEFAULT:
-                    arg_text += f" = {arg_default}"
-                args.append(arg_text)
-                arg_i += 1
-            # 加位置参数分割符  /
-            args.append("/")
-
-        for arg in self.args:
-            arg_text = f"{arg.name}"
-            if arg.type != TypeHint.NO_TYPEHINT:
-                arg_text += f": {arg.type}"
-            arg_default = self.defaults[arg_i].value
-            if arg_default != TypeHint.NO_DEFAULT:
-                arg_text += f" = {arg_default}"
-            args.append(arg_text)
-            arg_i += 1
-
-        if arg := self.vararg:
-            arg_text = f"*{arg.name}"
-            if arg.type != TypeHint.NO_TYPEHINT:
-                arg_text += f": {arg.type}"
-            args.append(arg_text)
-
-        if len(self.kwonlyargs) > 0:
-            # 加关键字参数分割符 *
-            args.append("*")
-            for arg, kw_default in zip(self.kwonlyargs, self.kw_defaults):
-                arg_text = f"{arg.name}"
-                if arg.type != TypeHint.NO_TYPEHINT:
-                    arg_text += f": {arg.type}"
-                if kw_default.value != TypeHint.NO_DEFAULT:
-                    arg_text += f" = {kw_default.value}"
-                args.append(arg_text)
-
-        if self.kwarg is not None:
-            arg_text = f"**{self.kwarg.name}"
-            if self.kwarg.type != TypeHint.NO_TYPEHINT:
-                arg_text += f": {self.kwarg.type}"
-            args.append(arg_text)
-
-        """魔法方法"""
-        if self.name in self.magic_methods:
-            if len(args) == 2:
-                md += f"`{args[0]} {self.magic_methods[self.name]} {args[1]}"
-            elif len(args) == 1:
-                md += f"`{self.magic_methods[self.name]} {args[0]}"
-            if self.return_ != TypeHint.NO_RETURN:
-                md += f" => {self.return_}"
-        else:
-            md += f"`{self.name}("  # code start
-            md += ", ".join(args) + ")"
-            if self.return_ != TypeHint.NO_RETURN:
-                md += f" -> {self.return_}"
-
-        md += "`\n\n"  # code end
-
-        """此处预留docstring"""
-        if self.docs is not None:
-            md += f"{self.docs.markdown(lang, indent)}\n"
-        else:
-            pass
-
-        """源码github链接"""
-        if kwargs.get("bu", None):
-            # 源码链接
-            self.module_file_path = self.module_file_path.replace("\\", "/")
-            origin_url = kwargs.get("bu") + f"{self.module_file_path}#L{self.lineno}"
-            # a_tag = f"\n\n[{get_text(lang, 'view_on_github')}]({origin_url})"
-            a_tag = f"<a href='{origin_url}' target='_blank'>{get_text(lang, 'view_on_github')}</a>"
-            or_and_a = f" {get_text(lang, 'or')} {a_tag}"
-        else:
-            or_and_a = ""
-
-        """源码展示"""
-        md += PREFIX + f"\n<details>\n<summary> <b>{get_text(lang, 'src')}</b>{or_and_a}</summary>\n\n```python\n{self.get_src_without_docstring()}\n```\n</details>\n\n"
-
-        return md
-
-    def complete_default_args(self):
+        if labels is None:
+            labels = get_labels(lang)
+        from litedoc.style.renderer import get_renderer_for  # 渲染器依赖节点类型，在此延迟导入
+        out: list[str] = []
+        get_renderer_for(labels, **kwargs).render_function(out, self)
+        return "".join(out)
+
+    def complete_default_args(self) -> list[ConstantNode]:
         """
-        补全位置参数默认值，用无默认值插入
+        补全位置参数默认值，用无默认值插入，不修改self.defaults
         Returns:
-
+            与posonlyargs + args一一对应的默认值
         """
         num = len(self.args) + len(self.posonlyargs) - len(self.defaults)
-        self.defaults = [ConstantNode(value=TypeHint.NO_DEFAULT) for _ in range(num)] + self.defaults
+        return [NO_DEFAULT_CONSTANT] * num + self.defaults
 
     def get_src_without_docstring(self):
         """
@@ -364,15 +543,17 @@ class FunctionNode(BaseModel):
         Returns:
             str
         """
+        if self.src_without_docstring is not None:
+            return self.src_without_docstring
         return remove_docstrings_from_code(self.src)
 
     def __str__(self):
         return f"def {self.name}({', '.join([f'{arg.name}: {arg.type} = {arg.default}' for arg in self.args])}) -> {self.return_}"
 
 
-class ClassNode(BaseModel):
+class ClassNode(DirectiveNode):
     """
-    ClassNode is a pydantic model that represents a class.
+    ClassNode represents a class.
     Attributes:
         name: str
             The name of the class.
@@ -385,40 +566,44 @@ class ClassNode(BaseModel):
         inherits: list["ClassNode"] = []
             The classes that the class inherits from
     """
-    name: str
-    docs: Optional[Docstring] = None
-    attrs: list[AttrNode] = []
-    methods: list[FunctionNode] = []
-    inherits: list[str] = []
-
-    def markdown(self, lang: str, **kwargs) -> str:
+    __slots__ = ("name", "attrs", "methods", "inherits", "directives", "_docs")
+    _fields = ("name", "attrs", "methods", "inherits", "directives", "docs")
+    _children = {
+            "attrs"  : AttrNode,
+            "methods": FunctionNode,
+    }
+
+    docs = LazyField()
+    """文档字符串"""
+
+    def __init__(self, *,
+                 name: str,
+                 attrs: Optional[list[AttrNode]] = None,
+                 methods: Optional[list[FunctionNode]] = None,
+                 inherits: Optional[list[str]] = None,
+                 directives: Iterable[str] = NO_DIRECTIVES,
+                 docs: Optional[Docstring] | Lazy = None):
+        self.name = name
+        self.attrs = attrs if attrs is not None else []
+        self.methods = methods if methods is not None else []
+        self.inherits = inherits if inherits is not None else []
+        self.directives = frozenset(directives)
+        self.docs = docs
+
+    def markdown(self, lang: str, labels: Optional[LabelBundle] = None, **kwargs) -> str:
         """
         返回类的markdown文档
         Args:
             lang: str
                 The language of the
+            labels: 标签包，为None时使用lang的内置标签
         Returns:
             markdown style document
         """
-        hidden_methods = [
-                "__str__",
-                "__repr__",
-        ]
-        md = ""
-        md += f"### ***{kwargs.get('cd', 'class')}*** `{self.name}"
-        if len(self.inherits) > 0:
-            md += f"({', '.join([cls for cls in self.inherits])})"
-        md += "`\n"
-        for method in self.methods:
-            if (method.name in hidden_methods or
-                    method.name.startswith("_") and not method.name.startswith("__") or
-                    method.docs is not None and litedoc_hide in method.docs.reduction()):
-                continue
-            md += method.markdown(lang, 2, **kwargs)
-        for attr in self.attrs:
-            if attr.type == TypeHint.NO_TYPEHINT:
-                md += f"#### ***{kwargs.get('ad', get_text(lang, 'docstring.attribute'))}*** `{attr.name} = {attr.value}`\n\n"
-            else:
-                md += f"#### ***{kwargs.get('ad', get_text(lang, 'docstring.attribute'))}*** `{attr.name}: {attr.type} = {attr.value}`\n\n"
-
-        return md
+        if labels is None:
+            labels = get_labels(lang)
+        from litedoc.style.renderer import get_renderer_for  # 渲染器依赖节点类型，在此延迟导入
+        out: list[str] = []
+        get_renderer_for(labels, **kwargs).render_class(out, self)
+        return "".join(out)
+
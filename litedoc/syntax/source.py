@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+源码索引
+
+对一个文件的源码只切一次行、只做一次tokenize，之后按行号查询行内容、行内注释和字符串语句均为常数时间
+"""
+import ast
+import inspect
+import io
+import tokenize
+from typing import Iterable
+
+
+class SourceIndex:
+    def __init__(self, code: str, scan: bool = True):
+        """
+        为一个文件的源码建立索引
+        Args:
+            code: 代码
+            scan: 是否扫描注释和字符串，只需截取源码时可跳过
+        """
+        self.code = code
+        self.lines: list[str] = code.split("\n")
+        """行表, 第lineno行为lines[lineno - 1]"""
+
+        self.comments: dict[int, str] = {}
+        """行号 -> 行内注释, 不含#"""
+        self.strings_by_start: dict[int, str] = {}
+        """单独成句的字符串字面量, 起始行号 -> 字符串内容"""
+        self.strings_by_end: dict[int, str] = {}
+        """单独成句的字符串字面量, 结束行号 -> 字符串内容"""
+
+        if scan:
+            self._scan()
+
+    def get_line(self, lineno: int) -> str:
+        """
+        获取代码行内容，越界时返回空字符串
+        Args:
+            lineno: 行号，从1开始
+        Returns:
+            代码行内容
+        """
+        if lineno < 1 or lineno > len(self.lines):
+            return ""
+        return self.lines[lineno - 1]
+
+    def char_col(self, lineno: int, col_offset: int) -> int:
+        """
+        将ast中以UTF-8字节计的列偏移转换为字符偏移
+        Args:
+            lineno: 行号
+            col_offset: 字节偏移
+        Returns:
+            字符偏移
+        """
+        line = self.get_line(lineno)
+        if line.isascii():
+            return col_offset
+        return len(line.encode("utf-8")[:col_offset].decode("utf-8", errors="replace"))
+
+    def get_segment(self, node: ast.stmt, exclude: Iterable[ast.stmt] = ()) -> str:
+        """
+        按行列偏移从原始代码中截取语句的源码，包含装饰器并去除公共缩进
+        Args:
+            node: 语句节点
+            exclude: 需要去除的子语句，例如文档字符串
+        Returns:
+            源码
+        """
+        start = min([node.lineno] + [decorator.lineno for decorator in getattr(node, "decorator_list", [])])
+        lines = self.lines[start - 1:node.end_lineno]
+        lines[-1] = lines[-1][:self.char_col(node.end_lineno, node.end_col_offset)]
+
+        # 从后往前去除，避免前面的行号失效
+        for stmt in sorted(exclude, key=lambda n: n.lineno, reverse=True):
+            first, last = stmt.lineno - start, stmt.end_lineno - start
+            head = lines[first][:self.char_col(stmt.lineno, stmt.col_offset)]
+            tail = lines[last][self.char_col(stmt.end_lineno, stmt.end_col_offset):].strip()
+            if head.strip() == "" and (tail == "" or tail.startswith("#")):
+                del lines[first:last + 1]
+                while first < len(lines) and lines[first].strip() == "":
+                    del lines[first]
+            else:
+                lines[first:last + 1] = [(head.rstrip() + " " + tail.lstrip(";").lstrip()).rstrip()]
+
+        indent = len(lines[0]) - len(lines[0].lstrip())
+        return "\n".join(
+            line[indent:] if line[:indent].isspace() else line
+            for line in lines
+        ).rstrip()
+
+    def _scan(self):
+        """
+        单次tokenize，记录每行的注释以及单独成句的字符串字面量
+        """
+        logical_line: list[tokenize.TokenInfo] = []
+        try:
+            for token in tokenize.generate_tokens(io.StringIO(self.code).readline):
+                if token.type == tokenize.COMMENT:
+                    self.comments[token.start[0]] = token.string[1:].strip()
+                elif token.type == tokenize.NEWLINE:
+                    self._add_string_statement(logical_line)
+                    logical_line = []
+                elif token.type not in (tokenize.NL, tokenize.INDENT, tokenize.DEDENT, tokenize.ENDMARKER):
+                    logical_line.append(token)
+        except (tokenize.TokenError, SyntaxError):
+            # 代码已能被ast解析，此处仅为兜底，已扫描到的部分仍然有效
+            pass
+
+    def _add_string_statement(self, logical_line: list[tokenize.TokenInfo]):
+        """
+        若逻辑行仅由字符串字面量组成，则记录其内容
+        Args:
+            logical_line: 一个逻辑行的token
+        """
+        if not logical_line or any(token.type != tokenize.STRING for token in logical_line):
+            return
+        try:
+            value = ast.literal_eval(" ".join(token.string for token in logical_line))
+        except (ValueError, SyntaxError):
+            return
+        if not isinstance(value, str):
+            return
+        value = inspect.cleandoc(value)
+        self.strings_by_start[logical_line[0].start[0]] = value
+        self.strings_by_end[logical_line[-1].end[0]] = value
@@ -0,0 +1,286 @@
+# -*- coding: utf-8 -*-
+"""
+多版本构建
+
+一次为多个版本生成文档，每个版本是一个git修订或一个源码目录、归档。相邻版本中的大部分模块内容相同，
+以(源文件虚拟路径, 内容哈希)去重：相同的模块只解析和生成一次，其页面硬链接(不支持时复制)到之后每个版本的输出目录中。
+虚拟路径决定页面的标题和输出路径，源码目录与归档一样在其上级目录中生成，虚拟路径形如foo/sub/mod.py，不含各版本所在的目录。
+每个版本的输出目录各有自己的增量构建清单
+"""
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Iterable, Iterator, NamedTuple, Optional
+
+from litedoc.cache import DEFAULT_CACHE_SIZE
+from litedoc.discovery import iter_source_files
+from litedoc.i18n import get_labels
+from litedoc.manifest import hash_bytes
+from litedoc.output import OutputWriter, get_manifests, get_output_roots, parse_langs, render_files, write_data_to_file
+from litedoc.sources import close_sources, get_source, is_source_path, read_source
+
+
+class VersionSpec(NamedTuple):
+    """一个版本的源码"""
+    name: str
+    """版本名，替换输出路径中的{version}"""
+    module_folder: str
+    """模块目录或归档"""
+    rev: Optional[str] = None
+    """git修订，None为直接读取module_folder"""
+
+
+class VersionResult(NamedTuple):
+    """一个版本的构建结果"""
+    name: str
+    rendered: int
+    """生成的源文件数"""
+    reused: int
+    """复用之前版本页面的源文件数"""
+    unchanged: int
+    """清单中未变化而跳过的源文件数"""
+    failed: int
+
+
+def parse_versions(items: Iterable[str], module_folder: str) -> list[VersionSpec]:
+    """
+    解析版本参数
+    Args:
+        items: 逗号分隔的版本，每项为git修订(例如v1.2.0，从module_folder读取)，或"版本名=模块目录或归档"
+        module_folder: 修订中的模块目录
+    Returns:
+        版本列表，按给出的顺序
+    Raises:
+        ValueError: 版本名重复
+    """
+    versions = []
+    for item in (item.strip() for items_str in items for item in items_str.split(",")):
+        if not item:
+            continue
+        name, sep, path = item.partition("=")
+        versions.append(VersionSpec(name, path, None) if sep else VersionSpec(name, module_folder, name))
+    names = [version.name for version in versions]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"duplicate versions: {', '.join(duplicates)}")
+    return versions
+
+
+def get_version_output_dir(output_dir: str, version: str) -> str:
+    """
+    Args:
+        output_dir: 输出文件夹，包含{version}时以版本名替换，例如docs/{version}/{lang}/api
+        version: 版本名
+    Returns:
+        该版本的输出文件夹，output_dir不含{version}时为output_dir下以版本名命名的子目录
+    """
+    if "{version}" in output_dir:
+        return output_dir.replace("{version}", version)
+    return os.path.join(output_dir, version)
+
+
+def link_file(source_path: str, output_path: str) -> bool:
+    """
+    将已生成的页面硬链接到输出路径，文件系统不支持硬链接时复制。与write_data_to_file相同，先链接到临时文件再原子地替换目标，
+    之后对任一版本的重新生成都以新文件替换，不会修改其他版本共用的文件
+    Args:
+        source_path: 已生成的页面
+        output_path: 输出路径
+    Returns:
+        是否写入，目标已是同一文件时为False
+    """
+    try:
+        if os.path.samefile(source_path, output_path):
+            return False
+    except OSError:
+        pass
+    os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+    tmp_output = os.path.join(os.path.dirname(output_path), f".{os.path.basename(output_path)}.{os.getpid()}.tmp")
+    try:
+        os.link(source_path, tmp_output)
+    except OSError:
+        with open(source_path, "rb") as f:
+            return write_data_to_file(f.read(), output_path)
+    try:
+        os.replace(tmp_output, output_path)
+    except BaseException:
+        os.remove(tmp_output)
+        raise
+    return True
+
+
+@contextmanager
+def working_dir(path: str) -> Iterator[None]:
+    """
+    临时切换工作目录
+    Args:
+        path: 工作目录
+    """
+    cwd = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(cwd)
+
+
+def get_reuse_key(pyfile_path: str, content_hash: str) -> tuple[str, str]:
+    """
+    Args:
+        pyfile_path: 源文件的虚拟路径
+        content_hash: 内容哈希
+    Returns:
+        页面复用的键，路径和内容都相同的源文件在相同选项下生成的页面相同
+    """
+    return os.path.normpath(pyfile_path).replace("\\", "/"), content_hash
+
+
+def generate_versions(versions: list[VersionSpec],
+                      output_dir: str,
+                      lang: str | list[str] = "zh-Hans",
+                      jobs: int = 1,
+                      incremental: bool = False,
+                      exclude: Optional[list[str]] = None,
+                      respect_gitignore: bool = False,
+                      ignored_paths=None,
+                      cache_dir: Optional[str] = None,
+                      cache_size: int = DEFAULT_CACHE_SIZE,
+                      locale_dirs: Optional[list[str]] = None,
+                      with_top: bool = False,
+                      theme: str = "vitepress",
+                      style: str = "google",
+                      frontmatter: Optional[dict] = None,
+                      **kwargs
+                      ) -> list[VersionResult]:
+    """
+    按顺序为每个版本生成文档，与之前的版本内容相同的模块不再解析，直接链接之前版本的页面
+    Args:
+        versions: 版本列表，见parse_versions
+        output_dir: 输出文件夹，见get_version_output_dir，其中的{lang}见get_output_roots
+        lang: 语言
+        jobs: 并行生成的进程数
+        incremental: 是否增量构建，为True时跳过各版本清单中未变化的文件，命令行默认开启
+        exclude: 排除规则
+        respect_gitignore: 是否遵循.gitignore，只对目录有效
+        ignored_paths: 忽略的路径
+        cache_dir: 解析缓存目录
+        cache_size: 解析缓存容量，字节
+        locale_dirs: 外部语言文件所在目录
+        其余参数同generate_from_module，所有版本使用相同的选项
+    Returns:
+        每个版本的结果
+    """
+    langs = parse_langs(lang)
+    # 生成各版本时会切换工作目录
+    output_dir = os.path.abspath(output_dir)
+    cache_dir = os.path.abspath(cache_dir) if cache_dir is not None else None
+    locale_dirs = tuple(os.path.abspath(locale_dir) for locale_dir in locale_dirs or ())
+    labels = {page_lang: dict(get_labels(page_lang, locale_dirs=locale_dirs)) for page_lang in langs}
+    discover_options = dict(exclude=exclude, respect_gitignore=respect_gitignore, ignored_paths=ignored_paths)
+
+    rendered: dict[tuple[str, str], dict[str, tuple[str, list[str]]]] = {}
+    """(源文件虚拟路径, 内容哈希) -> 语言 -> (首次生成时的输出根目录, 输出路径)"""
+    results = []
+    start = time.perf_counter()
+    for version in versions:
+        version_output_dir = get_version_output_dir(output_dir, version.name)
+        output_roots = get_output_roots(version_output_dir, langs)
+        source, rev, module_folder = None, version.rev, version.module_folder
+        work_dir = os.getcwd()
+        if is_source_path(module_folder, rev):
+            source, module_folder = module_folder, get_source(module_folder, rev).module_folder
+        else:
+            # 源码目录与归档相同，在其上级目录中生成，页面不含各版本目录的绝对路径，不同目录中的相同模块可以复用
+            work_dir, module_folder = os.path.split(os.path.abspath(module_folder))
+        with working_dir(work_dir):
+            options = dict(module_folder=module_folder, with_top=with_top, lang=langs, theme=theme, style=style, frontmatter=frontmatter, **kwargs)
+            manifests = get_manifests(source or module_folder, output_roots, labels, options) if incremental else {}
+
+            content_hashes: dict[str, str] = {}
+            contents: dict[str, bytes] = {}
+            """需要生成的源文件已读取的内容，生成时不再读取"""
+            render_list, reuse_list = [], []
+            unchanged_count = reused_count = failed_count = 0
+            if source is not None:
+                source_files = get_source(source, rev).iter_files(**discover_options)
+            else:
+                source_files = iter_source_files(module_folder, **discover_options)
+            for pyfile_path in source_files:
+                content = read_source(pyfile_path, source, rev)
+                content_hash = content_hashes[pyfile_path] = hash_bytes(content)
+                if manifests and all(manifest.is_fresh(pyfile_path, content_hash) for manifest in manifests.values()):
+                    unchanged_count += 1
+                    # 上次构建留下的页面同样可以供之后的版本链接
+                    rendered.setdefault(get_reuse_key(pyfile_path, content_hash), {
+                            page_lang: (output_roots[page_lang], [os.path.join(output_roots[page_lang], output) for output in manifest.current[pyfile_path]["outputs"]])
+                            for page_lang, manifest in manifests.items()
+                    })
+                elif get_reuse_key(pyfile_path, content_hash) in rendered:
+                    reuse_list.append(pyfile_path)
+                else:
+                    render_list.append(pyfile_path)
+                    contents[pyfile_path] = content
+
+            writer = OutputWriter()
+            version_rendered: dict[str, dict[str, tuple[str, list[str]]]] = {}
+            try:
+                for result in render_files(render_list, jobs=jobs, contents=contents, output_dir=version_output_dir, cache_dir=cache_dir, cache_size=cache_size,
+                                           locale_dirs=locale_dirs, source=source, rev=rev, **options):
+                    if result.error is not None:
+                        print(f"Error in {version.name}:{result.pyfile_path}: {result.error}")
+                        print(result.error_traceback, end="", file=sys.stderr)
+                        for manifest in manifests.values():
+                            manifest.keep_previous(result.pyfile_path)
+                        failed_count += 1
+                        continue
+                    for page in result.pages:
+                        writer.submit(result.pyfile_path, page.output_paths, page.content)
+                    version_rendered[result.pyfile_path] = {page.lang: (output_roots[page.lang], page.output_paths) for page in result.pages}
+            finally:
+                writer.close()
+                if source is not None:
+                    close_sources()
+            for pyfile_path, error in writer.failed_sources.items():
+                print(f"Error in {version.name}:{pyfile_path}: {error}")
+                version_rendered.pop(pyfile_path, None)
+                for manifest in manifests.values():
+                    manifest.keep_previous(pyfile_path)
+                failed_count += 1
+
+            for pyfile_path in reuse_list:
+                pages = rendered[get_reuse_key(pyfile_path, content_hashes[pyfile_path])]
+                try:
+                    outputs = {page_lang: [os.path.join(output_roots[page_lang], os.path.relpath(output_path, root)) for output_path in output_paths]
+                               for page_lang, (root, output_paths) in pages.items()}
+                    for page_lang, output_paths in outputs.items():
+                        for shared_path, output_path in zip(pages[page_lang][1], output_paths):
+                            link_file(shared_path, output_path)
+                except OSError as e:
+                    print(f"Error in {version.name}:{pyfile_path}: {e}")
+                    for manifest in manifests.values():
+                        manifest.keep_previous(pyfile_path)
+                    failed_count += 1
+                    continue
+                reused_count += 1
+                for page_lang, output_paths in outputs.items():
+                    if manifests:
+                        manifests[page_lang].record(pyfile_path, content_hashes[pyfile_path], output_paths)
+            for pyfile_path, pages in version_rendered.items():
+                rendered[get_reuse_key(pyfile_path, content_hashes[pyfile_path])] = pages
+                for page_lang, (_, output_paths) in pages.items():
+                    if manifests:
+                        manifests[page_lang].record(pyfile_path, content_hashes[pyfile_path], output_paths)
+            for manifest in manifests.values():
+                for removed_path in manifest.remove_stale():
+                    print(f"Removed {removed_path}")
+                manifest.save()
+
+        results.append(VersionResult(version.name, len(version_rendered), reused_count, unchanged_count, failed_count))
+        print(f"Version {version.name}: {len(version_rendered)} rendered    {reused_count} reused    {unchanged_count} unchanged    {failed_count} failed")
+
+    total = sum(result.rendered + result.reused + result.unchanged + result.failed for result in results)
+    print(f"\nComplete:    {len(results)} versions    {total} files    {sum(result.rendered for result in results)} rendered    "
+          f"{sum(result.reused for result in results)} reused    {sum(result.unchanged for result in results)} unchanged    "
+          f"{sum(result.failed for result in results)} failed    {time.perf_counter() - start:.3f}s\n")
+    return results
@@ -0,0 +1,314 @@
+# -*- coding: utf-8 -*-
+"""
+监视模式
+
+首次完整构建后常驻，源文件变化时只重新解析和生成变化的文件，新增的文件生成页面，删除的文件移除页面。
+Linux上使用inotify等待变化，其他平台或inotify不可用时轮询文件的修改时间和大小，变化后等待一小段时间合并连续的保存
+"""
+import os
+import select
+import sys
+import threading
+import time
+from typing import Iterable, NamedTuple, Optional
+
+from litedoc.discovery import DEFAULT_EXCLUDES, PathMatcher, iter_source_files
+from litedoc.i18n import get_labels
+from litedoc.manifest import Manifest, hash_bytes
+from litedoc.output import (BUILD_ONLY_OPTIONS, generate_from_module, get_content_options, get_manifests, get_output_roots, parse_langs, render_file,
+                            write_to_file)
+
+DEFAULT_INTERVAL = 0.05
+"""轮询间隔，秒"""
+DEFAULT_DEBOUNCE = 0.02
+"""检测到变化后等待后续变化的时间，秒"""
+MAX_DEBOUNCE = 1.0
+"""持续有变化时最多等待的时间，秒"""
+
+BUILD_OPTIONS = ("jobs", "cache_dir", "cache_size")
+"""只影响首次构建的参数，其余BUILD_ONLY_OPTIONS中的参数由Watcher显式接收或忽略"""
+
+FileStat = tuple[int, int]
+"""(修改时间, 大小)"""
+
+EXCLUDED_DIRS = PathMatcher(DEFAULT_EXCLUDES)
+"""不监视的目录"""
+
+
+class WatchUpdate(NamedTuple):
+    """一次更新中处理的源文件"""
+    changed: list[str]
+    created: list[str]
+    deleted: list[str]
+    failed: list[str]
+    """生成失败的源文件，其旧页面保持不变"""
+
+
+class PollWaiter:
+    """按固定间隔唤醒，由调用方比较文件状态"""
+
+    def __init__(self, interval: float = DEFAULT_INTERVAL):
+        self.interval = interval
+
+    def watch_dirs(self, dirs: Iterable[str]):
+        pass
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Args:
+            timeout: 最长等待时间，秒
+        Returns:
+            是否可能有变化，轮询时总是True
+        """
+        time.sleep(self.interval if timeout is None else min(self.interval, timeout))
+        return True
+
+    def close(self):
+        pass
+
+
+class InotifyWaiter:
+    """通过inotify等待目录中的变化，只在Linux上可用"""
+    IN_MODIFY = 0x002
+    IN_ATTRIB = 0x004
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_FROM = 0x040
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_DELETE_SELF = 0x400
+    IN_MOVE_SELF = 0x800
+    MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+
+    def __init__(self):
+        """
+        Raises:
+            OSError: 当前平台不支持inotify
+        """
+        import ctypes
+        import ctypes.util
+        if not sys.platform.startswith("linux"):
+            raise OSError("inotify is only available on Linux")
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watched: set[str] = set()
+
+    def watch_dirs(self, dirs: Iterable[str]):
+        """
+        设置监视的目录，已监视的目录被忽略
+        Args:
+            dirs: 所有需要监视的目录
+        """
+        dirs = set(dirs)
+        # 被删除的目录的监视会被自动移除，从集合中去掉以便目录重建后重新监视
+        self.watched &= dirs
+        for directory in dirs - self.watched:
+            if self.libc.inotify_add_watch(self.fd, os.fsencode(directory), self.MASK) >= 0:
+                self.watched.add(directory)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待变化并清空事件队列
+        Args:
+            timeout: 最长等待时间，秒，None为一直等待
+        Returns:
+            是否有事件
+        """
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return False
+        try:
+            while os.read(self.fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+        return True
+
+    def close(self):
+        os.close(self.fd)
+
+
+def get_waiter(poll: bool = False, interval: float = DEFAULT_INTERVAL) -> PollWaiter | InotifyWaiter:
+    """
+    Args:
+        poll: 是否强制轮询
+        interval: 轮询间隔，秒
+    Returns:
+        可用时为InotifyWaiter，否则为PollWaiter
+    """
+    if not poll:
+        try:
+            return InotifyWaiter()
+        except (OSError, AttributeError):
+            pass
+    return PollWaiter(interval)
+
+
+class Watcher:
+    def __init__(self,
+                 module_folder: str,
+                 output_dir: str,
+                 lang: str | list[str] = "zh-Hans",
+                 exclude: Optional[list[str]] = None,
+                 respect_gitignore: bool = False,
+                 ignored_paths=None,
+                 locale_dirs: Optional[list[str]] = None,
+                 poll: bool = False,
+                 interval: float = DEFAULT_INTERVAL,
+                 debounce: float = DEFAULT_DEBOUNCE,
+                 **kwargs):
+        """
+        监视模块文件夹并增量生成文档
+        Args:
+            module_folder: 模块文件夹
+            output_dir: 输出文件夹
+            lang: 语言
+            exclude: 排除规则
+            respect_gitignore: 是否遵循.gitignore
+            ignored_paths: 忽略的路径
+            locale_dirs: 外部语言文件所在目录
+            poll: 是否强制轮询
+            interval: 轮询间隔，秒
+            debounce: 使用inotify时，检测到变化后等待后续变化的时间，秒
+            **kwargs: 其余参数同generate_from_module，监视模式总是增量构建，incremental、rev等BUILD_ONLY_OPTIONS中的其余参数被忽略
+        """
+        self.module_folder = module_folder
+        self.output_dir = output_dir
+        self.langs = parse_langs(lang)
+        self.discover_options = dict(exclude=exclude, respect_gitignore=respect_gitignore, ignored_paths=ignored_paths)
+        self.locale_dirs = tuple(locale_dirs or ())
+        self.build_options = {key: kwargs.pop(key) for key in BUILD_OPTIONS if key in kwargs}
+        self.options = {"with_top": False, "theme": "vitepress", "style": "google", "frontmatter": None,
+                        **{key: value for key, value in kwargs.items() if key not in BUILD_ONLY_OPTIONS}}
+        """影响输出内容的选项"""
+        self.waiter = get_waiter(poll, interval)
+        self.debounce = debounce
+
+        self.stats: dict[str, FileStat] = {}
+        """源文件 -> 上次处理时的状态"""
+        self.manifests: dict[str, Manifest] = {}
+        self.stop_event = threading.Event()
+
+    def build(self):
+        """完整地增量构建一次，并从清单中载入每个源文件的哈希和输出"""
+        # 在构建前记录状态，构建期间发生的变化会在第一次更新时处理
+        self.stats = self.scan()
+        generate_from_module(self.module_folder, self.output_dir, lang=self.langs, locale_dirs=list(self.locale_dirs), incremental=True,
+                             **self.discover_options, **self.build_options, **self.options)
+        labels = {page_lang: dict(get_labels(page_lang, locale_dirs=self.locale_dirs)) for page_lang in self.langs}
+        self.manifests = get_manifests(self.module_folder, get_output_roots(self.output_dir, self.langs), labels,
+                                       get_content_options(self.module_folder, self.langs, **self.options))
+        for manifest in self.manifests.values():
+            manifest.current = dict(manifest.previous)
+
+    def scan(self) -> dict[str, FileStat]:
+        """
+        Returns:
+            当前所有源文件的状态，同时将新出现的目录加入监视
+        """
+        stats = {}
+        dirs = {self.module_folder}
+        for pyfile_path in iter_source_files(self.module_folder, **self.discover_options):
+            try:
+                stat = os.stat(pyfile_path)
+            except OSError:
+                continue
+            stats[pyfile_path] = (stat.st_mtime_ns, stat.st_size)
+        for root, sub_dirs, _ in os.walk(self.module_folder):
+            sub_dirs[:] = [sub_dir for sub_dir in sub_dirs if not EXCLUDED_DIRS.match(sub_dir, True)]
+            dirs.update(os.path.join(root, sub_dir) for sub_dir in sub_dirs)
+        self.waiter.watch_dirs(dirs)
+        return stats
+
+    def update(self) -> WatchUpdate:
+        """
+        比较文件状态，重新生成变化和新增的文件，移除已删除文件的页面
+        Returns:
+            WatchUpdate
+        """
+        stats = self.scan()
+        created = [path for path in stats if path not in self.stats]
+        changed = [path for path in stats if path in self.stats and stats[path] != self.stats[path]]
+        deleted = [path for path in self.stats if path not in stats]
+        failed = []
+
+        for pyfile_path in created + changed:
+            try:
+                with open(pyfile_path, "rb") as f:
+                    content = f.read()
+                content_hash = hash_bytes(content)
+            except OSError:
+                stats.pop(pyfile_path, None)
+                continue
+            # 只修改了时间的文件不重新生成
+            if all(manifest.current.get(pyfile_path, {}).get("hash") == content_hash for manifest in self.manifests.values()):
+                continue
+            result = render_file(pyfile_path, module_folder=self.module_folder, output_dir=self.output_dir, lang=self.langs,
+                                 locale_dirs=self.locale_dirs, content=content, **self.options)
+            if result.error is not None:
+                print(f"Error in {pyfile_path}: {result.error}")
+                # 保留旧页面，不记录哈希，下次保存时重试
+                failed.append(pyfile_path)
+                continue
+            try:
+                for page in result.pages:
+                    for output_path in page.output_paths:
+                        write_to_file(page.content, output_path)
+            except Exception as e:
+                # 编码失败(如文档中的孤立代理字符)与IO错误相同，只记为失败，不中断监视
+                print(f"Error in {pyfile_path}: {e}")
+                failed.append(pyfile_path)
+                continue
+            for page in result.pages:
+                self.manifests[page.lang].record(pyfile_path, content_hash, page.output_paths)
+                print(f"Output {pyfile_path} -> {page.output_paths[0]}")
+        for pyfile_path in deleted:
+            for manifest in self.manifests.values():
+                manifest.current.pop(pyfile_path, None)
+
+        if created or changed or deleted:
+            for manifest in self.manifests.values():
+                for removed_path in manifest.remove_stale():
+                    print(f"Removed {removed_path}")
+                manifest.save()
+                manifest.previous = dict(manifest.current)
+        self.stats = stats
+        return WatchUpdate(changed, created, deleted, failed)
+
+    def wait_for_change(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待变化，使用inotify时有变化后继续等待直到debounce时间内没有新的变化，合并编辑器连续的写入，
+        轮询时未写完的文件会在下一次轮询时再次被发现，无需等待
+        Args:
+            timeout: 最长等待时间，秒
+        Returns:
+            是否可能有变化
+        """
+        if not self.waiter.wait(timeout):
+            return False
+        if isinstance(self.waiter, InotifyWaiter):
+            deadline = time.monotonic() + MAX_DEBOUNCE
+            while self.waiter.wait(self.debounce) and time.monotonic() < deadline:
+                pass
+        return True
+
+    def run(self):
+        """构建后持续监视，直到stop()被调用"""
+        self.build()
+        print(f"Watching {self.module_folder} ({'inotify' if isinstance(self.waiter, InotifyWaiter) else 'polling'}), press Ctrl+C to stop")
+        try:
+            while not self.stop_event.is_set():
+                if self.wait_for_change(timeout=0.5):
+                    start = time.perf_counter()
+                    update = self.update()
+                    if update.changed or update.created or update.deleted:
+                        print(f"Updated:     {len(update.changed)} changed    {len(update.created)} created    "
+                              f"{len(update.deleted)} deleted    {len(update.failed)} failed    {time.perf_counter() - start:.3f}s")
+        finally:
+            self.waiter.close()
+
+    def stop(self):
+        """停止监视，可从其他线程调用"""
+        self.stop_event.set()
@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+基准测试工具测试
+"""
+import ast
+import copy
+
+from benchmarks.run import compare, run_benchmarks
+from benchmarks.synth import PackageSpec, generate_package
+
+
+def read_tree(root) -> dict[str, bytes]:
+    return {str(path.relative_to(root)): path.read_bytes() for path in sorted(root.rglob("*.py"))}
+
+
+class TestBenchmark:
+    spec = PackageSpec(modules=6, classes=1, methods=2, functions=2, variables=2, constant_table=3, depth=2, nesting=2, seed=7)
+
+    def test_synth_reproducible(self, tmp_path):
+        stats = generate_package(str(tmp_path / "a"), self.spec)
+        generate_package(str(tmp_path / "b"), self.spec)
+        generate_package(str(tmp_path / "c"), self.spec._replace(seed=8))
+        tree = read_tree(tmp_path / "a")
+        assert tree == read_tree(tmp_path / "b")
+        assert tree != read_tree(tmp_path / "c")
+        assert stats.files == len(tree)
+        assert stats.bytes == sum(map(len, tree.values()))
+        for data in tree.values():
+            ast.parse(data)
+
+    def test_compare(self, tmp_path):
+        data = run_benchmarks(self.spec, repeat=1, workdir=str(tmp_path))
+        assert set(data["results"]) == {"docstring", "astparser", "pipeline"}
+        assert compare(data, data) == []
+
+        slower = copy.deepcopy(data)
+        slower["results"]["pipeline"]["files_per_s"] /= 2
+        slower["results"]["astparser"]["peak_memory"] *= 2
+        regressions = compare(slower, data)
+        assert len(regressions) == 2
+        assert regressions[0].startswith("astparser: peak memory")
+        assert regressions[1].startswith("pipeline: throughput")
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+常驻进程和内存解析缓存测试
+"""
+import io
+import json
+import os
+import threading
+
+from litedoc import output
+from litedoc.cache import MODEL_SIZE_FACTOR, MemoryParseCache
+from litedoc.daemon import Daemon, request, run_client
+from litedoc.output import generate_from_module
+
+from tests.test_makedoc import TEST_MODULE, read_tree
+
+
+class TestDaemon:
+
+    def test_memory_cache_eviction(self):
+        cache = MemoryParseCache(max_size=10 * MODEL_SIZE_FACTOR)
+        cache.put("a", {"a": 1}, 4)
+        cache.put("b", {"b": 1}, 4)
+        assert cache.get("a") == {"a": 1}
+        cache.put("c", {"c": 1}, 4)
+        assert cache.get("b") is None and cache.get("a") is not None
+        assert cache.size == 8 * MODEL_SIZE_FACTOR
+        cache.put("d", {}, 11)
+        assert cache.get("d") is None
+
+    def test_client_requests(self, tmp_path, monkeypatch):
+        socket_path = str(tmp_path / "litedoc.sock")
+        daemon = Daemon(socket_path, idle_timeout=30)
+        thread = threading.Thread(target=daemon.serve)
+        thread.start()
+        try:
+            monkeypatch.chdir(os.path.dirname(TEST_MODULE))
+            options = {"lang": "en", "cs": True, "incremental": False}
+            assert run_client("mbcp", str(tmp_path / "daemon" / "api"), options, socket_path) == 0
+            assert run_client("mbcp", str(tmp_path / "warm" / "api"), options, socket_path) == 0
+
+            status = io.StringIO()
+            assert request({"command": "status"}, socket_path, stdout=status) == 0
+            assert "2 builds    15 cached files" in status.getvalue()
+        finally:
+            request({"command": "stop"}, socket_path, stdout=io.StringIO())
+            thread.join()
+        assert output.memory_parse_cache is None
+        assert not os.path.exists(socket_path)
+
+        generate_from_module("mbcp", str(tmp_path / "local" / "api"), lang="en", cs=True)
+        assert read_tree(str(tmp_path / "daemon" / "api")) == read_tree(str(tmp_path / "warm" / "api"))
+        assert read_tree(str(tmp_path / "daemon" / "api")) == read_tree(str(tmp_path / "local" / "api"))
+
+    def test_locale_dirs_per_request(self, tmp_path, monkeypatch):
+        socket_path = str(tmp_path / "litedoc.sock")
+        daemon = Daemon(socket_path, idle_timeout=30)
+        thread = threading.Thread(target=daemon.serve)
+        thread.start()
+        try:
+            for name in ("a", "b", "c"):
+                project = tmp_path / name
+                (project / "pkg").mkdir(parents=True)
+                (project / "pkg" / "m.py").write_text('def f(x):\n    """\n    Args:\n        x: doc\n    """\n', encoding="utf-8")
+                (project / "loc").mkdir()
+                (project / "loc" / "en.json").write_text(json.dumps({"docstring": {"args": f"ARGS_{name}"}}), encoding="utf-8")
+                monkeypatch.chdir(project)
+                assert run_client("pkg", "out", {"lang": "en", "locale_dirs": ["loc"]}, socket_path) == 0
+                assert f"ARGS_{name}" in (project / "out" / "m.md").read_text(encoding="utf-8")
+            # 语言文件修改后下一次请求生效
+            (project / "loc" / "en.json").write_text(json.dumps({"docstring": {"args": "ARGS_edited"}}), encoding="utf-8")
+            assert run_client("pkg", "out", {"lang": "en", "locale_dirs": ["loc"]}, socket_path) == 0
+            assert "ARGS_edited" in (project / "out" / "m.md").read_text(encoding="utf-8")
+        finally:
+            request({"command": "stop"}, socket_path, stdout=io.StringIO())
+            thread.join()
+
+    def test_client_without_unix_sockets(self, monkeypatch):
+        monkeypatch.delattr("socket.AF_UNIX")
+        assert request({"command": "status"}) is None
+
+    def test_idle_timeout(self, tmp_path):
+        socket_path = str(tmp_path / "litedoc.sock")
+        Daemon(socket_path, idle_timeout=0.1).serve()
+        assert not os.path.exists(socket_path)
+        assert request({"command": "status"}, socket_path) is None
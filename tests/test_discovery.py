@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+源文件发现测试
+"""
+import os
+
+import pytest
+
+from litedoc.discovery import PathMatcher, iter_source_files, iter_source_members
+from litedoc.sources import MemberSource
+
+
+class TestDiscovery:
+
+    def test_path_matcher(self):
+        matcher = PathMatcher(["# comment", "build/", "*_pb2.py", "/docs", "src/**/gen", "!keep_pb2.py"])
+        assert matcher.match("build", True)
+        assert matcher.match("a/build", True)
+        assert matcher.match("build", False) is None
+        assert matcher.match("a/b/x_pb2.py", False)
+        assert matcher.match("a/keep_pb2.py", False) is False
+        assert matcher.match("docs", True)
+        assert matcher.match("a/docs", True) is None
+        assert matcher.match("src/a/b/gen", True)
+        assert matcher.match("src/gen", True)
+
+    def test_iter_source_files(self, tmp_path):
+        for path in ["a.py", "b.txt", "sub/c.py", "sub/gen/d.py", ".venv/e.py", "__pycache__/f.py", "other/g.pyi"]:
+            file = tmp_path / path
+            file.parent.mkdir(parents=True, exist_ok=True)
+            file.write_text("", encoding="utf-8")
+        (tmp_path / "sub" / ".gitignore").write_text("gen/\n", encoding="utf-8")
+
+        def found(**kwargs):
+            return sorted(os.path.relpath(path, tmp_path).replace(os.sep, "/") for path in iter_source_files(str(tmp_path), **kwargs))
+
+        assert found() == ["a.py", "other/g.pyi", "sub/c.py", "sub/gen/d.py"]
+        assert found(respect_gitignore=True) == ["a.py", "other/g.pyi", "sub/c.py"]
+        assert found(exclude=["other/"], ignored_paths=["sub/c"]) == ["a.py", "sub/gen/d.py"]
+
+    def test_iter_source_members(self):
+        names = ["sub/c.py", "a.py", "b.txt", "sub/gen/d.py", ".venv/e.py", "__pycache__/f.py", "other/g.pyi", "z.py"]
+        assert list(iter_source_members(names)) == ["a.py", "z.py", "other/g.pyi", "sub/c.py", "sub/gen/d.py"]
+        assert list(iter_source_members(names, exclude=["gen/"], ignored_paths=["pkg/other"], prefix="pkg/")) == ["a.py", "z.py", "sub/c.py"]
+
+    def test_member_source_requires_read(self):
+        class NoRead(MemberSource):
+            names, module_folder = [], "pkg"
+
+        with pytest.raises(TypeError):
+            NoRead()
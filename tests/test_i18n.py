@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""
+多语言标签测试
+"""
+import json
+
+import pytest
+
+from litedoc.docstring.parser import parse
+from litedoc.i18n import REQUIRED_LABELS, get_labels
+
+
+class TestI18n:
+
+    def test_label_bundle(self):
+        labels = get_labels("ja")
+        assert labels is get_labels("ja")
+        assert labels["src"] == "ソースコード"
+        assert set(REQUIRED_LABELS) <= set(labels)
+        with pytest.raises(TypeError):
+            labels["src"] = "x"  # type: ignore
+        with pytest.raises(KeyError):
+            _ = labels["docstring.attrs"]
+        assert get_labels("unknown")["src"] == get_labels("en")["src"]
+
+    def test_attributes_label(self):
+        docstring = parse("desc\nAttributes:\n    a: x\n")
+        assert "**属性**:" in docstring.markdown("zh-Hans")
+
+    def test_locale_dir(self, tmp_path):
+        (tmp_path / "fr.json").write_text(json.dumps({"src": "Code source", "docstring": {"args": "Arguments"}}), encoding="utf-8")
+        labels = get_labels("fr", locale_dirs=(str(tmp_path),))
+        assert labels["src"] == "Code source" and labels["docstring.args"] == "Arguments"
+        assert labels["type"] == get_labels("en")["type"]
+
+        with pytest.raises(ValueError, match="Missing labels"):
+            get_labels("fr", fallback=None, locale_dirs=(str(tmp_path),))
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+导入开销测试，防止命令行启动时间回退
+"""
+import subprocess
+import sys
+
+IMPORT_BUDGET_MS = 150
+"""litedoc自身模块导入时间(不含标准库)的上限，留有较大余量，只用于发现明显的回退"""
+
+HEAVY_MODULES = ("pydantic", "multiprocessing", "zipfile", "tarfile", "concurrent.futures.process", "litedoc.syntax.model", "litedoc.docstring.model")
+"""核心解析和渲染路径上不应导入的模块"""
+
+
+def import_times(code: str, *args: str) -> dict[str, tuple[int, int]]:
+    """
+    Args:
+        code: 在新解释器中执行的代码
+        *args: 额外的命令行参数
+    Returns:
+        模块 -> (自身导入时间, 累计导入时间)，微秒
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code, *args], capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+class TestImportTime:
+
+    def test_help_skips_pipeline(self):
+        times = import_times("import sys; from litedoc.__main__ import main; sys.argv = ['litedoc', '--help']; main()")
+        assert "litedoc.__main__" in times
+        assert not [name for name in times if name.startswith("litedoc.") and name != "litedoc.__main__"]
+
+    def test_client_skips_pipeline(self):
+        times = import_times("import litedoc.daemon")
+        assert [name for name in times if name.startswith("litedoc")] == ["litedoc", "litedoc.daemon"]
+
+    def test_core_without_heavy_modules(self):
+        times = import_times("import litedoc.output; from litedoc.docstring.parser import parse; parse('desc\\nArgs:\\n    a: x\\n').markdown('en')")
+        assert "litedoc.output" in times
+        assert not [name for name in times if name.split(".")[0] == "pydantic" or name in HEAVY_MODULES]
+        own_ms = sum(self_us for name, (self_us, _) in times.items() if name.split(".")[0] == "litedoc") / 1000
+        assert own_ms < IMPORT_BUDGET_MS, f"litedoc modules took {own_ms:.0f}ms to import"
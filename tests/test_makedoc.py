@@ -7,4 +7,322 @@ Copyright (C) 2020-2024 LiteyukiStudio. All Rights Reserved
 @Email   : snowykami@outlook.com
 @File    : test_makedoc.py
 @Software: PyCharm
-"""
\ No newline at end of file
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tarfile
+import threading
+import time
+import zipfile
+
+from litedoc import profiling
+from litedoc.cache import ParseCache
+from litedoc.output import OutputWriter, generate_from_module, write_to_file
+from litedoc.versions import generate_versions, parse_versions
+from litedoc.watch import Watcher
+
+TEST_MODULE = os.path.join(os.path.dirname(__file__), "test_modules", "mbcp")
+
+
+def read_tree(path: str) -> dict[str, bytes]:
+    files = {}
+    for root, _, names in os.walk(path):
+        for name in names:
+            file = os.path.join(root, name)
+            with open(file, "rb") as f:
+                files[os.path.relpath(file, path)] = f.read()
+    return files
+
+
+class TestMakeDoc:
+
+    def test_parallel_output_identical(self, tmp_path):
+        serial, parallel = str(tmp_path / "serial" / "api"), str(tmp_path / "parallel" / "api")
+        generate_from_module(TEST_MODULE, serial, lang="en", cs=True)
+        generate_from_module(TEST_MODULE, parallel, lang="en", cs=True, jobs=2)
+        assert read_tree(serial) == read_tree(parallel)
+
+    def test_incremental_build(self, tmp_path, capsys):
+        module, output = tmp_path / "pkg", str(tmp_path / "api")
+        module.mkdir()
+        (module / "a.py").write_text('def f():\n    """doc"""\n', encoding="utf-8")
+        (module / "b.py").write_text('def g():\n    """doc"""\n', encoding="utf-8")
+        generate_from_module(str(module), output, incremental=True)
+        assert set(read_tree(output)) == {"a.md", "b.md", ".litedoc-manifest.json"}
+
+        capsys.readouterr()
+        generate_from_module(str(module), output, incremental=True)
+        assert "0/2 success    0 failed    2 unchanged" in capsys.readouterr().out
+
+        (module / "b.py").unlink()
+        (module / "a.py").write_text('def h():\n    """doc"""\n', encoding="utf-8")
+        generate_from_module(str(module), output, incremental=True)
+        files = read_tree(output)
+        assert set(files) == {"a.md", ".litedoc-manifest.json"}
+        assert b"h()" in files["a.md"]
+
+    def test_writer_survives_encode_error(self, tmp_path):
+        writer = OutputWriter(queue_size=2)
+        writer.submit("bad.py", [str(tmp_path / "bad.md")], "\ud800")
+        for i in range(10):
+            writer.submit(f"m{i}.py", [str(tmp_path / f"m{i}.md")], "# ok\n")
+        writer.close()
+        assert list(writer.failed_sources) == ["bad.py"]
+        assert writer.written_count == 10
+
+    def test_failed_source_keeps_page(self, tmp_path, capsys):
+        module, output = tmp_path / "pkg", str(tmp_path / "api")
+        module.mkdir()
+        (module / "a.py").write_text('def f():\n    """doc"""\n', encoding="utf-8")
+        generate_from_module(str(module), output, incremental=True)
+        page = read_tree(output)["a.md"]
+
+        (module / "a.py").write_text("def (\n", encoding="utf-8")
+        capsys.readouterr()
+        generate_from_module(str(module), output, incremental=True)
+        assert "Removed" not in capsys.readouterr().out
+        assert read_tree(output)["a.md"] == page
+
+        # 修复后重新生成
+        (module / "a.py").write_text('def g():\n    """doc"""\n', encoding="utf-8")
+        generate_from_module(str(module), output, incremental=True)
+        assert b"g()" in read_tree(output)["a.md"]
+
+    def test_write_unchanged_file(self, tmp_path):
+        output = str(tmp_path / "sub" / "a.md")
+        assert write_to_file("# 标题\n", output)
+        mtime = os.stat(output).st_mtime_ns
+        assert not write_to_file("# 标题\n", output)
+        assert os.stat(output).st_mtime_ns == mtime
+        assert write_to_file("# 标题2\n", output)
+        assert os.listdir(tmp_path / "sub") == ["a.md"]
+
+    def test_archive_source(self, tmp_path, monkeypatch):
+        wheel, sdist = tmp_path / "mbcp-1.0-py3-none-any.whl", tmp_path / "mbcp-1.0.tar.gz"
+        with zipfile.ZipFile(wheel, "w") as zf, tarfile.open(sdist, "w:gz") as tf:
+            zf.writestr("mbcp-1.0.dist-info/METADATA", "Name: mbcp\n")
+            for root, _, names in os.walk(TEST_MODULE):
+                for name in names:
+                    path = os.path.join(root, name)
+                    rel_path = os.path.relpath(path, os.path.dirname(TEST_MODULE)).replace(os.sep, "/")
+                    zf.write(path, rel_path)
+                    tf.add(path, f"mbcp-1.0/src/{rel_path}")
+        wheel_output, sdist_output, dir_output = (str(tmp_path / name / "api") for name in ("wheel", "sdist", "dir"))
+        generate_from_module(str(wheel), wheel_output, lang="en", cs=True)
+        generate_from_module(f"{sdist}/mbcp-1.0/src/mbcp", sdist_output, lang="en", cs=True)
+        monkeypatch.chdir(os.path.dirname(TEST_MODULE))
+        generate_from_module("mbcp", dir_output, lang="en", cs=True)
+
+        expected = read_tree(dir_output)
+        for output in (wheel_output, sdist_output):
+            assert read_tree(output) == expected
+
+    def test_git_revision(self, tmp_path, monkeypatch):
+        def git(*args):
+            subprocess.run(["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args], cwd=repo, check=True, capture_output=True)
+
+        repo = tmp_path / "repo"
+        shutil.copytree(TEST_MODULE, repo / "src" / "mbcp")
+        git("init", "-q")
+        git("add", "-A")
+        git("commit", "-q", "-m", "v1")
+        git("tag", "v1")
+        dir_output, rev_output = str(tmp_path / "dir" / "api"), str(tmp_path / "rev" / "api")
+        monkeypatch.chdir(repo / "src")
+        generate_from_module("mbcp", dir_output, lang="en", cs=True, incremental=False)
+
+        # 工作区的修改和删除不影响修订中的内容
+        (repo / "src" / "mbcp" / "__init__.py").write_text('"""changed"""\n', encoding="utf-8")
+        shutil.rmtree(repo / "src" / "mbcp" / "mp_math")
+        generate_from_module("mbcp", rev_output, lang="en", cs=True, incremental=False, rev="v1")
+        assert read_tree(rev_output) == read_tree(dir_output)
+
+    def test_versions(self, tmp_path, monkeypatch):
+        def git(*args):
+            subprocess.run(["git", "-c", "user.name=test", "-c", "user.email=test@example.com", *args], cwd=repo, check=True, capture_output=True)
+
+        repo = tmp_path / "repo"
+        (repo / "pkg").mkdir(parents=True)
+        (repo / "pkg" / "a.py").write_text('def f():\n    """doc"""\n', encoding="utf-8")
+        (repo / "pkg" / "b.py").write_text('def g():\n    """doc"""\n', encoding="utf-8")
+        git("init", "-q")
+        git("add", "-A")
+        git("commit", "-q", "-m", "v1")
+        git("tag", "v1")
+        (repo / "pkg" / "b.py").write_text('def h():\n    """doc"""\n', encoding="utf-8")
+        git("commit", "-q", "-am", "v2")
+        monkeypatch.chdir(repo)
+
+        output = str(tmp_path / "out" / "{version}" / "api")
+        versions = parse_versions(["v1,HEAD", "dev=pkg"], "pkg")
+        assert versions[0].rev == "v1" and versions[2].rev is None
+        results = generate_versions(versions, output, lang="en", incremental=True)
+        assert [(result.rendered, result.reused) for result in results] == [(2, 0), (1, 1), (0, 2)]
+        for version in ("v1", "HEAD", "dev"):
+            single = str(tmp_path / "single" / version)
+            generate_from_module("pkg", single, lang="en", incremental=True, rev=None if version == "dev" else version)
+            assert read_tree(output.format(version=version)) == read_tree(single)
+        # 相同的页面是同一个文件
+        assert os.path.samefile(output.format(version="v1") + "/a.md", output.format(version="dev") + "/a.md")
+        assert not os.path.samefile(output.format(version="v1") + "/b.md", output.format(version="HEAD") + "/b.md")
+
+        results = generate_versions(versions, output, lang="en", incremental=True)
+        assert [result.unchanged for result in results] == [2, 2, 2]
+
+    def test_versions_from_directories(self, tmp_path, monkeypatch):
+        for name in ("a", "b"):
+            shutil.copytree(TEST_MODULE, tmp_path / name / "mbcp")
+        wheel = tmp_path / "mbcp-1.0-py3-none-any.whl"
+        with zipfile.ZipFile(wheel, "w") as zf:
+            for root, _, names in os.walk(TEST_MODULE):
+                for name in names:
+                    path = os.path.join(root, name)
+                    zf.write(path, os.path.relpath(path, os.path.dirname(TEST_MODULE)))
+        output = str(tmp_path / "out" / "{version}" / "api")
+        versions = parse_versions([f"v1={tmp_path / 'a' / 'mbcp'},v2={tmp_path / 'b' / 'mbcp'},v3={wheel}"], "mbcp")
+        results = generate_versions(versions, output, lang="en", cs=True)
+        assert [(result.rendered, result.reused) for result in results] == [(15, 0), (0, 15), (0, 15)]
+
+        # 与在上级目录中单独生成相同
+        monkeypatch.chdir(tmp_path / "b")
+        generate_from_module("mbcp", str(tmp_path / "single" / "api"), lang="en", cs=True)
+        assert read_tree(output.format(version="v2")) == read_tree(str(tmp_path / "single" / "api"))
+        assert os.path.samefile(output.format(version="v1") + "/index.md", output.format(version="v3") + "/index.md")
+
+    def test_parse_cache(self, tmp_path, capsys):
+        cache_dir = str(tmp_path / "cache")
+        cold, warm = str(tmp_path / "cold" / "api"), str(tmp_path / "warm" / "api")
+        generate_from_module(TEST_MODULE, cold, lang="en", cs=True, cache_dir=cache_dir)
+        capsys.readouterr()
+        generate_from_module(TEST_MODULE, warm, lang="en", cs=True, cache_dir=cache_dir)
+        assert "Cache:       15 hit    0 miss" in capsys.readouterr().out
+        assert read_tree(cold) == read_tree(warm)
+
+        cache = ParseCache(cache_dir, max_size=0)
+        assert cache.evict() == 15
+        assert cache.get(cache.key(b"", "google")) is None
+
+    def test_multi_language_output(self, tmp_path):
+        kwargs = dict(cs=True, bu="https://example.com/mbcp/")
+        generate_from_module(TEST_MODULE, str(tmp_path / "multi" / "{lang}" / "api"), lang="en,zh-Hans,ja", **kwargs)
+        for lang in ("en", "zh-Hans", "ja"):
+            single = str(tmp_path / "single" / lang / "api")
+            generate_from_module(TEST_MODULE, single, lang=lang, **kwargs)
+            assert read_tree(str(tmp_path / "multi" / lang / "api")) == read_tree(single)
+
+        generate_from_module(TEST_MODULE, str(tmp_path / "sub"), lang=["en", "ja"])
+        assert sorted(os.listdir(tmp_path / "sub")) == ["en", "ja"]
+
+    def test_profile(self, tmp_path):
+        assert profiling.stage("render") is profiling.stage("write")
+        profiler = profiling.enable()
+        try:
+            generate_from_module(TEST_MODULE, str(tmp_path / "api"), lang="en", jobs=2)
+        finally:
+            profiling.disable()
+        assert {"discover", "read", "ast", "extract", "docstring", "source", "render", "write"} <= set(profiler.stages)
+        assert len(profiler.files) == profiler.stages["ast"][2]
+        report = profiler.report(top=3)
+        assert len(report["slowest_files"]) == 3
+        assert report["slowest_files"][0]["wall"] >= report["slowest_files"][-1]["wall"]
+
+    def test_profile_counts_parallel(self, tmp_path):
+        counts = {}
+        for jobs in ("1", "2"):
+            report_path = tmp_path / f"profile-{jobs}.json"
+            subprocess.run([sys.executable, "-m", "litedoc", TEST_MODULE, "-o", str(tmp_path / jobs), "-l", "en", "-j", jobs,
+                            "--profile-json", str(report_path)], check=True, capture_output=True)
+            report = json.loads(report_path.read_text(encoding="utf-8"))
+            counts[jobs] = {name: stage["count"] for name, stage in report["stages"].items()}
+        assert counts["1"] == counts["2"]
+        # 增量构建为计算哈希读取的内容直接用于生成，每个文件只读取一次
+        assert counts["1"]["read"] == counts["1"]["ast"]
+
+    def test_watch_update(self, tmp_path):
+        module, output = tmp_path / "pkg", str(tmp_path / "api")
+        module.mkdir()
+        (module / "a.py").write_text('def f():\n    """doc"""\n', encoding="utf-8")
+        (module / "b.py").write_text('def g():\n    """doc"""\n', encoding="utf-8")
+        watcher = Watcher(str(module), output, lang="en", poll=True)
+        watcher.build()
+        assert set(read_tree(output)) == {"a.md", "b.md", ".litedoc-manifest.json"}
+
+        (module / "a.py").write_text('def h():\n    """doc"""\n', encoding="utf-8")
+        (module / "b.py").unlink()
+        (module / "sub").mkdir()
+        (module / "sub" / "c.py").write_text('def k():\n    """doc"""\n', encoding="utf-8")
+        update = watcher.update()
+        assert [os.path.basename(path) for path in update.changed + update.created + update.deleted] == ["a.py", "c.py", "b.py"]
+        files = read_tree(output)
+        assert set(files) == {"a.md", os.path.join("sub", "c.md"), ".litedoc-manifest.json"}
+        assert b"h()" in files["a.md"]
+
+        # 语法错误时保留旧页面，清单与之后的普通增量构建一致
+        (module / "a.py").write_text("def (", encoding="utf-8")
+        assert watcher.update().failed == [str(module / "a.py")]
+        assert b"h()" in read_tree(output)["a.md"]
+        # 无法编码的页面内容同样只记为失败
+        (module / "a.py").write_text('def h():\n    """\\ud800"""\n', encoding="utf-8")
+        assert watcher.update().failed == [str(module / "a.py")]
+        assert b"h()" in read_tree(output)["a.md"]
+        (module / "a.py").write_text('def h():\n    """doc"""\n', encoding="utf-8")
+        watcher.update()
+        watcher.waiter.close()
+        generate_from_module(str(module), output, lang="en", incremental=True)
+        assert read_tree(output) == files
+
+    def test_watch_cli_options_keep_manifest(self, tmp_path, capsys):
+        module, output = tmp_path / "pkg", str(tmp_path / "api")
+        module.mkdir()
+        (module / "a.py").write_text('def f():\n    """doc"""\n', encoding="utf-8")
+        (module / "b.py").write_text('def g():\n    """doc"""\n', encoding="utf-8")
+        # 与命令行传入的参数相同
+        options = dict(with_top=False, lang="en", theme="vitepress", style="google", frontmatter=None, jobs=1, incremental=True, exclude=[],
+                       respect_gitignore=False, cache_dir=None, cache_size=256 * 1024 * 1024, locale_dirs=[], rev=None,
+                       fd="func", md="method", cd="class", vd="var", ad="attr", cs=False, bu=None)
+        watcher = Watcher(str(module), output, poll=True, **options)
+        watcher.build()
+        assert all(manifest.reusable for manifest in watcher.manifests.values())
+        (module / "a.py").write_text('def h():\n    """doc"""\n', encoding="utf-8")
+        watcher.update()
+        watcher.waiter.close()
+
+        capsys.readouterr()
+        generate_from_module(str(module), output, **options)
+        assert "0/2 success    0 failed    2 unchanged" in capsys.readouterr().out
+
+    def test_watch_latency(self, tmp_path):
+        module, output = tmp_path / "pkg", tmp_path / "api"
+        module.mkdir()
+        (module / "a.py").write_text('def f():\n    """doc"""\n', encoding="utf-8")
+        watcher = Watcher(str(module), str(output), lang="en")
+        errors = []
+
+        def run():
+            try:
+                watcher.run()
+            except BaseException as e:
+                errors.append(e)
+
+        thread = threading.Thread(target=run)
+        thread.start()
+        try:
+            start = time.perf_counter()
+            while not (output / "a.md").exists():
+                assert not errors, errors
+                assert time.perf_counter() - start < 10
+                time.sleep(0.01)
+            time.sleep(0.1)
+            start = time.perf_counter()
+            (module / "a.py").write_text('def changed():\n    """doc"""\n', encoding="utf-8")
+            while b"changed()" not in (output / "a.md").read_bytes():
+                assert not errors, errors
+                assert time.perf_counter() - start < 2
+                time.sleep(0.005)
+        finally:
+            watcher.stop()
+            thread.join()
+        assert not errors, errors
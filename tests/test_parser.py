@@ -8,15 +8,255 @@ Copyright (C) 2020-2024 LiteyukiStudio. All Rights Reserved
 @File    : test_parser.py
 @Software: PyCharm
 """
+import io
 import os
 
-from liteyuki_autodoc.syntax.astparser import AstParser
+import pytest
+
+from litedoc.cache import get_cache_key
+from litedoc.docstring.parser import GoogleDocstringParser, clear_parse_cache, parse, parse_cache_info
+from litedoc.i18n import get_labels
+from litedoc.style.markdown import generate
+from litedoc.style.renderer import get_renderer_for
+from litedoc.syntax.astparser import AstParser
+from litedoc.syntax.node import FunctionNode, MAGIC_METHODS, NO_DEFAULT_CONSTANT, lazy_counter
+
+TEST_MODULES = os.path.join(os.path.dirname(__file__), "test_modules")
 
 
 class TestParser:
 
     def test_one_file(self):
-        file = "test_modules/tree.py"
+        file = os.path.join(TEST_MODULES, "tree.py")
         text = open(file, "r", encoding="utf-8").read()
         parser = AstParser(text)
         print(parser)
+
+    def test_module_level_source_order(self):
+        code = (
+            "a = 1\n"
+            "if True:\n"
+            "    def f():\n"
+            "        pass\n"
+            "class C:\n"
+            "    x = 1\n"
+            "    class Inner:\n"
+            "        pass\n"
+            "def g():\n"
+            "    y = 2\n"
+            "    if y:\n"
+            "        def closure():\n"
+            "            z = 3\n"
+            "    class Local:\n"
+            "        pass\n"
+            "b: int = 2\n"
+        )
+        parser = AstParser(code)
+        assert [node.name for node in parser.all_nodes] == ["a", "f", "C", "g", "b"]
+        assert [node.name for node in parser.classes] == ["C"]
+        assert [node.name for node in parser.functions] == ["f", "g"]
+        assert [node.name for node in parser.variables] == ["a", "b"]
+
+    def test_variable_docs(self):
+        code = (
+            '"""module docs"""\n'
+            "A = 1\n"
+            "B = '#'  # comment of B\n"
+            "C = {\n"
+            "    'k': 1,\n"
+            "}\n"
+            '"""\n'
+            "multi-line\n"
+            "docs of C\n"
+            '"""\n'
+        )
+        parser = AstParser(code)
+        docs = {node.name: node.docs for node in parser.variables}
+        assert docs["A"] is None
+        assert docs["B"] == "comment of B"
+        assert docs["C"] == "multi-line\ndocs of C"
+
+    def test_function_source(self):
+        code = (
+            "class A:\n"
+            "    @property\n"
+            "    def 名字(self) -> str:  # 注释\n"
+            '        """\n'
+            "        文档\n"
+            '        """\n'
+            "\n"
+            "        # keep comments\n"
+            "        return  'x'\n"
+        )
+        parser = AstParser(code)
+        method = parser.classes[0].methods[0]
+        assert method.src.startswith('@property\ndef 名字(self) -> str:  # 注释\n    """')
+        assert method.get_src_without_docstring() == (
+            "@property\n"
+            "def 名字(self) -> str:  # 注释\n"
+            "    # keep comments\n"
+            "    return  'x'"
+        )
+
+    def test_lazy_fields(self):
+        lazy_counter.reset()
+        parser = AstParser('def _private():\n    """doc"""\n\ndef public():\n    """doc"""\n')
+        assert lazy_counter.loaded == {}
+        assert parser.functions[1].docs.desc == "doc"
+        assert parser.functions[1].docs is parser.functions[1].docs
+        assert lazy_counter.loaded == {"docs": 1}
+        assert lazy_counter.avoided() == {"docs": 1, "src": 2, "src_without_docstring": 2}
+
+    def test_docstring_section_headers(self):
+        docstring = parse(
+            "返回值说明不是段落标题\n"
+            "Arguments:\n"
+            "    a: 参数a\n"
+            "返回：\n"
+            "    结果\n"
+        )
+        assert docstring.desc == "返回值说明不是段落标题"
+        assert [arg.name for arg in docstring.args] == ["a"]
+        assert docstring.return_.desc == "结果"
+
+        class CustomParser(GoogleDocstringParser):
+            pass
+
+        CustomParser.register_section("Parameters", "args")
+        assert "Parameters" not in GoogleDocstringParser._tokens
+        assert [arg.name for arg in CustomParser("Parameters:\n    b: x\n").parse().args] == ["b"]
+
+    def test_docstring_parse_cache(self):
+        clear_parse_cache()
+        text = "desc\nArgs:\n    a: x\n"
+        first, second = parse(text), parse(text)
+        assert first is second
+        assert parse_cache_info().hits == 1 and parse_cache_info().misses == 1
+        assert parse(text, is_module=True) is not first
+
+        with pytest.raises(TypeError):
+            first.desc = "changed"
+        with pytest.raises(TypeError):
+            first.args.append(first.args[0])
+        with pytest.raises(TypeError):
+            first.args[0].name = "b"
+
+        copy = first.mutable_copy()
+        copy.add_arg("b")
+        assert [arg.name for arg in copy.args] == ["a", "b"]
+        assert [arg.name for arg in parse(text).args] == ["a"]
+
+    def test_register_section_invalidates_caches(self, monkeypatch):
+        monkeypatch.setattr(GoogleDocstringParser, "_tokens", GoogleDocstringParser._tokens)
+        text = "Parameters:\n    a: x\n"
+        key = get_cache_key(text.encode("utf-8"), "google")
+        assert parse(text).args == []
+        GoogleDocstringParser.register_section("Parameters", "args")
+        assert [arg.name for arg in parse(text).args] == ["a"]
+        assert get_cache_key(text.encode("utf-8"), "google") != key
+        monkeypatch.undo()
+        clear_parse_cache()
+
+    def test_slotted_nodes(self):
+        parser = AstParser('class A:\n    def __add__(self, other: "A", k=1, *, flag=None, opt): ...\n')
+        method = parser.classes[0].methods[0]
+        assert not hasattr(method, "__dict__")
+        assert method.magic_methods is MAGIC_METHODS
+        assert method.kw_defaults[1] is NO_DEFAULT_CONSTANT
+
+        model = parser.classes[0].to_model()
+        assert type(model).__module__ == "litedoc.syntax.model"
+        assert model.methods[0].args[1].type == "A"
+        assert "magic_methods" not in method.model_dump()
+
+        data = parser.to_data()
+        restored = AstParser.from_data(data)
+        assert restored.classes[0] == parser.classes[0]
+        assert isinstance(restored.classes[0].methods[0], FunctionNode)
+        assert restored.to_data() == data
+
+    def test_data_keeps_lazy_fields(self):
+        code = (
+            '"""mod"""\n'
+            "class A:\n"
+            '    """A doc\n\n    Args:\n        x: value\n    """\n'
+            "    x: int = 1\n"
+            '    """x doc"""\n'
+            "    def method(self, a):  # comment\n"
+            '        """method doc"""\n'
+            "        return a\n"
+            "def func():\n"
+            "    pass\n"
+        )
+        parser = AstParser(code)
+        lazy_counter.reset()
+        data = parser.to_data()
+        assert lazy_counter.loaded == {}
+
+        restored = AstParser.from_data(data, code=code)
+        assert restored.to_data() == data
+        assert lazy_counter.loaded == {}
+        for original, loaded in ((parser.classes[0], restored.classes[0]), (parser.functions[0], restored.functions[0])):
+            assert loaded.docs == original.docs
+        for original, loaded in ((parser.classes[0].methods[0], restored.classes[0].methods[0]), (parser.functions[0], restored.functions[0])):
+            assert loaded.src == original.src
+            assert loaded.src_without_docstring == original.src_without_docstring
+        assert restored.classes[0] == parser.classes[0]
+
+    def test_hide_directive(self):
+        code = (
+            "class Hidden:\n"
+            '    """@litedoc-hide"""\n'
+            "\n"
+            "class Shown:\n"
+            "    a = 1  # @litedoc-hide\n"
+            "    b: int = 2\n"
+            "    def method(self):\n"
+            '        """doc @litedoc-hide"""\n'
+            "\n"
+            "def func():\n"
+            '    """@litedoc-hide"""\n'
+        )
+        lazy_counter.reset()
+        parser = AstParser(code)
+        assert [cls.hidden for cls in parser.classes] == [True, False]
+        assert [attr.hidden for attr in parser.classes[1].attrs] == [True, False]
+        assert parser.classes[1].methods[0].hidden and parser.functions[0].hidden
+        assert "docs" not in lazy_counter.loaded
+
+        md = generate(parser, "en")
+        assert "Hidden" not in md and "func" not in md
+        assert "`b: int = 2`" in md and "`a = 1`" not in md and "method" not in md
+
+    def test_directive_not_taken_from_previous_docstring(self):
+        code = (
+            "class A:\n"
+            '    """@litedoc-hide is only for the class"""\n'
+            "    a: int = 1\n"
+            '    """@litedoc-hide"""\n'
+            "    b: int = 2\n"
+            "    c = 3\n"
+            "\n"
+            '    """@litedoc-hide"""\n'
+            "    d = 4\n"
+            "\n"
+            "x = 1\n"
+            '"""doc of x @litedoc-hide"""\n'
+            "y = 2\n"
+        )
+        parser = AstParser(code)
+        assert [attr.hidden for attr in parser.classes[0].attrs] == [True, False, False, True]
+        assert [var.hidden for var in parser.variables] == [True, False]
+
+    def test_renderer_stream(self):
+        file = os.path.join(TEST_MODULES, "mbcp", "mp_math", "vector.py")
+        with open(file, "r", encoding="utf-8") as f:
+            parser = AstParser(f.read(), title="vector")
+        labels = get_labels("zh-Hans")
+        renderer = get_renderer_for(labels, fd="def", bu="https://example.com/", cs=True)
+        assert renderer is get_renderer_for(labels, fd="def", bu="https://example.com/")
+
+        buffer = io.StringIO()
+        renderer.write(parser, buffer, {"title": "vector"})
+        assert buffer.getvalue() == generate(parser, "zh-Hans", {"title": "vector"}, fd="def", bu="https://example.com/")
+        assert buffer.getvalue() == renderer.render(parser, {"title": "vector"})